@@ -0,0 +1,191 @@
+"""
+LLM バックエンド
+
+GeminiService が使うモデルは AI_BACKEND で切り替える：
+
+- 'gemini'（デフォルト）：google-generativeai の GenerativeModel（AI_GEMINI_MODEL）
+- 'stub'：ネットワークもクォータも使わないローカルのスタブ。
+  プロンプトの種類（包括分析・関連度・ルール判定など）を見分けて、スキーマ通りのJSONを返す。
+  結果はプロンプトのハッシュで決まる（何度実行しても同じ）。
+  応答遅延（AI_STUB_LATENCY_MS、AI_STUB_MS_PER_1K_TOKENS）、
+  クォータエラー（AI_STUB_FAILURE_RATE）、途中で切れたJSON（AI_STUB_TRUNCATE_RATE）を注入でき、
+  AIパイプライン全体のスループットやバッチ分割の挙動をローカルで計測できる（benchmark_ai_pipeline.py）
+
+バックエンドのモデルは generate_content(prompt, **kwargs) を持ち、.text のある応答を返す。
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+from .batching import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TWEET_ID_PATTERN = re.compile(r'\(ID: ([^)]+)\)')
+RULE_ID_PATTERN = re.compile(r'规则(\d+):')
+
+
+class GeminiBackend:
+    """Google Gemini"""
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or getattr(settings, 'AI_GEMINI_MODEL', 'gemini-pro')
+
+    def create_model(self):
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        return genai.GenerativeModel(self.model_name)
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """
+    決定的な応答を返すオフラインのモデル
+
+    判定（関連あり・ルールに一致など）は match_rate の割合で、ツイートID・ルールIDのハッシュから決める。
+    エラー・切れた応答の注入は「プロンプト + 同じプロンプトの呼び出し回数」のハッシュで決めるので、
+    同じプロンプトを再試行すればいずれ成功し、並列実行しても結果は変わらない。
+    """
+
+    def __init__(self, latency_ms: float = 0, ms_per_1k_tokens: float = 0, failure_rate: float = 0.0,
+                 truncate_rate: float = 0.0, match_rate: float = 0.3):
+        self.latency_ms = latency_ms
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.failure_rate = failure_rate
+        self.truncate_rate = truncate_rate
+        self.match_rate = match_rate
+        self.stats = Counter()
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fraction(*parts) -> float:
+        digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return int(digest[:8], 16) / 0x100000000
+
+    def generate_content(self, prompt, **kwargs):
+        prompt = str(prompt)
+        with self._lock:
+            self.stats['calls'] += 1
+            self._attempts[prompt] += 1
+            attempt = self._attempts[prompt]
+
+        text = self._respond(prompt)
+        delay = self.latency_ms + self.ms_per_1k_tokens * (estimate_tokens(prompt) + estimate_tokens(text)) / 1000
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self._fraction(prompt, attempt, 'failure') < self.failure_rate:
+            self._count('failures')
+            raise google_exceptions.ResourceExhausted('stub: injected quota error')
+        if self._fraction(prompt, attempt, 'truncate') < self.truncate_rate:
+            self._count('truncated')
+            return StubResponse(text[:len(text) // 2])
+        return StubResponse(text)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _matches(self, *parts) -> bool:
+        return self._fraction(*parts) < self.match_rate
+
+    def _respond(self, prompt: str) -> str:
+        tweet_ids = TWEET_ID_PATTERN.findall(prompt)
+
+        if '"rule_id"' in prompt:
+            # 複数ルールの判定：一致した（ツイート, ルール）の組み合わせのみ
+            rule_ids = RULE_ID_PATTERN.findall(prompt)
+            return json.dumps([
+                {'tweet_id': tweet_id, 'rule_id': int(rule_id), 'reason': 'stub', 'relevance_score': 0.8}
+                for tweet_id in tweet_ids for rule_id in rule_ids if self._matches(tweet_id, rule_id)
+            ], ensure_ascii=False)
+
+        if '"match"' in prompt:
+            # ルール判定：一致したツイートのみ
+            return json.dumps([
+                {'tweet_id': tweet_id, 'match': True, 'reason': 'stub', 'relevance_score': 0.8}
+                for tweet_id in tweet_ids if self._matches(tweet_id, prompt.split('以下是需要筛选的推文')[0])
+            ], ensure_ascii=False)
+
+        if '"is_relevant"' in prompt:
+            if tweet_ids:
+                return json.dumps([
+                    dict(tweet_id=tweet_id, **self._relevance(tweet_id)) for tweet_id in tweet_ids
+                ], ensure_ascii=False)
+            return json.dumps(self._relevance(prompt), ensure_ascii=False)
+
+        if '"importance_score"' in prompt:
+            return json.dumps({
+                'sentiment': ['positive', 'neutral', 'negative'][int(self._fraction(prompt, 'sentiment') * 3)],
+                'summary': 'stub summary',
+                'topics': ['stub'],
+                'importance_score': round(self._fraction(prompt, 'importance'), 2)
+            }, ensure_ascii=False)
+
+        if '感情:' in prompt:
+            return 'neutral'
+        if 'トピック:' in prompt:
+            return '["stub"]'
+        if '重要度スコア' in prompt:
+            return str(round(self._fraction(prompt, 'importance'), 2))
+        return 'stub summary'
+
+    def _relevance(self, key: str) -> Dict:
+        relevant = self._matches(key)
+        return {
+            'is_relevant': relevant,
+            'score': 0.8 if relevant else 0.1,
+            'reason': 'stub',
+            'summary': 'stub summary'
+        }
+
+
+_stub_models = {}
+_stub_models_lock = threading.Lock()
+
+
+class StubBackend:
+    """ローカルのスタブ（AI_STUB_* 設定で遅延・エラーを注入）"""
+
+    model_name = 'stub'
+
+    def create_model(self) -> StubModel:
+        """同じ設定のスタブはプロセス内で共有する（呼び出し回数などの stats を全サービスで合計するため）"""
+        options = (
+            getattr(settings, 'AI_STUB_LATENCY_MS', 200),
+            getattr(settings, 'AI_STUB_MS_PER_1K_TOKENS', 0),
+            getattr(settings, 'AI_STUB_FAILURE_RATE', 0.0),
+            getattr(settings, 'AI_STUB_TRUNCATE_RATE', 0.0),
+        )
+        with _stub_models_lock:
+            if options not in _stub_models:
+                _stub_models[options] = StubModel(*options)
+            return _stub_models[options]
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'stub': StubBackend,
+}
+
+
+def get_backend(name: str = None):
+    """AI_BACKEND（'gemini' / 'stub'）のバックエンド"""
+    name = name or getattr(settings, 'AI_BACKEND', 'gemini')
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown AI_BACKEND '{name}' (choose from: {', '.join(BACKENDS)})")
@@ -0,0 +1,112 @@
+"""
+AI批量请求的分批：按token预算打包推文，回应不完整时拆分重试
+
+固定条数的批次不考虑推文长度：长的日文推文可能超出上下文或输出上限（回应的JSON被截断），
+短的推文又浪费请求次数。这里先估算每条推文的输入/输出token数，在预算内尽量多打包；
+回应被截断或JSON格式错误时，把批次一分为二，只重试失败的那一半。
+
+- AI_BATCH_INPUT_TOKEN_BUDGET：每次请求中推文部分的输入token上限（不含提示词模板）
+- AI_BATCH_OUTPUT_TOKEN_BUDGET：每次请求预计的输出token上限
+
+使用方法:
+    for batch in plan_batches(tweets, input_tokens=tweet_tokens, output_tokens=80, max_items=20):
+        for sub_batch, result in split_and_retry(batch, request):
+            ...   # request(sub_batch) 回应不完整时抛出 MalformedResponseError
+"""
+import logging
+import math
+from typing import Any, Callable, Iterator, List, Sequence, Tuple, TypeVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# 每条推文在提示词中的固定部分（"推文N (ID: ...):"、发布时间等）
+ITEM_OVERHEAD_TOKENS = 24
+
+
+class MalformedResponseError(ValueError):
+    """AI的回应不是完整的JSON（输出被截断或格式错误），拆分批次后重试"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算token数（不调用tokenizer）
+
+    日文/中文按每个字符1个token计算（偏保守），ASCII按每4个字符1个token计算。
+    """
+    ascii_chars = sum(1 for char in text or '' if ord(char) < 128)
+    return (len(text or '') - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+def tweet_tokens(tweet) -> int:
+    """推文在批量提示词中占用的输入token数"""
+    return estimate_tokens(tweet.content) + ITEM_OVERHEAD_TOKENS
+
+
+def plan_batches(
+    items: Sequence[T],
+    input_tokens: Callable[[T], int],
+    output_tokens: int,
+    max_items: int = None,
+    input_budget: int = None,
+    output_budget: int = None
+) -> List[List[T]]:
+    """
+    按顺序把 items 打包成批次，每批的输入token合计不超过 input_budget，
+    预计输出（output_tokens × 条数）不超过 output_budget，条数不超过 max_items
+
+    单条就超出预算的 item 单独成为一批（不丢弃）。
+    """
+    if input_budget is None:
+        input_budget = getattr(settings, 'AI_BATCH_INPUT_TOKEN_BUDGET', 8000)
+    if output_budget is None:
+        output_budget = getattr(settings, 'AI_BATCH_OUTPUT_TOKEN_BUDGET', 2048)
+    max_by_output = max(1, output_budget // max(1, output_tokens))
+    max_items = min(max_items, max_by_output) if max_items else max_by_output
+
+    batches = []
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = input_tokens(item)
+        if batch and (batch_tokens + tokens > input_budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def split_and_retry(
+    items: List[T],
+    request: Callable[[List[T]], Any]
+) -> Iterator[Tuple[List[T], Any]]:
+    """
+    对 items 调用 request，成功的部分 yield (该部分的items, 结果)
+
+    request 抛出 MalformedResponseError 时把批次一分为二分别重试（已成功的一半不再请求）；
+    单条也失败、或抛出其他异常（API错误等，拆分也不会成功）时放弃该部分（不yield）。
+    """
+    pending = [items]
+    while pending:
+        batch = pending.pop()
+        try:
+            result = request(batch)
+        except MalformedResponseError as e:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                logger.warning(f"Incomplete AI response for {len(batch)} items, retrying as "
+                               f"{middle} + {len(batch) - middle}: {e}")
+                pending.append(batch[middle:])
+                pending.append(batch[:middle])
+                continue
+            logger.error(f"Incomplete AI response for a single item: {e}")
+            continue
+        except Exception as e:
+            logger.error(f"AI batch request failed ({len(batch)} items): {e}")
+            continue
+        yield batch, result
@@ -0,0 +1,218 @@
+"""
+LLM 応答キャッシュ
+
+同じテキストに対する同じ分析（同じプロンプト）は何度も実行される：
+analyze_tweet_relevance、summarize_tweet、ai_service の各API、apply_ai_rule の再実行、
+複数のスキー場が同じ宣伝ツイートをリツイートした場合など。
+
+キーは hash(モデル名, 空白を正規化したプロンプト)。プロンプトはテンプレートと入力テキストから
+組み立てられるので、テンプレートか入力のどちらかが変われば別のキーになる。
+
+- プロセス内 LRU（LLM_CACHE_LOCAL_MAX_ENTRIES 件、超えたら最も古く使われたものから削除）
+- Redis（ワーカー間で共有、Redis 側の maxmemory ポリシーでサイズ制限）
+- どちらも LLM_CACHE_TTL_SECONDS で期限切れ
+- ヒット/ミスの回数は get_cache_stats() で取得
+- 呼び出し側で応答のパースに失敗した場合は invalidate(prompt) で削除する
+  （途中で切れた JSON などが TTL の間ずっと返され続けないように）
+
+使用方法:
+    model = CachedGenerativeModel(genai.GenerativeModel('gemini-pro'), 'gemini-pro')
+    response = model.generate_content(prompt)   # 2回目以降はキャッシュから返す
+    model.invalidate(prompt)                    # パースできなかった応答を削除
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai_service:llm_cache:'
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """モデル名と正規化したプロンプトのハッシュ（インデントや改行の違いは無視する）"""
+    normalized = ' '.join(prompt.split())
+    digest = hashlib.sha256(f"{model_name}\0{normalized}".encode('utf-8')).hexdigest()
+    return KEY_PREFIX + digest
+
+
+class LRUCache:
+    """TTL付きのプロセス内LRUキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheStats:
+    """キャッシュのヒット/ミス回数（プロセス内で累計）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+    def incr(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['local_hits'] + counts['redis_hits'] + counts['misses']
+        counts['hit_rate'] = round((lookups - counts['misses']) / lookups, 3) if lookups else 0.0
+        return counts
+
+    def reset(self):
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+
+
+cache_stats = CacheStats()
+_local_cache = None
+_local_cache_lock = threading.Lock()
+_redis_clients = {}
+
+
+def get_cache_stats() -> Dict[str, float]:
+    """{local_hits, redis_hits, misses, stores, invalidations, hit_rate}"""
+    return cache_stats.snapshot()
+
+
+def get_local_cache() -> LRUCache:
+    global _local_cache
+    with _local_cache_lock:
+        if _local_cache is None:
+            _local_cache = LRUCache(getattr(settings, 'LLM_CACHE_LOCAL_MAX_ENTRIES', 1024))
+        return _local_cache
+
+
+def get_redis_client():
+    """LLM_CACHE_REDIS_URL（デフォルトは Celery broker）の Redis。使えない場合は None"""
+    url = getattr(settings, 'LLM_CACHE_REDIS_URL', None)
+    if url is None:
+        url = getattr(settings, 'CELERY_BROKER_URL', '')
+    if not url:
+        return None
+
+    client = _redis_clients.get(url)
+    if client is not None:
+        return client
+    try:
+        import redis
+        client = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=2)
+        client.ping()
+    except Exception as e:
+        logger.warning(f"Redis unavailable for LLM cache, using in-process cache only: {e}")
+        return None
+    _redis_clients[url] = client
+    return client
+
+
+class CachedResponse:
+    """キャッシュから返す応答（呼び出し側は .text のみ使用する）"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CachedGenerativeModel:
+    """generate_content の前にキャッシュを置くラッパー"""
+
+    def __init__(self, model, model_name: str):
+        self.model = model
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        if not getattr(settings, 'LLM_CACHE_ENABLED', True) or kwargs or not isinstance(prompt, str):
+            return self.model.generate_content(prompt, **kwargs)
+
+        key = cache_key(self.model_name, prompt)
+        local = get_local_cache()
+        ttl = getattr(settings, 'LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600)
+
+        text = local.get(key)
+        if text is not None:
+            cache_stats.incr('local_hits')
+            return CachedResponse(text)
+
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            try:
+                value = redis_client.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache read failed: {e}")
+                value = None
+            if value is not None:
+                text = value.decode('utf-8')
+                cache_stats.incr('redis_hits')
+                local.set(key, text, ttl)
+                return CachedResponse(text)
+
+        cache_stats.incr('misses')
+        response = self.model.generate_content(prompt)
+
+        # ブロックされた応答などは .text が例外になる：キャッシュしない
+        try:
+            text = response.text
+        except Exception:
+            return response
+        if text:
+            local.set(key, text, ttl)
+            if redis_client is not None:
+                try:
+                    redis_client.set(key, text, ex=ttl)
+                except Exception as e:
+                    logger.warning(f"LLM cache write failed: {e}")
+            cache_stats.incr('stores')
+        return response
+
+    def invalidate(self, prompt):
+        """プロンプトの応答をキャッシュから削除する（応答をパースできなかった場合に呼ぶ）"""
+        if not isinstance(prompt, str):
+            return
+        key = cache_key(self.model_name, prompt)
+        get_local_cache().delete(key)
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            try:
+                redis_client.delete(key)
+            except Exception as e:
+                logger.warning(f"LLM cache delete failed: {e}")
+        cache_stats.incr('invalidations')
@@ -0,0 +1,169 @@
+"""
+Gemini 呼び出しの流量制御
+
+generate_content はブロッキング呼び出しで、これまでは全てのバッチを1件ずつ順番に実行していた。
+ここでは GeminiService / AIService / AIRecommendationService が共有する次の仕組みを提供する：
+
+- トークンバケット：1分あたりのリクエスト数（AI_REQUESTS_PER_MINUTE）と
+  トークン数（AI_TOKENS_PER_MINUTE）を超えないように待つ
+- 同時実行数の上限（AI_MAX_CONCURRENCY）
+- クォータ超過・一時的なエラーは指数バックオフで再試行（AI_MAX_RETRIES 回まで）
+- 1回の呼び出しのタイムアウト（AI_REQUEST_TIMEOUT_SECONDS）
+- run_parallel()：複数のバッチをスレッドで並列実行（上限は上記の同時実行数とクォータ）
+
+プロセス内の全サービスが同じリミッターを使う。Celery ワーカーが複数ある場合は
+ワーカー数に合わせて AI_REQUESTS_PER_MINUTE / AI_TOKENS_PER_MINUTE を割り当てること。
+
+使用方法:
+    model = RateLimitedModel(genai.GenerativeModel('gemini-pro'))
+    results = run_parallel(lambda batch: request(model, batch), batches)   # 入力と同じ順序
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+from .batching import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# 再試行するエラー：クォータ超過（429）とサーバー側の一時的なエラー
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class TokenBucket:
+    """1分あたり rate_per_minute だけ補充されるトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._level = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1):
+        """amount が使えるようになるまで待って消費する（容量より大きい場合は容量分だけ待つ）"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return
+                wait = (amount - self._level) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def charge(self, amount: float):
+        """待たずに消費する（実際の出力トークン数など、呼び出し後に分かる分）。残量はマイナスになりうる"""
+        with self._lock:
+            self._refill()
+            self._level -= amount
+
+
+class RateLimiter:
+    """リクエスト数とトークン数の2つのバケット、および同時実行数の上限"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+
+_limiter = None
+_executor = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    with _shared_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                getattr(settings, 'AI_REQUESTS_PER_MINUTE', 60),
+                getattr(settings, 'AI_TOKENS_PER_MINUTE', 120000),
+                max(1, getattr(settings, 'AI_MAX_CONCURRENCY', 4))
+            )
+        return _limiter
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _shared_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, getattr(settings, 'AI_MAX_CONCURRENCY', 4)),
+                thread_name_prefix='ai-request'
+            )
+        return _executor
+
+
+def run_parallel(func: Callable[[T], R], items: Sequence[T]) -> List[R]:
+    """
+    items をスレッドで並列に処理し、入力と同じ順序で結果を返す
+
+    AI_MAX_CONCURRENCY が1、または item が1件以下の場合は呼び出し元のスレッドで順番に実行する。
+    func の中でデータベースにアクセスしないこと（結果の保存は呼び出し元で行う）。
+    """
+    if len(items) <= 1 or getattr(settings, 'AI_MAX_CONCURRENCY', 4) <= 1:
+        return [func(item) for item in items]
+    executor = get_executor()
+    futures = [executor.submit(func, item) for item in items]
+    return [future.result() for future in futures]
+
+
+class RateLimitedModel:
+    """generate_content の前にリミッターを通し、クォータ超過時は再試行するラッパー"""
+
+    def __init__(self, model, limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.limiter = limiter
+
+    def generate_content(self, prompt, **kwargs):
+        limiter = self.limiter or get_rate_limiter()
+        max_retries = getattr(settings, 'AI_MAX_RETRIES', 4)
+        base_delay = getattr(settings, 'AI_RETRY_BASE_SECONDS', 2.0)
+        kwargs.setdefault('request_options', {'timeout': getattr(settings, 'AI_REQUEST_TIMEOUT_SECONDS', 60)})
+        prompt_tokens = estimate_tokens(prompt) if isinstance(prompt, str) else 0
+
+        attempt = 0
+        while True:
+            limiter.requests.acquire()
+            limiter.tokens.acquire(prompt_tokens)
+            try:
+                with limiter.slots:
+                    response = self.model.generate_content(prompt, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= max_retries:
+                    raise
+                delay = base_delay * (2 ** attempt) * (1 + random.random() * 0.25)
+                attempt += 1
+                logger.warning(f"Gemini request failed ({type(e).__name__}), retry {attempt}/{max_retries} "
+                               f"in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                continue
+
+            try:
+                limiter.tokens.charge(estimate_tokens(response.text))
+            except Exception:
+                pass
+            return response
@@ -0,0 +1,48 @@
+"""
+Django管理命令：训练推文相关度预筛选模型
+
+用AI实际判断过的推文（ai_label_source='llm'，标签为 ai_relevant）训练字符 n-gram 逻辑回归，
+保存到 AI_PREFILTER_MODEL_PATH。之后的相关度分析会用它给推文打分，分数低的推文不再调用AI。
+
+预筛选跳过的推文和AI调用失败时的启发式结果也保存为 ai_analyzed=True，但不用于训练
+（否则每次重新训练都会学习自己排除的推文）。
+
+使用方法：
+    python manage.py train_relevance_prefilter [--epochs 10] [--limit 20000]
+"""
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from ai_service.prefilter import NgramLinearModel, get_model_path, reset_prefilter
+from x_monitor.models import Tweet
+
+
+class Command(BaseCommand):
+    help = '用AI已判断过的推文训练相关度预筛选模型'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=10, help='训练轮数')
+        parser.add_argument('--limit', type=int, default=20000, help='最多使用的推文数（最新的优先）')
+        parser.add_argument('--output', type=str, help='模型文件路径（默认 AI_PREFILTER_MODEL_PATH）')
+
+    def handle(self, *args, **options):
+        samples = list(
+            Tweet.objects.filter(ai_analyzed=True, ai_label_source='llm')
+            .order_by('-posted_at')
+            .values_list('content', 'ai_relevant')[:options['limit']]
+        )
+        labels = {label for _, label in samples}
+        if len(labels) < 2:
+            raise CommandError(f'需要同时有相关和无关的AI判断过的推文（当前 {len(samples)} 条）')
+
+        model = NgramLinearModel.train(samples, epochs=options['epochs'])
+        correct = sum((model.predict(content) >= 0.5) == relevant for content, relevant in samples)
+
+        path = Path(options['output']) if options.get('output') else get_model_path()
+        model.save(path)
+        reset_prefilter()
+
+        relevant_count = sum(1 for _, relevant in samples if relevant)
+        self.stdout.write(self.style.SUCCESS(
+            f'训练完成：{len(samples)} 条推文（相关 {relevant_count} 条），'
+            f'训练集准确率 {correct / len(samples):.1%}，特征 {len(model.weights)} 个 → {path}'
+        ))
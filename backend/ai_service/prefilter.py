@@ -0,0 +1,229 @@
+"""
+本地预筛选：在调用AI之前给推文打一个相关度分数，明显无关的推文不再发送给AI
+
+分数由三部分组成：
+- 关键词：一个编译好的正则同时匹配所有日文/英文滑雪关键词
+- 话题标签：推文的 hashtags（以及正文中的 #标签）中是否有滑雪相关的标签
+- 线性模型：字符 n-gram（1-3）上的逻辑回归，用已由AI判断过的推文训练
+  （python manage.py train_relevance_prefilter），没有模型文件时只使用前两部分
+
+加载了线性模型时，分数低于 AI_PREFILTER_THRESHOLD 的推文直接判断为无关，其余的交给AI。
+没有模型文件时不跳过任何推文：只靠关键词的话，不含关键词的相关推文
+（滑雪场名称、天气、"本日は全面滑走可" 等）都是0分，会被永久判断为无关。
+跳过的推文数、以及预筛选倾向与AI判断的一致率可以通过 get_prefilter_stats() 查看。
+"""
+import json
+import logging
+import math
+import random
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SKI_KEYWORDS = [
+    'スキー', 'スキー場', 'ゲレンデ', 'スノボ', 'スノーボード', 'スノー',
+    '雪', '積雪', '降雪', '新雪', 'パウダー', '圧雪', '雪質', '雪山',
+    'リフト', 'ゴンドラ', 'コース', '滑走', '営業', 'オープン', 'クローズ', '営業終了',
+    'ナイター', 'シーズン券', 'リフト券', '索道',
+    '滑雪', '雪场', '雪況',
+    'ski', 'skiing', 'snow', 'snowboard', 'resort', 'slope', 'powder', 'lift', 'gondola',
+]
+
+SKI_HASHTAGS = [
+    'スキー', 'スノボ', 'スノーボード', 'ゲレンデ', '雪', 'パウダー', '雪質', 'スキー場',
+    'ski', 'snow', 'powder', 'snowboard',
+]
+
+
+def _compile(words: Iterable[str]) -> re.Pattern:
+    # 长的关键词优先，避免被短的前缀抢先匹配
+    return re.compile('|'.join(re.escape(word) for word in sorted(set(words), key=len, reverse=True)), re.IGNORECASE)
+
+
+KEYWORD_PATTERN = _compile(SKI_KEYWORDS)
+HASHTAG_PATTERN = _compile(SKI_HASHTAGS)
+# 正文中的 #标签（NFKC 后全角＃也是 #）
+TEXT_HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
+# 关键词 / 话题标签每命中一个增加的分数
+KEYWORD_WEIGHT = 0.3
+HASHTAG_WEIGHT = 0.4
+
+
+def normalize_text(text: str) -> str:
+    """全角/半角统一、小写、合并空白"""
+    return ' '.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (1, 2, 3)) -> Counter:
+    """字符 n-gram 计数（日文没有空格分词，按字符切分）"""
+    text = normalize_text(text)
+    grams = Counter()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+class NgramLinearModel:
+    """字符 n-gram 上的逻辑回归（纯Python，参数保存为JSON）"""
+
+    def __init__(self, weights: Dict[str, float] = None, bias: float = 0.0):
+        self.weights = weights or {}
+        self.bias = bias
+
+    def _features(self, text: str) -> Dict[str, float]:
+        grams = char_ngrams(text)
+        norm = math.sqrt(sum(count * count for count in grams.values())) or 1.0
+        return {gram: count / norm for gram, count in grams.items()}
+
+    def predict(self, text: str) -> float:
+        """推文相关的概率"""
+        z = self.bias + sum(self.weights.get(gram, 0.0) * value for gram, value in self._features(text).items())
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    @classmethod
+    def train(cls, samples: List[Tuple[str, bool]], epochs: int = 10, learning_rate: float = 0.5,
+              l2: float = 1e-4, seed: int = 0) -> 'NgramLinearModel':
+        """SGD训练：samples 为 (推文内容, AI是否判断为相关)"""
+        model = cls()
+        samples = list(samples)
+        features = [(model._features(text), 1.0 if label else 0.0) for text, label in samples]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(features)
+            for feats, label in features:
+                z = model.bias + sum(model.weights.get(gram, 0.0) * value for gram, value in feats.items())
+                error = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z)))) - label
+                for gram, value in feats.items():
+                    weight = model.weights.get(gram, 0.0)
+                    model.weights[gram] = weight - learning_rate * (error * value + l2 * weight)
+                model.bias -= learning_rate * error
+        # 去掉几乎为0的权重，减小模型文件
+        model.weights = {gram: round(weight, 5) for gram, weight in model.weights.items() if abs(weight) >= 1e-4}
+        return model
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'bias': self.bias, 'weights': self.weights}, ensure_ascii=False), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path: Path) -> 'NgramLinearModel':
+        data = json.loads(path.read_text(encoding='utf-8'))
+        return cls(data['weights'], data['bias'])
+
+
+class PrefilterStats:
+    """预筛选统计（进程内累计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {'scored': 0, 'skipped': 0, 'compared': 0, 'agreed': 0}
+
+    def incr(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts['skip_rate'] = round(counts['skipped'] / counts['scored'], 3) if counts['scored'] else 0.0
+        counts['agreement_rate'] = round(counts['agreed'] / counts['compared'], 3) if counts['compared'] else 0.0
+        return counts
+
+    def reset(self):
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+
+
+prefilter_stats = PrefilterStats()
+
+
+def get_prefilter_stats() -> Dict[str, float]:
+    """{scored, skipped（省去AI判断的推文数）, compared, agreed, skip_rate, agreement_rate}"""
+    return prefilter_stats.snapshot()
+
+
+def get_model_path() -> Path:
+    return Path(getattr(settings, 'AI_PREFILTER_MODEL_PATH', Path(settings.BASE_DIR) / 'data' / 'relevance_prefilter.json'))
+
+
+class RelevancePrefilter:
+    """推文相关度的本地打分"""
+
+    def __init__(self, model: Optional[NgramLinearModel] = None, threshold: float = None):
+        self.model = model
+        if threshold is None:
+            threshold = getattr(settings, 'AI_PREFILTER_THRESHOLD', 0.1)
+        self.threshold = threshold
+
+    def score(self, text: str, hashtags: Iterable[str] = ()) -> float:
+        """0-1的相关度分数（hashtags 与正文中的 #标签合并，有没有传入 hashtags 分数都相同）"""
+        normalized = normalize_text(text)
+        keywords = {match.lower() for match in KEYWORD_PATTERN.findall(normalized)}
+        all_tags = {normalize_text(tag).lstrip('#') for tag in hashtags or []}
+        all_tags.update(TEXT_HASHTAG_PATTERN.findall(normalized))
+        tags = [tag for tag in all_tags if tag and HASHTAG_PATTERN.search(tag)]
+        rule_score = min(1.0, KEYWORD_WEIGHT * len(keywords) + HASHTAG_WEIGHT * len(tags))
+        if self.model is None:
+            return rule_score
+        return (rule_score + self.model.predict(text)) / 2
+
+    def should_skip(self, score: float) -> bool:
+        # 没有训练好的模型时分数只来自关键词，不足以判断为无关
+        skip = self.model is not None and score < self.threshold
+        prefilter_stats.incr(scored=1, skipped=int(skip))
+        return skip
+
+    def skipped_result(self, text: str, score: float) -> Dict:
+        """与 AIService.analyze_tweet_relevance 相同格式的结果"""
+        return {
+            'is_relevant': False,
+            'score': round(score, 3),
+            'reason': '本地预筛选判断为无关（未调用AI）',
+            'summary': text[:50] + ('...' if len(text) > 50 else ''),
+            'source': 'prefilter'
+        }
+
+    def record_agreement(self, score: float, llm_relevant: bool):
+        """记录预筛选的倾向（score >= 0.5 视为相关）与AI判断是否一致"""
+        prefilter_stats.incr(compared=1, agreed=int((score >= 0.5) == bool(llm_relevant)))
+
+
+_prefilter = None
+_prefilter_lock = threading.Lock()
+
+
+def get_prefilter() -> Optional[RelevancePrefilter]:
+    """AI_PREFILTER_ENABLED 时返回预筛选器（模型文件存在时加载线性模型）"""
+    global _prefilter
+    if not getattr(settings, 'AI_PREFILTER_ENABLED', True):
+        return None
+    with _prefilter_lock:
+        if _prefilter is None:
+            model = None
+            path = get_model_path()
+            if path.exists():
+                try:
+                    model = NgramLinearModel.load(path)
+                    logger.info(f"Loaded relevance prefilter model from {path} ({len(model.weights)} features)")
+                except Exception as e:
+                    logger.warning(f"Failed to load relevance prefilter model {path}: {e}")
+            _prefilter = RelevancePrefilter(model)
+        return _prefilter
+
+
+def reset_prefilter():
+    """重新训练模型后，下次调用 get_prefilter 时重新加载"""
+    global _prefilter
+    with _prefilter_lock:
+        _prefilter = None
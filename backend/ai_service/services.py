@@ -1,10 +1,16 @@
-import google.generativeai as genai
 import json
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
 from django.utils import timezone
-from x_monitor.models import Tweet, AIAnalysis, AIPromptRule, RecommendedTweet
+from x_monitor.models import Tweet, AIAnalysis, AIPromptRule, RecommendedTweet, RuleEvaluation
+from x_monitor.search import update_search_documents
+from x_monitor.tags import update_tweet_tags
+from .backends import get_backend
+from .batching import MalformedResponseError, plan_batches, split_and_retry, tweet_tokens
+from .llm_cache import CachedGenerativeModel
+from .llm_client import RateLimitedModel, run_parallel
+from .prefilter import get_prefilter
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +23,12 @@ class GeminiService:
         self._initialize_model()
     
     def _initialize_model(self):
-        """Gemini モデルを初期化"""
+        """AI_BACKEND のモデルを初期化（backends.py）"""
         try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-pro')
+            backend = get_backend()
+            # 同じプロンプトの応答はキャッシュから返す（llm_cache.py）。
+            # キャッシュにない場合のみ、共有のリミッターを通して呼び出す（llm_client.py）
+            self.model = CachedGenerativeModel(RateLimitedModel(backend.create_model()), backend.model_name)
         except Exception as e:
             logger.error(f"Failed to initialize Gemini model: {e}")
     
@@ -90,7 +98,8 @@ class GeminiService:
                 topics = json.loads(topics_text)
                 return topics if isinstance(topics, list) else []
             except json.JSONDecodeError:
-                # JSONパースに失敗した場合は、カンマ区切りで分割
+                # JSONパースに失敗した場合は、カンマ区切りで分割（次回は再度問い合わせる）
+                self.model.invalidate(prompt)
                 return [topic.strip() for topic in topics_text.split(',')]
                 
         except Exception as e:
@@ -120,7 +129,8 @@ class GeminiService:
                 score = float(score_text)
                 return max(0.0, min(1.0, score))  # 0.0-1.0の範囲に制限
             except ValueError:
-                # 数値変換に失敗した場合は基本スコアを計算
+                # 数値変換に失敗した場合は基本スコアを計算（次回は再度問い合わせる）
+                self.model.invalidate(prompt)
                 return self._calculate_basic_importance_score(text, hashtags, metrics)
                 
         except Exception as e:
@@ -154,38 +164,118 @@ class GeminiService:
         return min(1.0, score)
     
     def analyze_tweet_comprehensive(self, tweet: Tweet) -> Dict:
-        """ツイートの包括的な分析"""
+        """ツイートの包括的な分析（感情・要約・トピック・重要度を1回の呼び出しで取得）
+        
+        応答のJSONはフィールドごとに検証し、欠けている・不正なフィールドのみ
+        個別のヒューリスティック（_fallback_analysis）で補う
+        """
+        metrics = {
+            'like_count': tweet.like_count,
+            'retweet_count': tweet.retweet_count,
+            'reply_count': tweet.reply_count
+        }
+        fallback = self._fallback_analysis(tweet.content, tweet.hashtags, metrics)
+        
         try:
-            metrics = {
-                'like_count': tweet.like_count,
-                'retweet_count': tweet.retweet_count,
-                'reply_count': tweet.reply_count
-            }
-            
-            sentiment = self.analyze_tweet_sentiment(tweet.content)
-            summary = self.summarize_tweet(tweet.content)
-            topics = self.extract_topics(tweet.content)
-            importance_score = self.calculate_importance_score(
-                tweet.content, 
-                tweet.hashtags, 
-                metrics
-            )
-            
-            return {
-                'sentiment': sentiment,
-                'summary': summary,
-                'topics': topics,
-                'importance_score': importance_score
-            }
+            prompt = f"""
+            以下のツイートを分析し、次のキーを持つJSONオブジェクトのみを返してください。
+            - "sentiment": 感情。「positive」「negative」「neutral」のいずれか
+            - "summary": ツイートの簡潔な要約（50文字以内）
+            - "topics": 主要なトピックやキーワードの配列。例: ["トピック1", "トピック2"]
+            - "importance_score": 重要度（0.0から1.0の数値）。スキー場情報、雪の状況、営業情報などが含まれている場合は高いスコアをつけてください
+            
+            ツイート: {tweet.content}
+            ハッシュタグ: {', '.join(tweet.hashtags)}
+            いいね数: {metrics['like_count']}
+            リツイート数: {metrics['retweet_count']}
+            
+            JSON:
+            """
             
+            response = self.model.generate_content(prompt)
+            try:
+                result = json.loads(extract_json_text(response.text))
+                if not isinstance(result, dict):
+                    raise ValueError(f"unexpected JSON type: {type(result).__name__}")
+            except ValueError:
+                # パースできない応答はキャッシュに残さない
+                self.model.invalidate(prompt)
+                raise
         except Exception as e:
             logger.error(f"Error in comprehensive analysis: {e}")
-            return {
-                'sentiment': 'neutral',
-                'summary': tweet.content[:50] + "..." if len(tweet.content) > 50 else tweet.content,
-                'topics': [],
-                'importance_score': 0.0
-            }
+            return fallback
+        
+        return validate_comprehensive_analysis(result, fallback)
+    
+    def _fallback_analysis(self, text: str, hashtags: List[str], metrics: Dict) -> Dict:
+        """AIを使わない分析結果（各フィールドのフォールバック）"""
+        return {
+            'sentiment': 'neutral',
+            'summary': text[:50] + "..." if len(text) > 50 else text,
+            'topics': [],
+            'importance_score': self._calculate_basic_importance_score(text, hashtags, metrics)
+        }
+
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+def extract_json_text(text: str) -> str:
+    """AIの応答からJSON部分を取り出す（```json``` コードブロックに包まれている場合がある）"""
+    text = text.strip()
+    if '```json' in text:
+        text = text.split('```json', 1)[1].split('```', 1)[0]
+    elif '```' in text:
+        text = text.split('```', 2)[1]
+    return text.strip()
+
+
+def validate_comprehensive_analysis(result: Dict, fallback: Dict) -> Dict:
+    """包括分析の応答をフィールドごとに検証し、不正なフィールドは fallback の値を使う"""
+    analysis = dict(fallback)
+    
+    sentiment = str(result.get('sentiment', '')).strip().lower()
+    matched = [value for value in SENTIMENTS if value in sentiment]
+    if matched:
+        analysis['sentiment'] = matched[0]
+    
+    summary = result.get('summary')
+    if isinstance(summary, str) and summary.strip():
+        analysis['summary'] = summary.strip()
+    
+    topics = result.get('topics')
+    if isinstance(topics, list):
+        analysis['topics'] = [str(topic).strip() for topic in topics if str(topic).strip()]
+    
+    try:
+        analysis['importance_score'] = max(0.0, min(1.0, float(result['importance_score'])))
+    except (KeyError, TypeError, ValueError):
+        pass
+    
+    return analysis
+
+
+# 默认提示词：关注滑雪场信息
+DEFAULT_RELEVANCE_PROMPT = """
+你是一个专业的滑雪信息分析助手。请判断以下推文是否包含有价值的滑雪相关信息。
+
+重点关注：
+- 滑雪场营业信息（开放时间、关闭通知）
+- 雪况报告（积雪深度、雪质）
+- 天气预报（降雪、气温）
+- 活动公告（比赛、特别活动）
+- 设施更新（缆车、餐厅）
+- 折扣优惠信息
+
+请不要推荐：
+- 纯粹的社交闲聊
+- 无关的广告
+- 低质量内容
+"""
+
+# 分批时预计的每条输出token数：相关度分析每条推文一个对象，规则筛选每个匹配的（推文, 规则）一个对象
+RELEVANCE_OUTPUT_TOKENS = 80
+MATCH_OUTPUT_TOKENS = 40
 
 
 class AIService:
@@ -194,42 +284,35 @@ class AIService:
     def __init__(self):
         self.gemini_service = GeminiService()
     
-    def analyze_tweet_relevance(self, tweet_content: str, user_prompt: str = None) -> Dict:
+    def analyze_tweet_relevance(self, tweet_content: str, user_prompt: str = None,
+                                hashtags: List[str] = None) -> Dict:
         """
         分析推文是否与用户需求相关
         
         Args:
             tweet_content: 推文内容
             user_prompt: 用户自定义的判断标准（可选）
+            hashtags: 推文的话题标签（可选，与批量分析相同的预筛选打分）
         
         Returns:
             {
                 'is_relevant': bool,  # 是否相关
                 'score': float,  # 相关度评分 0-1
                 'reason': str,  # AI推荐理由
-                'summary': str  # 推文摘要
+                'summary': str,  # 推文摘要
+                'source': str  # 判断来源：'llm' / 'prefilter' / 'heuristic'
             }
         """
+        # 默认标准（滑雪信息）下，先用本地预筛选排除明显无关的推文
+        prefilter = get_prefilter() if user_prompt is None else None
+        prefilter_score = None
+        if prefilter is not None:
+            prefilter_score = prefilter.score(tweet_content, hashtags)
+            if prefilter.should_skip(prefilter_score):
+                return prefilter.skipped_result(tweet_content, prefilter_score)
+        
         try:
-            # 默认提示词：关注滑雪场信息
-            default_prompt = """
-            你是一个专业的滑雪信息分析助手。请判断以下推文是否包含有价值的滑雪相关信息。
-            
-            重点关注：
-            - 滑雪场营业信息（开放时间、关闭通知）
-            - 雪况报告（积雪深度、雪质）
-            - 天气预报（降雪、气温）
-            - 活动公告（比赛、特别活动）
-            - 设施更新（缆车、餐厅）
-            - 折扣优惠信息
-            
-            请不要推荐：
-            - 纯粹的社交闲聊
-            - 无关的广告
-            - 低质量内容
-            """
-            
-            prompt = user_prompt or default_prompt
+            prompt = user_prompt or DEFAULT_RELEVANCE_PROMPT
             
             analysis_prompt = f"""
             {prompt}
@@ -262,23 +345,136 @@ class AIService:
                     result_text = result_text[json_start:json_end].strip()
                 
                 result = json.loads(result_text)
+                if prefilter_score is not None:
+                    prefilter.record_agreement(prefilter_score, result.get('is_relevant', False))
                 
                 return {
                     'is_relevant': result.get('is_relevant', False),
                     'score': float(result.get('score', 0.0)),
                     'reason': result.get('reason', ''),
-                    'summary': result.get('summary', tweet_content[:50])
+                    'summary': result.get('summary', tweet_content[:50]),
+                    'source': 'llm'
                 }
                 
             except json.JSONDecodeError:
-                # 如果JSON解析失败，使用启发式方法
+                # 如果JSON解析失败，使用启发式方法（从缓存中删除，下次重新请求）
                 logger.warning(f"Failed to parse AI response as JSON: {result_text}")
+                self.gemini_service.model.invalidate(analysis_prompt)
                 return self._heuristic_relevance_check(tweet_content)
                 
         except Exception as e:
             logger.error(f"Error in AI relevance analysis: {e}")
             return self._heuristic_relevance_check(tweet_content)
     
+    def analyze_tweets_relevance(self, tweets: List[Tweet], user_prompt: str = None,
+                                 batch_size: int = None) -> Dict[str, Dict]:
+        """
+        批量分析推文是否与用户需求相关（按token预算把多条推文打包成一次请求）
+        
+        Args:
+            tweets: 推文列表
+            user_prompt: 用户自定义的判断标准（可选）
+            batch_size: 每次请求的最多推文数（默认: AI_RELEVANCE_BATCH_SIZE）
+        
+        Returns:
+            {tweet_id: analyze_tweet_relevance 相同格式的结果}，
+            AI未返回或请求失败的推文使用启发式结果
+        """
+        batch_size = batch_size or getattr(settings, 'AI_RELEVANCE_BATCH_SIZE', 20)
+        results = {}
+        
+        # 默认标准（滑雪信息）下，明显无关的推文不发送给AI
+        prefilter = get_prefilter() if user_prompt is None else None
+        prefilter_scores = {}
+        pending = []
+        for tweet in tweets:
+            if prefilter is not None:
+                score = prefilter.score(tweet.content, tweet.hashtags)
+                if prefilter.should_skip(score):
+                    results[tweet.tweet_id] = prefilter.skipped_result(tweet.content, score)
+                    continue
+                prefilter_scores[tweet.tweet_id] = score
+            pending.append(tweet)
+        
+        # 各批次并行请求（受 AI_MAX_CONCURRENCY 和配额限制），结果在当前线程合并
+        batches = plan_batches(pending, tweet_tokens, RELEVANCE_OUTPUT_TOKENS, max_items=batch_size)
+        for batch_results, answered in run_parallel(
+            lambda batch: self._analyze_relevance_batch(batch, user_prompt), batches
+        ):
+            results.update(batch_results)
+            for tweet_id in answered & prefilter_scores.keys():
+                prefilter.record_agreement(prefilter_scores[tweet_id], batch_results[tweet_id]['is_relevant'])
+        return results
+    
+    def _analyze_relevance_batch(self, tweets: List[Tweet], user_prompt: str = None) -> Tuple[Dict[str, Dict], set]:
+        """分析一批推文（回应不完整时拆分重试），返回 (结果, AI实际给出结果的推文ID)"""
+        results = {}
+        for _, sub_results in split_and_retry(tweets, lambda batch: self._request_relevance(batch, user_prompt)):
+            results.update(sub_results)
+        
+        # 只保留本批次的推文，缺失的使用启发式方法
+        batch_results = {}
+        answered = set()
+        for tweet in tweets:
+            result = results.get(str(tweet.tweet_id))
+            if result is None:
+                result = self._heuristic_relevance_check(tweet.content)
+            else:
+                answered.add(tweet.tweet_id)
+                if not result['summary']:
+                    result['summary'] = tweet.content[:50]
+            batch_results[tweet.tweet_id] = result
+        return batch_results, answered
+    
+    def _request_relevance(self, tweets: List[Tweet], user_prompt: str = None) -> Dict[str, Dict]:
+        """一次请求分析一批推文；回应不是完整的JSON数组时抛出 MalformedResponseError"""
+        tweets_text = "\n\n".join([
+            f"推文{i+1} (ID: {tweet.tweet_id}):\n{tweet.content}"
+            for i, tweet in enumerate(tweets)
+        ])
+        
+        analysis_prompt = f"""
+        {user_prompt or DEFAULT_RELEVANCE_PROMPT}
+        
+        以下是需要分析的推文：
+        {tweets_text}
+        
+        请分析每一条推文，以JSON数组格式返回结果（每条推文一个对象）：
+        [
+            {{
+                "tweet_id": "推文ID",
+                "is_relevant": true/false,
+                "score": 0.0-1.0,
+                "reason": "推荐理由（如果相关）或不推荐原因",
+                "summary": "推文的简短摘要（20字以内）"
+            }}
+        ]
+        """
+        
+        response = self.gemini_service.model.generate_content(analysis_prompt)
+        try:
+            items = json.loads(extract_json_text(response.text))
+            if not isinstance(items, list):
+                raise MalformedResponseError(f"expected a JSON array, got {type(items).__name__}")
+        except (json.JSONDecodeError, MalformedResponseError) as e:
+            # 从缓存中删除，拆分重试和下次运行时重新请求模型
+            self.gemini_service.model.invalidate(analysis_prompt)
+            raise MalformedResponseError(str(e))
+        
+        results = {}
+        for item in items:
+            try:
+                results[str(item.get('tweet_id', ''))] = {
+                    'is_relevant': bool(item.get('is_relevant', False)),
+                    'score': float(item.get('score', 0.0)),
+                    'reason': item.get('reason', ''),
+                    'summary': item.get('summary', ''),
+                    'source': 'llm'
+                }
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return results
+    
     def _heuristic_relevance_check(self, tweet_content: str) -> Dict:
         """启发式相关性检查（当AI调用失败时使用）"""
         ski_keywords = [
@@ -296,7 +492,8 @@ class AIService:
             'is_relevant': is_relevant,
             'score': score,
             'reason': f'包含{keyword_count}个滑雪相关关键词' if is_relevant else '未包含足够的滑雪相关信息',
-            'summary': tweet_content[:50] + ('...' if len(tweet_content) > 50 else '')
+            'summary': tweet_content[:50] + ('...' if len(tweet_content) > 50 else ''),
+            'source': 'heuristic'
         }
 
 
@@ -319,6 +516,9 @@ def analyze_tweet_with_ai(tweet_id: int) -> Optional[AIAnalysis]:
             topics=analysis_result['topics'],
             importance_score=analysis_result['importance_score']
         )
+        # 要約も全文検索の対象、トピックはタグの索引に追加
+        update_search_documents([tweet.id])
+        update_tweet_tags([tweet.id])
         
         return ai_analysis
         
@@ -330,6 +530,25 @@ def analyze_tweet_with_ai(tweet_id: int) -> Optional[AIAnalysis]:
         return None
 
 
+def record_rule_evaluations(prompt_rule: AIPromptRule, tweets: List[Tweet], matched_ids) -> None:
+    """记录规则对这些推文的判断结果（规则版本为当前提示词的哈希，已有记录覆盖为最新结果）"""
+    rule_version = prompt_rule.version_hash
+    RuleEvaluation.objects.bulk_create(
+        [
+            RuleEvaluation(
+                rule=prompt_rule,
+                tweet=tweet,
+                rule_version=rule_version,
+                matched=tweet.id in matched_ids
+            )
+            for tweet in tweets
+        ],
+        update_conflicts=True,
+        unique_fields=['rule', 'tweet'],
+        update_fields=['rule_version', 'matched', 'evaluated_at']
+    )
+
+
 class AIRecommendationService:
     """AI推荐服务 - 基于自定义prompt规则筛选推文"""
     
@@ -351,9 +570,38 @@ class AIRecommendationService:
         Returns:
             List of (tweet, reason, score) tuples for matching tweets
         """
-        if not tweets:
-            return []
+        matched_tweets = []
+        for _, matches in self._evaluate_rule(tweets, prompt_rule):
+            matched_tweets.extend(matches)
+        return matched_tweets
+    
+    def _evaluate_rule(
+        self,
+        tweets: List[Tweet],
+        prompt_rule: AIPromptRule
+    ) -> Iterator[Tuple[List[Tweet], List[Tuple[Tweet, str, float]]]]:
+        """
+        按token预算分批用规则判断推文（各批次并行请求，回应不完整时拆分重试）
+        
+        Yields:
+            (AI实际判断了的推文, 其中匹配的 (tweet, reason, score))；
+            AI调用或解析失败的推文不会出现（与"没有匹配"区分）
+        """
+        def evaluate(batch):
+            return list(split_and_retry(batch, lambda sub_batch: self._request_rule_matches(sub_batch, prompt_rule)))
         
+        max_items = getattr(settings, 'AI_RULE_BATCH_SIZE', 50)
+        batches = plan_batches(tweets, tweet_tokens, MATCH_OUTPUT_TOKENS, max_items=max_items)
+        for evaluated_parts in run_parallel(evaluate, batches):
+            yield from evaluated_parts
+    
+    def _request_rule_matches(
+        self,
+        tweets: List[Tweet],
+        prompt_rule: AIPromptRule
+    ) -> List[Tuple[Tweet, str, float]]:
+        """一次请求用规则判断一批推文；回应不是完整的JSON数组时抛出 MalformedResponseError"""
+        result_text = ''
         try:
             # 构建批量分析的prompt
             tweets_text = "\n\n".join([
@@ -390,40 +638,38 @@ class AIRecommendationService:
             
             response = self.gemini.model.generate_content(prompt)
             result_text = response.text.strip()
-            
-            # 提取JSON部分
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            # 解析JSON结果
-            results = json.loads(result_text)
+            results = json.loads(extract_json_text(result_text))
+            if not isinstance(results, list):
+                raise MalformedResponseError(f"expected a JSON array, got {type(results).__name__}")
             
             # 构建返回结果
             matched_tweets = []
             tweet_dict = {str(tweet.tweet_id): tweet for tweet in tweets}
             
             for result in results:
-                if result.get('match', False):
-                    tweet_id = str(result['tweet_id'])
-                    if tweet_id in tweet_dict:
-                        matched_tweets.append((
-                            tweet_dict[tweet_id],
-                            result.get('reason', '符合筛选规则'),
-                            float(result.get('relevance_score', 0.8))
-                        ))
+                try:
+                    if result.get('match', False):
+                        tweet_id = str(result['tweet_id'])
+                        if tweet_id in tweet_dict:
+                            matched_tweets.append((
+                                tweet_dict[tweet_id],
+                                result.get('reason', '符合筛选规则'),
+                                float(result.get('relevance_score', 0.8))
+                            ))
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    continue
             
             logger.info(f"Filtered {len(matched_tweets)} tweets from {len(tweets)} using rule '{prompt_rule.name}'")
             return matched_tweets
             
+        except MalformedResponseError:
+            self.gemini.model.invalidate(prompt)
+            raise
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response as JSON: {e}")
             logger.error(f"Response text: {result_text}")
-            return []
-        except Exception as e:
-            logger.error(f"Error filtering tweets with AI: {e}")
-            return []
+            # 从缓存中删除，拆分重试和下次运行时重新请求模型
+            self.gemini.model.invalidate(prompt)
+            raise MalformedResponseError(f"Failed to parse AI response as JSON: {e}")
     
     def apply_rule_to_user_tweets(
         self, 
@@ -459,7 +705,7 @@ class AIRecommendationService:
             
             # 获取这些账户的推文
             from datetime import timedelta
-            from django.db.models import Q
+            from django.db.models import Exists, OuterRef
             
             query = Tweet.objects.filter(x_account__in=accounts)
             
@@ -471,19 +717,29 @@ class AIRecommendationService:
                 week_ago = timezone.now() - timedelta(days=7)
                 query = query.filter(posted_at__gte=week_ago)
             
+            # 跳过在当前版本的规则下已经判断过的推文（包括不匹配的）
+            rule_version = prompt_rule.version_hash
+            query = query.exclude(
+                Exists(RuleEvaluation.objects.filter(
+                    rule=prompt_rule,
+                    rule_version=rule_version,
+                    tweet=OuterRef('pk')
+                ))
+            )
+            
             tweets = list(query.order_by('-posted_at'))
             
             if not tweets:
-                logger.info(f"No tweets found for user {user.email} with filter '{date_filter}'")
+                logger.info(f"No unevaluated tweets for user {user.email} with filter '{date_filter}'")
+                prompt_rule.last_applied = timezone.now()
+                prompt_rule.save(update_fields=['last_applied'])
                 return 0
             
-            # 批量处理推文（每次最多50条）
-            batch_size = 50
+            # 按token预算分批处理；AI调用失败的推文不记录判断结果，下次应用时重新判断
             total_recommended = 0
             
-            for i in range(0, len(tweets), batch_size):
-                batch = tweets[i:i + batch_size]
-                matched_tweets = self.filter_tweets_by_prompt(batch, prompt_rule)
+            for batch, matched_tweets in self._evaluate_rule(tweets, prompt_rule):
+                record_rule_evaluations(prompt_rule, batch, {tweet.id for tweet, _, _ in matched_tweets})
                 
                 # 创建推荐记录
                 for tweet, reason, score in matched_tweets:
@@ -508,4 +764,179 @@ class AIRecommendationService:
             
         except Exception as e:
             logger.error(f"Error applying rule to user tweets: {e}")
-            return 0
\ No newline at end of file
+            return 0
+    
+    def _match_tweets_multi_rule(
+        self,
+        tweets: List[Tweet],
+        rules: List[AIPromptRule]
+    ) -> List[Tuple[Tweet, AIPromptRule, str, float]]:
+        """
+        一次请求中用多条规则判断同一批推文
+        
+        Returns:
+            List of (tweet, rule, reason, score) for matches；
+            回应不是完整的JSON数组时抛出 MalformedResponseError
+        """
+        if not tweets or not rules:
+            return []
+        
+        result_text = ''
+        try:
+            rules_text = "\n".join([
+                f"规则{rule.id}: {rule.prompt}"
+                for rule in rules
+            ])
+            tweets_text = "\n\n".join([
+                f"推文{i+1} (ID: {tweet.tweet_id}):\n内容: {tweet.content}\n发布时间: {tweet.posted_at}"
+                for i, tweet in enumerate(tweets)
+            ])
+            
+            prompt = f"""
+            你是一个推文筛选助手。请分别根据以下每一条规则筛选推文：
+            
+            {rules_text}
+            
+            以下是需要筛选的推文：
+            {tweets_text}
+            
+            请分析每条推文是否符合每一条规则。
+            只返回符合规则的（推文, 规则）组合，以JSON数组的格式返回结果，例如：
+            [
+                {{"tweet_id": "123", "rule_id": {rules[0].id}, "reason": "提到了白马47滑雪场", "relevance_score": 0.95}}
+            ]
+            
+            一条推文可以符合多条规则。如果没有符合的组合，返回空数组 []
+            """
+            
+            response = self.gemini.model.generate_content(prompt)
+            result_text = response.text.strip()
+            results = json.loads(extract_json_text(result_text))
+            if not isinstance(results, list):
+                raise MalformedResponseError(f"expected a JSON array, got {type(results).__name__}")
+            
+            tweet_dict = {str(tweet.tweet_id): tweet for tweet in tweets}
+            rule_dict = {str(rule.id): rule for rule in rules}
+            matches = []
+            seen = set()
+            for result in results:
+                if not isinstance(result, dict):
+                    continue
+                tweet = tweet_dict.get(str(result.get('tweet_id')))
+                rule = rule_dict.get(str(result.get('rule_id')))
+                if tweet is None or rule is None or (tweet.id, rule.id) in seen:
+                    continue
+                try:
+                    score = float(result.get('relevance_score', 0.8))
+                except (TypeError, ValueError):
+                    # 只跳过这一条，不影响同一批次的其他结果
+                    continue
+                seen.add((tweet.id, rule.id))
+                matches.append((tweet, rule, result.get('reason', '符合筛选规则'), score))
+            return matches
+            
+        except MalformedResponseError:
+            self.gemini.model.invalidate(prompt)
+            raise
+        except json.JSONDecodeError as e:
+            logger.error(f"Response text: {result_text}")
+            # 从缓存中删除，拆分重试和下次运行时重新请求模型
+            self.gemini.model.invalidate(prompt)
+            raise MalformedResponseError(f"Failed to parse AI response as JSON: {e}")
+    
+    def apply_rules_to_new_tweets(self, x_account, tweet_ids: List[str]) -> int:
+        """
+        对账户新保存的推文一次性应用所有有效的AI规则（入库时调用）
+        
+        适用的规则: 该账户所属用户的 is_active 规则中，target_accounts 包含该账户或为空的规则。
+        每批推文只发送一次包含所有规则的请求，匹配结果批量写入 RecommendedTweet，
+        判断结果记录到 RuleEvaluation（之后 apply_ai_rule 不会再次判断这些推文）。
+        
+        Returns:
+            新创建的推荐记录数（已有的推荐记录不计入）
+        """
+        from django.db.models import Q
+        
+        rules = list(
+            AIPromptRule.objects.filter(user_id=x_account.user_id, is_active=True)
+            .filter(Q(target_accounts=x_account) | Q(target_accounts__isnull=True))
+            .distinct()
+        )
+        if not rules or not tweet_ids:
+            return 0
+        
+        tweets = list(Tweet.objects.filter(x_account=x_account, tweet_id__in=tweet_ids).order_by('-posted_at'))
+        
+        # 已在当前规则版本下判断过的（规则, 推文）组合不再判断
+        evaluated = set(
+            RuleEvaluation.objects.filter(rule__in=rules, tweet__in=tweets)
+            .values_list('rule_id', 'tweet_id', 'rule_version')
+        )
+        
+        # 按"还需要判断的规则"给推文分组，每条推文只和它未判断过的规则一起发送
+        pending = {}
+        for tweet in tweets:
+            needed = tuple(rule for rule in rules if (rule.id, tweet.id, rule.version_hash) not in evaluated)
+            if needed:
+                pending.setdefault(needed, []).append(tweet)
+        
+        jobs = []
+        for batch_rules, pending_tweets in pending.items():
+            # 每条推文的输出按所有规则都匹配估算
+            for planned_batch in plan_batches(
+                pending_tweets, tweet_tokens, MATCH_OUTPUT_TOKENS * len(batch_rules),
+                max_items=getattr(settings, 'AI_RULE_BATCH_SIZE', 50)
+            ):
+                jobs.append((planned_batch, list(batch_rules)))
+        
+        # 已有的推荐记录（bulk_create 的 ignore_conflicts 不会报告哪些行被跳过，先排除它们再计数）
+        recommended = set(
+            RecommendedTweet.objects.filter(user_id=x_account.user_id, prompt_rule__in=rules, tweet__in=tweets)
+            .values_list('tweet_id', 'prompt_rule_id')
+        )
+        
+        def evaluate(job):
+            planned_batch, batch_rules = job
+            return list(split_and_retry(
+                planned_batch, lambda sub_batch: self._match_tweets_multi_rule(sub_batch, batch_rules)
+            ))
+        
+        # 各批次并行请求，结果在当前线程写入数据库；AI调用失败的推文不记录判断结果
+        total_recommended = 0
+        for (_, batch_rules), evaluated_parts in zip(jobs, run_parallel(evaluate, jobs)):
+            for batch, matches in evaluated_parts:
+                matched_pairs = {(rule.id, tweet.id) for tweet, rule, _, _ in matches}
+                RuleEvaluation.objects.bulk_create(
+                    [
+                        RuleEvaluation(
+                            rule=rule,
+                            tweet=tweet,
+                            rule_version=rule.version_hash,
+                            matched=(rule.id, tweet.id) in matched_pairs
+                        )
+                        for rule in batch_rules
+                        for tweet in batch
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['rule', 'tweet'],
+                    update_fields=['rule_version', 'matched', 'evaluated_at']
+                )
+                
+                new_recommendations = [
+                    RecommendedTweet(
+                        user_id=x_account.user_id,
+                        tweet=tweet,
+                        prompt_rule=rule,
+                        ai_reason=reason,
+                        relevance_score=score
+                    )
+                    for tweet, rule, reason, score in matches
+                    if (tweet.id, rule.id) not in recommended
+                ]
+                RecommendedTweet.objects.bulk_create(new_recommendations, ignore_conflicts=True)
+                recommended.update((item.tweet.id, item.prompt_rule.id) for item in new_recommendations)
+                total_recommended += len(new_recommendations)
+        
+        logger.info(f"Applied {len(rules)} rules to {len(tweets)} new tweets of @{x_account.username}: "
+                    f"{total_recommended} new recommendations")
+        return total_recommended
@@ -208,6 +208,8 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# 抓取任务耗时较长，每个worker进程一次只预取一个任务，避免任务堆积在单个worker上
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 # Celery Beat スケジュール設定
 CELERY_BEAT_SCHEDULE = {
@@ -227,6 +229,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'x_monitor.tasks.monitor_today_tweets',
         'schedule': crontab(hour=18, minute=0),  # 毎日18:00
     },
+    'compact-engagement-snapshots-daily': {
+        'task': 'x_monitor.tasks.compact_engagement_snapshots',
+        'schedule': crontab(hour=3, minute=30),  # 毎日3:30（時間単位のスナップショットを日単位に集約）
+    },
 }
 
 # X.com Scraper Settings
@@ -234,9 +240,107 @@ CELERY_BEAT_SCHEDULE = {
 # USE_AUTHENTICATED_SCRAPER=False: 游客模式访问（仅能看到4-6条置顶推文）
 USE_AUTHENTICATED_SCRAPER = config('USE_AUTHENTICATED_SCRAPER', default=False, cast=bool)
 
+# 时间线抓取模式
+# SCRAPER_MODE=graphql: 拦截页面的UserTweets GraphQL响应直接解码推文（失败时自动回退到DOM解析）
+# SCRAPER_MODE=dom: 等待页面渲染后解析推文DOM
+SCRAPER_MODE = config('SCRAPER_MODE', default='graphql')
+
+# 自适应渲染等待（出现新推文或网络安静即结束，代替固定sleep）
+# RENDER_DEADLINE_MS: 页面打开后等待首批推文的最长时间
+# SCROLL_DEADLINE_MS: 每次滚动后等待新推文的最长时间
+# NETWORK_QUIET_MS: 没有网络活动持续多久视为加载完成
+SCRAPER_RENDER_DEADLINE_MS = config('SCRAPER_RENDER_DEADLINE_MS', default=15000, cast=int)
+SCRAPER_SCROLL_DEADLINE_MS = config('SCRAPER_SCROLL_DEADLINE_MS', default=5000, cast=int)
+SCRAPER_NETWORK_QUIET_MS = config('SCRAPER_NETWORK_QUIET_MS', default=500, cast=int)
+
+# 推文互动数时间序列（发布后HOURLY_WINDOW_HOURS小时内按小时记录，之后按天记录）
+ENGAGEMENT_HOURLY_WINDOW_HOURS = config('ENGAGEMENT_HOURLY_WINDOW_HOURS', default=48, cast=int)
+ENGAGEMENT_DAILY_RETENTION_DAYS = config('ENGAGEMENT_DAILY_RETENTION_DAYS', default=90, cast=int)
+
+# 常驻浏览器池设置（每个worker进程只启动一次Chromium）
+# MAX_IDLE_CONTEXTS: 每种上下文配置保留的预热上下文数
+# MAX_PAGES_PER_CONTEXT / MAX_PAGES_PER_BROWSER: 累计打开页面数达到上限后回收上下文/浏览器
+# MEMORY_LIMIT_MB: Chromium进程RSS合计超过上限后回收浏览器（每 MEMORY_CHECK_INTERVAL 个页面检查一次）
+BROWSER_POOL_MAX_IDLE_CONTEXTS = config('BROWSER_POOL_MAX_IDLE_CONTEXTS', default=2, cast=int)
+BROWSER_POOL_MAX_PAGES_PER_CONTEXT = config('BROWSER_POOL_MAX_PAGES_PER_CONTEXT', default=25, cast=int)
+BROWSER_POOL_MAX_PAGES_PER_BROWSER = config('BROWSER_POOL_MAX_PAGES_PER_BROWSER', default=200, cast=int)
+BROWSER_POOL_MEMORY_LIMIT_MB = config('BROWSER_POOL_MEMORY_LIMIT_MB', default=1536, cast=int)
+BROWSER_POOL_MEMORY_CHECK_INTERVAL = config('BROWSER_POOL_MEMORY_CHECK_INTERVAL', default=10, cast=int)
+
+# 并发批量抓取设置（monitor_all_active_accounts 使用）
+# SCRAPER_BATCH_SIZE: 每批共用一个浏览器的账户数
+# SCRAPER_BATCH_CONCURRENCY: 同一浏览器内同时打开的标签页上限
+SCRAPER_BATCH_ENABLED = config('SCRAPER_BATCH_ENABLED', default=True, cast=bool)
+SCRAPER_BATCH_SIZE = config('SCRAPER_BATCH_SIZE', default=20, cast=int)
+SCRAPER_BATCH_CONCURRENCY = config('SCRAPER_BATCH_CONCURRENCY', default=4, cast=int)
+
+# 每次调度最多监控的到期账户数（按逾期时间从长到短，超出部分留到下次）
+SCHEDULER_MAX_DUE_ACCOUNTS = config('SCHEDULER_MAX_DUE_ACCOUNTS', default=200, cast=int)
+
+# 监控任务分发（monitor_all_active_accounts 为每个到期账户分发一个 monitor_single_account 子任务）
+# SCRAPER_FANOUT_ENABLED=False: 在调度任务内依次/按批监控
+# SCRAPER_TASK_QUEUE: 子任务使用的队列（为空时使用默认队列）；可以设置为 scraper 并单独启动
+#   celery -A auto_ski_info worker -Q scraper --concurrency=N，并行度即 worker数 × N
+# SCRAPER_DISPATCH_CLAIM_MINUTES: 分发后暂时推后 next_check_at 的时间，防止排队中的账户被重复分发
+# MONITOR_TASK_SOFT_TIME_LIMIT: 单个账户监控的超时（秒），超时的抓取会被中断并记录为错误
+SCRAPER_FANOUT_ENABLED = config('SCRAPER_FANOUT_ENABLED', default=True, cast=bool)
+SCRAPER_TASK_QUEUE = config('SCRAPER_TASK_QUEUE', default='')
+SCRAPER_DISPATCH_CLAIM_MINUTES = config('SCRAPER_DISPATCH_CLAIM_MINUTES', default=60, cast=int)
+MONITOR_TASK_SOFT_TIME_LIMIT = config('MONITOR_TASK_SOFT_TIME_LIMIT', default=300, cast=int)
+
+# 账户级租约（同一账户同一时间只允许一个进程抓取，见 x_monitor/account_lease.py）
+# ACCOUNT_LEASE_REDIS_URL: 保存租约的Redis（默认与Celery broker相同，Redis不可用时退回进程内租约）
+# ACCOUNT_LEASE_SECONDS: 租约有效期（秒），持有者崩溃后到期自动释放（默认为监控任务的硬超时）
+# ACCOUNT_LEASE_WAIT_SECONDS: 手动触发时等待其他进程的监控结果的最长时间（秒）
+# ACCOUNT_LEASE_REDIS_RETRY_SECONDS: Redis连接失败后，在这段时间（秒）内直接使用进程内租约，不再尝试连接
+ACCOUNT_LEASE_REDIS_URL = config('ACCOUNT_LEASE_REDIS_URL', default=CELERY_BROKER_URL)
+ACCOUNT_LEASE_SECONDS = config('ACCOUNT_LEASE_SECONDS', default=MONITOR_TASK_SOFT_TIME_LIMIT + 60, cast=int)
+ACCOUNT_LEASE_WAIT_SECONDS = config('ACCOUNT_LEASE_WAIT_SECONDS', default=120, cast=int)
+ACCOUNT_LEASE_REDIS_RETRY_SECONDS = config('ACCOUNT_LEASE_REDIS_RETRY_SECONDS', default=60, cast=int)
+
 # Gemini AI settings
 # ローカルでは環境変数、Cloud Run では Secret Manager から取得
 GEMINI_API_KEY = config('AI_API_KEY_GOOGLE', default='')
+# AI后端（ai_service/backends.py）：'gemini' 或 'stub'（离线的确定性桩，用于基准测试/压测，不需要网络和配额）
+AI_BACKEND = config('AI_BACKEND', default='gemini')
+AI_GEMINI_MODEL = config('AI_GEMINI_MODEL', default='gemini-pro')
+# 桩的响应延迟（固定部分 + 每1000个输入/输出token）和故障注入（配额错误 / JSON被截断的比例）
+AI_STUB_LATENCY_MS = config('AI_STUB_LATENCY_MS', default=200, cast=float)
+AI_STUB_MS_PER_1K_TOKENS = config('AI_STUB_MS_PER_1K_TOKENS', default=0, cast=float)
+AI_STUB_FAILURE_RATE = config('AI_STUB_FAILURE_RATE', default=0.0, cast=float)
+AI_STUB_TRUNCATE_RATE = config('AI_STUB_TRUNCATE_RATE', default=0.0, cast=float)
+# Gemini 调用的流量控制（ai_service/llm_client.py，进程内所有AI服务共享）
+# 多个 Celery worker 时按 worker 数分配每分钟的请求数/token数
+AI_MAX_CONCURRENCY = config('AI_MAX_CONCURRENCY', default=4, cast=int)
+AI_REQUESTS_PER_MINUTE = config('AI_REQUESTS_PER_MINUTE', default=60, cast=int)
+AI_TOKENS_PER_MINUTE = config('AI_TOKENS_PER_MINUTE', default=120000, cast=int)
+AI_REQUEST_TIMEOUT_SECONDS = config('AI_REQUEST_TIMEOUT_SECONDS', default=60, cast=int)
+# 配额超出等临时错误的重试次数（指数退避：AI_RETRY_BASE_SECONDS × 2^n）
+AI_MAX_RETRIES = config('AI_MAX_RETRIES', default=4, cast=int)
+AI_RETRY_BASE_SECONDS = config('AI_RETRY_BASE_SECONDS', default=2.0, cast=float)
+# 批量AI请求按token预算打包推文（ai_service/batching.py）：推文部分的输入上限 / 预计输出上限
+AI_BATCH_INPUT_TOKEN_BUDGET = config('AI_BATCH_INPUT_TOKEN_BUDGET', default=8000, cast=int)
+AI_BATCH_OUTPUT_TOKEN_BUDGET = config('AI_BATCH_OUTPUT_TOKEN_BUDGET', default=2048, cast=int)
+# 推荐分析时每次AI请求最多打包的推文数
+AI_RELEVANCE_BATCH_SIZE = config('AI_RELEVANCE_BATCH_SIZE', default=20, cast=int)
+# 本地预筛选（ai_service/prefilter.py）：分数低于阈值的推文不调用AI，直接判断为无关
+# 线性模型用 python manage.py train_relevance_prefilter 训练（没有模型文件时只打分、不跳过任何推文）
+AI_PREFILTER_ENABLED = config('AI_PREFILTER_ENABLED', default=True, cast=bool)
+AI_PREFILTER_THRESHOLD = config('AI_PREFILTER_THRESHOLD', default=0.1, cast=float)
+AI_PREFILTER_MODEL_PATH = config('AI_PREFILTER_MODEL_PATH', default=str(BASE_DIR / 'data' / 'relevance_prefilter.json'))
+# 新しい推文入库时自动应用所有有效的AI规则（一批推文一次请求，包含所有规则）
+AI_RULES_ON_INGEST = config('AI_RULES_ON_INGEST', default=True, cast=bool)
+# 规则筛选时每次AI请求最多打包的推文数
+AI_RULE_BATCH_SIZE = config('AI_RULE_BATCH_SIZE', default=50, cast=int)
+
+# LLM応答キャッシュ（ai_service/llm_cache.py）
+# LLM_CACHE_REDIS_URL: ワーカー間で共有するRedis（デフォルトはCelery broker、空の場合はプロセス内のみ）
+# LLM_CACHE_TTL_SECONDS: キャッシュの有効期限（秒）
+# LLM_CACHE_LOCAL_MAX_ENTRIES: プロセス内LRUの最大件数
+LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default=True, cast=bool)
+LLM_CACHE_REDIS_URL = config('LLM_CACHE_REDIS_URL', default=CELERY_BROKER_URL)
+LLM_CACHE_TTL_SECONDS = config('LLM_CACHE_TTL_SECONDS', default=7 * 24 * 3600, cast=int)
+LLM_CACHE_LOCAL_MAX_ENTRIES = config('LLM_CACHE_LOCAL_MAX_ENTRIES', default=1024, cast=int)
 
 # Logging
 LOGGING = {
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+AI分析のベンチマーク：ツイート1件あたりの generate_content 呼び出し回数と所要時間
+
+旧方式（感情・要約・トピック・重要度を個別に呼び出す）と
+analyze_tweet_comprehensive（1回の構造化出力）を比較する。
+ネットワークを使わず、固定の応答遅延を持つダミーモデルで計測する。
+
+使用方法:
+    python benchmark_ai_analysis.py [--tweets 20] [--latency-ms 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auto_ski_info.settings')
+sys.path.insert(0, os.path.dirname(__file__))
+django.setup()
+
+from ai_service.services import GeminiService
+from x_monitor.models import Tweet
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class CountingModel:
+    """generate_content の呼び出し回数を数え、latency 秒待ってからJSONを返す"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return FakeResponse(
+            '{"sentiment": "positive", "summary": "本日オープン", '
+            '"topics": ["営業情報", "積雪"], "importance_score": 0.8}'
+        )
+
+
+def per_field_analysis(service, tweet):
+    """変更前の analyze_tweet_comprehensive と同じ呼び出し方"""
+    metrics = {
+        'like_count': tweet.like_count,
+        'retweet_count': tweet.retweet_count,
+        'reply_count': tweet.reply_count
+    }
+    return {
+        'sentiment': service.analyze_tweet_sentiment(tweet.content),
+        'summary': service.summarize_tweet(tweet.content),
+        'topics': service.extract_topics(tweet.content),
+        'importance_score': service.calculate_importance_score(tweet.content, tweet.hashtags, metrics)
+    }
+
+
+def run(label, analyze, tweets, latency):
+    service = GeminiService.__new__(GeminiService)
+    service.model = CountingModel(latency)
+
+    started = time.perf_counter()
+    for tweet in tweets:
+        analyze(service, tweet)
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<14} calls/tweet: {service.model.calls / len(tweets):.1f}  "
+          f"latency/tweet: {elapsed / len(tweets) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tweets', type=int, default=20)
+    parser.add_argument('--latency-ms', type=int, default=300, help='ダミーモデルの応答遅延')
+    args = parser.parse_args()
+
+    tweets = [
+        Tweet(tweet_id=str(i), content=f'本日オープン！積雪{100 + i}cm #スキー場', hashtags=['#スキー場'],
+              like_count=i, retweet_count=0, reply_count=0)
+        for i in range(args.tweets)
+    ]
+    latency = args.latency_ms / 1000
+
+    print(f"{args.tweets} tweets, model latency {args.latency_ms}ms")
+    run('before (4x)', per_field_analysis, tweets, latency)
+    run('after (1x)', GeminiService.analyze_tweet_comprehensive, tweets, latency)
+
+
+if __name__ == '__main__':
+    main()
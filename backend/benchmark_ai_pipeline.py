@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+AIパイプライン全体のベンチマーク（ネットワーク・クォータ不要）
+
+AI_BACKEND='stub' のスタブモデルで、一時的なテスト用データベースにツイートとルールを作成し、
+次の3つの処理のスループットを計測する：
+
+- analyze_tweets_for_recommendation（関連度のバッチ分析）
+- apply_rule_to_user_tweets（ルールごとの判定）
+- apply_rules_to_new_tweets（入庫時の複数ルール一括判定）
+
+応答遅延・クォータエラー・途中で切れたJSONを注入して、並列度やバッチ分割の効果を比較できる。
+LLMキャッシュは無効にして計測する。
+
+使用方法:
+    python benchmark_ai_pipeline.py [--tweets 200] [--rules 3] [--latency-ms 300]
+        [--concurrency 4] [--failure-rate 0.05] [--truncate-rate 0.1]
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auto_ski_info.settings')
+sys.path.insert(0, os.path.dirname(__file__))
+django.setup()
+
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from ai_service.backends import get_backend
+from ai_service.services import AIRecommendationService
+from x_monitor.models import AIPromptRule, Tweet, XAccount
+from x_monitor.tasks import analyze_tweets_for_recommendation
+
+SAMPLE_TEXTS = [
+    '本日オープン！積雪{n}cm、パウダーコンディションです #スキー場',
+    'リフト{n}基が運行中。ゴンドラは強風のため運休しています',
+    '新メニューのカレーが登場しました。ぜひお試しください',
+    'ナイター営業は{n}時まで。シーズン券の販売は今週末まで',
+    '週末の天気予報：降雪の見込み。気温はマイナス{n}度',
+]
+
+
+def create_tweets(account, count, offset=0):
+    now = timezone.now()
+    tweets = []
+    for i in range(offset, offset + count):
+        text = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)].format(n=i % 50 + 1)
+        # 長文のツイートも混ぜる（トークン予算によるバッチ分割を確認するため）
+        if i % 7 == 0:
+            text = text + ' 詳細はこちら。' * 30
+        tweets.append(Tweet(x_account=account, tweet_id=str(100000 + i), content=text,
+                            posted_at=now - timezone.timedelta(minutes=i)))
+    Tweet.objects.bulk_create(tweets)
+    return [tweet.tweet_id for tweet in tweets]
+
+
+def measure(label, count, func):
+    stats = get_backend().create_model().stats
+    before = dict(stats)
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    delta = {name: stats[name] - before.get(name, 0) for name in ('calls', 'failures', 'truncated')}
+    print(f"{label:<22} tweets: {count:>5}  calls: {delta['calls']:>4}  "
+          f"injected errors: {delta['failures']:>3}  truncated: {delta['truncated']:>3}  "
+          f"time: {elapsed:6.2f}s  throughput: {count / elapsed:7.1f} tweets/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tweets', type=int, default=200)
+    parser.add_argument('--rules', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=300, help='スタブの応答遅延')
+    parser.add_argument('--ms-per-1k-tokens', type=float, default=0, help='1000トークンあたりの追加遅延')
+    parser.add_argument('--concurrency', type=int, default=4, help='AI_MAX_CONCURRENCY')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='クォータエラーを返す割合')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='途中で切れたJSONを返す割合')
+    args = parser.parse_args()
+
+    overrides = override_settings(
+        AI_BACKEND='stub',
+        AI_STUB_LATENCY_MS=args.latency_ms,
+        AI_STUB_MS_PER_1K_TOKENS=args.ms_per_1k_tokens,
+        AI_STUB_FAILURE_RATE=args.failure_rate,
+        AI_STUB_TRUNCATE_RATE=args.truncate_rate,
+        AI_MAX_CONCURRENCY=args.concurrency,
+        AI_RETRY_BASE_SECONDS=0.05,
+        LLM_CACHE_ENABLED=False,
+        AI_RULES_ON_INGEST=False,
+    )
+    overrides.enable()
+    old_db_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(email='bench@example.com', username='bench', password='bench')
+        account = XAccount.objects.create(user=user, username='bench_resort')
+        rules = [
+            AIPromptRule.objects.create(user=user, name=f'rule{i}', prompt=f'ベンチマーク用ルール{i}：営業情報と雪の状況')
+            for i in range(args.rules)
+        ]
+        create_tweets(account, args.tweets)
+
+        print(f"stub backend: latency {args.latency_ms:.0f}ms, concurrency {args.concurrency}, "
+              f"failure rate {args.failure_rate}, truncate rate {args.truncate_rate}")
+        measure('relevance analysis', args.tweets, lambda: analyze_tweets_for_recommendation(account.id))
+
+        service = AIRecommendationService()
+        measure('apply rules (each)', args.tweets * len(rules), lambda: [
+            service.apply_rule_to_user_tweets(user, rule, date_filter='all') for rule in rules
+        ])
+
+        new_ids = create_tweets(account, args.tweets, offset=args.tweets)
+        measure('rules at ingestion', args.tweets * len(rules),
+                lambda: service.apply_rules_to_new_tweets(account, new_ids))
+    finally:
+        connection.creation.destroy_test_db(old_db_name, verbosity=0)
+        overrides.disable()
+
+
+if __name__ == '__main__':
+    main()
@@ -151,6 +151,12 @@ class MCPAccountResourceSerializer(serializers.ModelSerializer):
         return "application/json"
     
     def get_metadata(self, obj):
+        # Tweet counts are annotated by MCPAccountResourceViewSet; query only
+        # when serializing an account on its own.
+        if not hasattr(obj, 'total_tweets'):
+            obj.total_tweets = obj.tweets.count()
+            obj.analyzed_tweets = obj.tweets.filter(ai_analyzed=True).count()
+            obj.relevant_tweets = obj.tweets.filter(ai_relevant=True).count()
         return {
             'username': obj.username,
             'display_name': obj.display_name,
@@ -159,9 +165,9 @@ class MCPAccountResourceSerializer(serializers.ModelSerializer):
             'is_active': obj.is_active,
             'monitoring_interval': obj.monitoring_interval,
             'ai_filter_enabled': obj.ai_filter_enabled,
-            'total_tweets': obj.tweets.count(),
-            'analyzed_tweets': obj.tweets.filter(ai_analyzed=True).count(),
-            'relevant_tweets': obj.tweets.filter(ai_relevant=True).count(),
+            'total_tweets': obj.total_tweets,
+            'analyzed_tweets': obj.analyzed_tweets,
+            'relevant_tweets': obj.relevant_tweets,
             'last_checked': obj.last_checked.isoformat() if obj.last_checked else None,
             'created_at': obj.created_at.isoformat(),
         }
@@ -1,12 +1,14 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Prefetch
+from django.db.models import Count, Prefetch, Q
 from django.utils import timezone
 from datetime import timedelta
 
 from x_monitor.models import Tweet, XAccount, AIAnalysis
+from x_monitor.pagination import KeysetPagination
+from x_monitor.search import search_tweets
+from x_monitor.tags import TAG_KINDS, filter_by_tags, parse_tags, top_tags
 from .serializers import (
     MCPTweetResourceSerializer,
     MCPTweetListSerializer,
@@ -14,8 +16,14 @@ from .serializers import (
 )
 
 
-class MCPResourcePagination(PageNumberPagination):
-    """Custom pagination for MCP resources."""
+class MCPResourcePagination(KeysetPagination):
+    """
+    Cursor pagination for MCP resources.
+    
+    Pages follow the queryset ordering (importance, posted_at, id for tweets),
+    so each page costs the same however deep an agent pages. Follow `next`;
+    pass count=true to include the total `count`.
+    """
     page_size = 20
     page_size_query_param = 'limit'
     max_page_size = 100
@@ -32,6 +40,7 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/mcp/tweets/{tweet_id}/ - Get specific tweet resource
     - GET /api/mcp/tweets/relevant/ - List only AI-relevant tweets
     - GET /api/mcp/tweets/search/ - Search tweets by content
+    - GET /api/mcp/tweets/tags/ - Most frequent hashtags, mentions, or topics
     """
     serializer_class = MCPTweetResourceSerializer
     pagination_class = MCPResourcePagination
@@ -41,6 +50,10 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """
         Return tweets with AI analysis, ordered by importance and recency.
+        
+        Importance is read from Tweet.ai_importance (a copy of the AIAnalysis
+        score, -1 without one) so the tweet_importance_idx index serves the
+        order; tweets without an AIAnalysis row sort last.
         """
         queryset = Tweet.objects.select_related(
             'x_account',
@@ -48,7 +61,7 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
         ).filter(
             ai_analyzed=True  # Only return analyzed tweets
         ).order_by(
-            '-ai_analysis__importance_score',  # Higher importance first
+            '-ai_importance',  # Higher importance first
             '-posted_at'  # Then by recency
         )
         
@@ -75,7 +88,8 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
         
         Query parameters:
         - limit: Number of resources per page (default: 20, max: 100)
-        - page: Page number
+        - cursor: Opaque cursor from the previous response's next/previous link
+        - count: Include the total count when true (runs COUNT(*))
         - sentiment: Filter by sentiment (positive/negative/neutral)
         - min_importance: Minimum importance score (0.0-1.0)
         - account: Filter by account username
@@ -91,9 +105,7 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
         min_importance = request.query_params.get('min_importance')
         if min_importance:
             try:
-                queryset = queryset.filter(
-                    ai_analysis__importance_score__gte=float(min_importance)
-                )
+                queryset = queryset.filter(ai_importance__gte=float(min_importance))
             except ValueError:
                 pass
         
@@ -158,33 +170,29 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        Search tweets by content, topics, or hashtags.
+        Search tweets by content, topics, hashtags, or mentions.
         
         Query parameters:
-        - q: Search query
-        - topics: Filter by topics (comma-separated)
-        - hashtags: Filter by hashtags (comma-separated)
+        - q: Search query (full-text over content, AI summary and hashtags;
+          results are ordered by relevance)
+        - topics: Filter by AI topics (comma-separated)
+        - hashtags: Filter by hashtags (comma-separated, leading # optional)
+        - mentions: Filter by mentioned accounts (comma-separated, leading @ optional)
+        - match: 'all' (default) requires every listed value, 'any' requires at least one
+        
+        Tag filters use the normalized TweetTag index (x_monitor/tags.py).
         """
         queryset = self.get_queryset()
         
         query = request.query_params.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(content__icontains=query) |
-                Q(ai_analysis__summary__icontains=query)
-            )
-        
-        topics = request.query_params.get('topics')
-        if topics:
-            topic_list = [t.strip() for t in topics.split(',')]
-            for topic in topic_list:
-                queryset = queryset.filter(ai_analysis__topics__contains=[topic])
+            queryset = search_tweets(queryset, query)
         
-        hashtags = request.query_params.get('hashtags')
-        if hashtags:
-            hashtag_list = [h.strip() for h in hashtags.split(',')]
-            for hashtag in hashtag_list:
-                queryset = queryset.filter(hashtags__contains=[hashtag])
+        match_all = request.query_params.get('match', 'all') != 'any'
+        for kind, param in (('topic', 'topics'), ('hashtag', 'hashtags'), ('mention', 'mentions')):
+            values = parse_tags(request.query_params.get(param))
+            if values:
+                queryset = filter_by_tags(queryset, kind, values, match_all=match_all)
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -204,6 +212,45 @@ class MCPTweetResourceViewSet(viewsets.ReadOnlyModelViewSet):
             'total_count': queryset.count(),
         })
     
+    @action(detail=False, methods=['get'])
+    def tags(self, request):
+        """
+        List the most frequent hashtags, mentions, or AI topics.
+        
+        Query parameters:
+        - kind: hashtag (default), mention, or topic
+        - days: Only count tweets from last N days (default: 7, 0 for all time)
+        - limit: Number of tags (default: 20, max: 100)
+        """
+        kind = request.query_params.get('kind', 'hashtag')
+        if kind not in TAG_KINDS:
+            return Response(
+                {'error': f"kind must be one of: {', '.join(TAG_KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            days = int(request.query_params.get('days', 7))
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), MCPResourcePagination.max_page_size)
+        except ValueError:
+            return Response(
+                {'error': 'days and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Same tweets as get_queryset(): analyzed, and the user's own when authenticated
+        tweets = {'ai_analyzed': True}
+        if request.user.is_authenticated:
+            tweets['x_account__user'] = request.user
+        since = timezone.now() - timedelta(days=days) if days > 0 else None
+        
+        return Response({
+            'mcp_version': '1.0',
+            'resource_type': 'tag',
+            'kind': kind,
+            'days': days,
+            'tags': top_tags(kind, since=since, tweets=tweets, limit=limit),
+        })
+    
     @action(detail=False, methods=['get'])
     def by_sentiment(self, request, sentiment=None):
         """
@@ -257,8 +304,12 @@ class MCPAccountResourceViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'username'
     
     def get_queryset(self):
-        """Return active X accounts."""
-        queryset = XAccount.objects.filter(is_active=True)
+        """Return active X accounts with their tweet counts annotated."""
+        queryset = XAccount.objects.filter(is_active=True).annotate(
+            total_tweets=Count('tweets'),
+            analyzed_tweets=Count('tweets', filter=Q(tweets__ai_analyzed=True)),
+            relevant_tweets=Count('tweets', filter=Q(tweets__ai_relevant=True)),
+        )
         
         user = self.request.user
         if user.is_authenticated:
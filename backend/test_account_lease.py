@@ -0,0 +1,107 @@
+"""
+测试账户级租约（使用进程内的租约存储，不需要Redis）
+"""
+import threading
+import time
+from unittest import mock
+from django.test import TestCase, override_settings
+from accounts.models import User
+from x_monitor import account_lease
+from x_monitor.account_lease import AccountLease, LocalLeaseStore, get_lease_store, run_exclusive
+from x_monitor.models import XAccount
+from x_monitor.services import XMonitorService
+
+
+@override_settings(ACCOUNT_LEASE_REDIS_URL='')
+@mock.patch.object(account_lease, 'WAIT_POLL_SECONDS', 0.01)
+@mock.patch.object(account_lease, '_local_store', new_callable=LocalLeaseStore)
+class AccountLeaseTestCase(TestCase):
+    def test_loser_skips_without_waiting(self, store):
+        """定时任务没拿到租约时直接跳过，不启动抓取"""
+        holder = AccountLease(1)
+        self.assertTrue(holder.acquire())
+        scrape = mock.Mock(return_value={'success': True, 'new_tweets': 1})
+
+        result = run_exclusive(1, scrape, wait=False)
+        self.assertTrue(result['skipped'])
+        scrape.assert_not_called()
+
+        holder.release()
+        self.assertEqual(run_exclusive(1, scrape, wait=False)['new_tweets'], 1)
+
+    def test_concurrent_request_reuses_in_flight_result(self, store):
+        """同时触发同一账户时只抓取一次，等待方复用结果"""
+        started = threading.Event()
+        finish = threading.Event()
+        calls = []
+
+        def scrape():
+            calls.append(1)
+            started.set()
+            finish.wait(5)
+            return {'success': True, 'new_tweets': 2}
+
+        results = {}
+        first = threading.Thread(target=lambda: results.setdefault('first', run_exclusive(1, scrape)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.setdefault('second', run_exclusive(1, scrape)))
+        second.start()
+        time.sleep(0.05)
+        finish.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results['first'], {'success': True, 'new_tweets': 2})
+        self.assertEqual(results['second'], {'success': True, 'new_tweets': 2, 'reused': True})
+
+    def test_expired_lease_recovered(self, store):
+        """持有者崩溃（没有释放租约）时，租约到期后等待方自己抓取"""
+        crashed = AccountLease(1, ttl_seconds=0.1)
+        self.assertTrue(crashed.acquire())
+        scrape = mock.Mock(return_value={'success': True, 'new_tweets': 3})
+
+        self.assertEqual(run_exclusive(1, scrape, wait_timeout=5), {'success': True, 'new_tweets': 3})
+        scrape.assert_called_once()
+        self.assertIsNone(AccountLease(1).holder())
+
+    def test_wait_timeout(self, store):
+        """持有者一直未结束时，等待超时返回错误"""
+        AccountLease(1).acquire()
+        result = run_exclusive(1, mock.Mock(), wait_timeout=0.05)
+        self.assertFalse(result['success'])
+
+    def test_batch_skips_leased_account(self, store):
+        """批量监控跳过其他进程正在监控的账户，并释放自己获取的租约"""
+        user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        busy = XAccount.objects.create(user=user, username='busy_account')
+        free = XAccount.objects.create(user=user, username='free_account')
+        AccountLease(busy.id).acquire()
+
+        service = XMonitorService()
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets_batch', return_value={}) as get_batch:
+            results = service.monitor_accounts_batch([busy, free])
+
+        self.assertEqual(get_batch.call_args.args[0], ['free_account'])
+        self.assertTrue(results[busy.id]['skipped'])
+        self.assertTrue(results[free.id]['success'])
+        self.assertIsNone(AccountLease(free.id).holder())
+
+
+@override_settings(ACCOUNT_LEASE_REDIS_URL='redis://unreachable:6379/0', ACCOUNT_LEASE_REDIS_RETRY_SECONDS=60)
+@mock.patch.object(account_lease, '_redis_unavailable', new_callable=dict)
+class LeaseStoreFallbackTestCase(TestCase):
+    def test_failed_probe_remembered(self, unavailable):
+        """Redis连接失败后，在重试间隔内不再尝试连接（不必每次等待连接超时）"""
+        client = mock.Mock()
+        client.ping.side_effect = ConnectionError('connection refused')
+        with mock.patch('redis.Redis.from_url', return_value=client) as from_url, \
+                mock.patch.object(account_lease.time, 'monotonic', return_value=1000.0) as monotonic:
+            self.assertIs(get_lease_store(), account_lease._local_store)
+            self.assertIs(get_lease_store(), account_lease._local_store)
+            self.assertEqual(from_url.call_count, 1)
+
+            monotonic.return_value = 1061.0
+            self.assertIs(get_lease_store(), account_lease._local_store)
+            self.assertEqual(from_url.call_count, 2)
@@ -0,0 +1,599 @@
+"""
+测试AI综合分析（使用假模型，不调用Gemini）
+"""
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+import json
+import tempfile
+import threading
+import time
+from google.api_core.exceptions import ResourceExhausted
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from ai_service import llm_cache
+from ai_service.llm_cache import CachedGenerativeModel, LRUCache, get_cache_stats
+from ai_service.llm_client import RateLimitedModel, RateLimiter, TokenBucket, run_parallel
+from ai_service import prefilter
+from ai_service.backends import StubModel, get_backend
+from ai_service.batching import estimate_tokens, plan_batches, tweet_tokens
+from ai_service.prefilter import NgramLinearModel, RelevancePrefilter, get_prefilter_stats
+from ai_service.services import AIRecommendationService, AIService, GeminiService, analyze_tweet_with_ai, extract_json_text
+from x_monitor.models import AIPromptRule, XAccount, Tweet, RecommendedTweet, RuleEvaluation
+from x_monitor.tasks import analyze_tweets_for_recommendation, evaluate_rules_for_new_tweets
+
+
+def fake_model(*texts):
+    model = mock.Mock()
+    model.generate_content.side_effect = [
+        text if isinstance(text, Exception) else mock.Mock(text=text) for text in texts
+    ]
+    return model
+
+
+def use_model(model):
+    """GeminiService 初始化时使用假模型"""
+    return mock.patch.object(GeminiService, '_initialize_model', autospec=True,
+                             side_effect=lambda service: setattr(service, 'model', model))
+
+
+class ComprehensiveAnalysisTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        account = XAccount.objects.create(user=user, username='skiinfo')
+        self.tweet = Tweet.objects.create(
+            x_account=account, tweet_id='1', content='本日オープン！積雪120cm', hashtags=['#スキー場'],
+            like_count=10, posted_at=timezone.now()
+        )
+
+    def test_single_call_structured_result(self):
+        """一次调用返回四个字段"""
+        model = fake_model('```json\n{"sentiment": "Positive", "summary": "本日オープン", '
+                           '"topics": ["営業情報", "積雪"], "importance_score": 1.4}\n```')
+        with use_model(model):
+            service = GeminiService()
+
+        result = service.analyze_tweet_comprehensive(self.tweet)
+        self.assertEqual(model.generate_content.call_count, 1)
+        self.assertEqual(result, {
+            'sentiment': 'positive',
+            'summary': '本日オープン',
+            'topics': ['営業情報', '積雪'],
+            'importance_score': 1.0,
+        })
+
+    def test_invalid_fields_fall_back_to_heuristics(self):
+        """缺失或无效的字段使用启发式结果"""
+        with use_model(fake_model('{"sentiment": "great", "topics": "雪", "importance_score": "high"}')):
+            service = GeminiService()
+
+        result = service.analyze_tweet_comprehensive(self.tweet)
+        metrics = {'like_count': 10, 'retweet_count': 0, 'reply_count': 0}
+        self.assertEqual(result, service._fallback_analysis(self.tweet.content, self.tweet.hashtags, metrics))
+        self.assertGreater(result['importance_score'], 0)
+
+        service.model = fake_model('雪が降りました')
+        self.assertEqual(service.analyze_tweet_comprehensive(self.tweet)['summary'], self.tweet.content)
+
+    def test_analyze_tweet_with_ai_uses_one_call(self):
+        """analyze_tweet_with_ai 每条推文只调用一次模型"""
+        model = fake_model('{"sentiment": "neutral", "summary": "s", "topics": [], "importance_score": 0.5}')
+        with use_model(model):
+            analysis = analyze_tweet_with_ai(self.tweet.id)
+
+        self.assertEqual(model.generate_content.call_count, 1)
+        self.assertEqual(analysis.importance_score, 0.5)
+
+    def test_extract_json_text(self):
+        self.assertEqual(extract_json_text('```json\n[1]\n```'), '[1]')
+        self.assertEqual(extract_json_text('```\n{}\n```'), '{}')
+        self.assertEqual(extract_json_text(' {"a": 1} '), '{"a": 1}')
+
+
+class BatchPlannerTestCase(SimpleTestCase):
+    def test_packs_by_token_budget(self):
+        """按推文长度打包：短推文多条一批，长推文少条一批，单条超出预算的单独一批"""
+        tweets = [Tweet(tweet_id=str(i), content='雪' * length) for i, length in enumerate([10, 10, 10, 200, 10, 500])]
+        batches = plan_batches(tweets, tweet_tokens, output_tokens=10, input_budget=250, output_budget=1000)
+        self.assertEqual([[tweet.tweet_id for tweet in batch] for batch in batches], [['0', '1', '2'], ['3'], ['4'], ['5']])
+
+        # 输出预算和最多条数同样限制每批的条数
+        self.assertEqual([len(batch) for batch in plan_batches(
+            tweets[:3], tweet_tokens, output_tokens=400, input_budget=10000, output_budget=1000)], [2, 1])
+        self.assertEqual([len(batch) for batch in plan_batches(
+            tweets[:3], tweet_tokens, output_tokens=10, max_items=1, input_budget=10000, output_budget=1000)], [1, 1, 1])
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens('積雪120cm'), 2 + 2)
+        self.assertEqual(estimate_tokens(''), 0)
+
+
+# 假模型按调用顺序返回回应：批次按顺序执行
+@override_settings(AI_PREFILTER_ENABLED=False, AI_MAX_CONCURRENCY=1)
+class BatchRelevanceTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='skiinfo')
+        now = timezone.now()
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=str(i), content=f'推文{i}', posted_at=now)
+            for i in range(45)
+        ])
+
+    def batch_response(self, ids, skip=()):
+        return json.dumps([
+            {'tweet_id': tweet_id, 'is_relevant': int(tweet_id) % 2 == 0, 'score': 0.9,
+             'reason': '営業情報', 'summary': f'要約{tweet_id}'}
+            for tweet_id in ids if tweet_id not in skip
+        ])
+
+    @override_settings(AI_RELEVANCE_BATCH_SIZE=20)
+    def test_tweets_packed_per_request_and_written_in_bulk(self):
+        """多条推文打包成一次请求，结果按ID对应，并批量写入"""
+        ids = [str(i) for i in range(45)]
+        model = fake_model(
+            self.batch_response(ids[:20]),
+            self.batch_response(ids[20:40], skip={'21'}),  # AI漏掉的推文使用启发式结果
+            self.batch_response(ids[40:])
+        )
+        with use_model(model), self.assertNumQueries(7):
+            result = analyze_tweets_for_recommendation(self.account.id)
+
+        self.assertEqual(model.generate_content.call_count, 3)
+        self.assertEqual(result, {'account': 'skiinfo', 'analyzed': 45, 'recommended': 23})
+        self.assertFalse(Tweet.objects.filter(ai_analyzed=False).exists())
+        self.assertEqual(Tweet.objects.get(tweet_id='4').ai_summary, '要約4')
+        self.assertEqual(Tweet.objects.get(tweet_id='21').ai_summary, '推文21')
+        self.assertEqual(Tweet.objects.get(tweet_id='21').ai_label_source, 'heuristic')
+        self.assertEqual(Tweet.objects.filter(ai_label_source='llm').count(), 44)
+        self.assertEqual(RecommendedTweet.objects.filter(user=self.user).count(), 23)
+
+    def test_existing_recommendation_not_duplicated(self):
+        """已有的推荐记录不会重复创建"""
+        tweet = Tweet.objects.get(tweet_id='2')
+        RecommendedTweet.objects.create(user=self.user, tweet=tweet, ai_reason='', relevance_score=0.5)
+
+        model = fake_model(self.batch_response(['2']))
+        with use_model(model):
+            result = analyze_tweets_for_recommendation(self.account.id, tweet_ids=['2'])
+
+        self.assertEqual(result['recommended'], 0)
+        self.assertEqual(RecommendedTweet.objects.filter(tweet=tweet).count(), 1)
+
+
+@mock.patch.object(prefilter, '_prefilter', new_callable=RelevancePrefilter)
+class PrefilterTestCase(TestCase):
+    def setUp(self):
+        prefilter.prefilter_stats.reset()
+        self.account = XAccount.objects.create(
+            user=User.objects.create_user(email='test@example.com', username='testuser', password='testpass123'),
+            username='skiinfo'
+        )
+        now = timezone.now()
+        self.tweets = Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id='1', content='本日オープン！積雪120cm', posted_at=now),
+            Tweet(x_account=self.account, tweet_id='2', content='ランチの新メニューです', posted_at=now),
+            Tweet(x_account=self.account, tweet_id='3', content='今日も一日', hashtags=['#スキー'], posted_at=now),
+        ])
+
+    def trained_prefilter(self):
+        samples = [('ランチの新メニューです', False), ('セール開催中', False),
+                   ('本日オープン！積雪120cm', True), ('新雪パウダー', True)] * 5
+        return RelevancePrefilter(NgramLinearModel.train(samples))
+
+    def test_irrelevant_tweets_skip_model(self, _):
+        """明显无关的推文不发送给AI，其余的一次请求分析"""
+        model = fake_model(json.dumps([
+            {'tweet_id': '1', 'is_relevant': True, 'score': 0.9, 'reason': '', 'summary': 'オープン'},
+            {'tweet_id': '3', 'is_relevant': False, 'score': 0.2, 'reason': '', 'summary': ''},
+        ]))
+        with mock.patch.object(prefilter, '_prefilter', self.trained_prefilter()), use_model(model):
+            results = AIService().analyze_tweets_relevance(self.tweets)
+
+        prompt = model.generate_content.call_args.args[0]
+        self.assertNotIn('ランチ', prompt)
+        self.assertIn('(ID: 3)', prompt)
+        self.assertFalse(results['2']['is_relevant'])
+        self.assertTrue(results['1']['is_relevant'])
+        stats = get_prefilter_stats()
+        self.assertEqual((stats['scored'], stats['skipped'], stats['compared'], stats['agreed']), (3, 1, 2, 2))
+
+    def test_nothing_skipped_without_model(self, _):
+        """没有训练好的模型时只打分，不跳过（不含关键词的推文也发送给AI）"""
+        model = fake_model(json.dumps([
+            {'tweet_id': tweet.tweet_id, 'is_relevant': tweet.tweet_id != '2', 'score': 0.5, 'reason': '', 'summary': ''}
+            for tweet in self.tweets
+        ]))
+        with use_model(model):
+            results = AIService().analyze_tweets_relevance(self.tweets)
+
+        self.assertIn('ランチ', model.generate_content.call_args.args[0])
+        self.assertEqual({result['source'] for result in results.values()}, {'llm'})
+        self.assertEqual(get_prefilter_stats()['skipped'], 0)
+
+    def test_single_and_batch_paths_score_alike(self, _):
+        """单条分析（没有 hashtags）也从正文中取出 #标签，与批量分析的分数相同"""
+        scorer = self.trained_prefilter()
+        self.assertEqual(scorer.score('今日も一日 ＃スキー'), scorer.score('今日も一日 ＃スキー', ['スキー']))
+        self.assertGreater(scorer.score('今日も一日 #スキー'), scorer.score('今日も一日'))
+
+    def test_custom_prompt_not_prefiltered(self, _):
+        """用户自定义的判断标准不使用滑雪关键词预筛选"""
+        model = fake_model('{"is_relevant": true, "score": 0.8, "reason": "", "summary": "新メニュー"}')
+        with use_model(model):
+            result = AIService().analyze_tweet_relevance('ランチの新メニューです', user_prompt='飲食店の情報')
+
+        self.assertTrue(result['is_relevant'])
+        model.generate_content.assert_called_once()
+        self.assertEqual(get_prefilter_stats()['scored'], 0)
+
+    def test_training_uses_llm_labels_only(self, _):
+        """预筛选跳过和启发式判断的推文不用于训练"""
+        Tweet.objects.filter(tweet_id='1').update(ai_analyzed=True, ai_relevant=True, ai_label_source='llm')
+        Tweet.objects.filter(tweet_id='2').update(ai_analyzed=True, ai_relevant=False, ai_label_source='prefilter')
+        Tweet.objects.filter(tweet_id='3').update(ai_analyzed=True, ai_relevant=False, ai_label_source='heuristic')
+        output = Path(tempfile.mkdtemp()) / 'prefilter.json'
+        with self.assertRaises(CommandError):
+            call_command('train_relevance_prefilter', output=str(output), stdout=StringIO())
+
+        Tweet.objects.filter(tweet_id='3').update(ai_label_source='llm')
+        with mock.patch.object(NgramLinearModel, 'train', wraps=NgramLinearModel.train) as train:
+            call_command('train_relevance_prefilter', output=str(output), stdout=StringIO())
+        self.assertEqual(sorted(train.call_args.args[0]), [('今日も一日', False), ('本日オープン！積雪120cm', True)])
+        self.assertTrue(output.exists())
+
+    def test_linear_model(self, _):
+        """n-gram 模型学习AI的判断，保存后可以重新加载"""
+        samples = [('本日オープン', True), ('積雪100cm', True), ('リフト運休', True),
+                   ('ランチ営業中', False), ('新メニュー', False), ('セール開催', False)] * 5
+        model = NgramLinearModel.train(samples)
+        self.assertGreater(model.predict('積雪オープン'), 0.5)
+        self.assertLess(model.predict('ランチ新メニュー'), 0.5)
+
+        path = Path(tempfile.mkdtemp()) / 'prefilter.json'
+        model.save(path)
+        self.assertEqual(NgramLinearModel.load(path).predict('積雪'), model.predict('積雪'))
+
+
+@override_settings(LLM_CACHE_REDIS_URL='')
+@mock.patch.object(llm_cache, '_local_cache', new_callable=lambda: LRUCache(2))
+class LLMCacheTestCase(TestCase):
+    def setUp(self):
+        llm_cache.cache_stats.reset()
+
+    def test_repeat_prompt_served_from_cache(self, local_cache):
+        """相同的提示词（忽略缩进差异）只调用一次模型"""
+        model = fake_model('positive', 'negative')
+        cached = CachedGenerativeModel(model, 'gemini-pro')
+
+        self.assertEqual(cached.generate_content('感情:\n    雪が降った').text, 'positive')
+        self.assertEqual(cached.generate_content('感情:   雪が降った').text, 'positive')
+        self.assertEqual(model.generate_content.call_count, 1)
+        self.assertEqual(CachedGenerativeModel(model, 'gemini-1.5').generate_content('感情: 雪が降った').text, 'negative')
+
+        stats = get_cache_stats()
+        self.assertEqual((stats['local_hits'], stats['misses'], stats['stores']), (1, 2, 2))
+
+    def test_lru_eviction_and_ttl(self, local_cache):
+        local_cache.set('a', '1', ttl=60)
+        local_cache.set('b', '2', ttl=60)
+        local_cache.get('a')
+        local_cache.set('c', '3', ttl=60)  # 最久未使用的 b 被淘汰
+        self.assertEqual((local_cache.get('a'), local_cache.get('b'), local_cache.get('c')), ('1', None, '3'))
+
+        local_cache.set('d', '4', ttl=0)
+        self.assertIsNone(local_cache.get('d'))
+
+    def test_failed_response_not_cached(self, local_cache):
+        model = mock.Mock()
+        model.generate_content.side_effect = [RuntimeError('quota'), mock.Mock(text='ok')]
+        cached = CachedGenerativeModel(model, 'gemini-pro')
+
+        with self.assertRaises(RuntimeError):
+            cached.generate_content('prompt')
+        self.assertEqual(cached.generate_content('prompt').text, 'ok')
+        self.assertEqual(model.generate_content.call_count, 2)
+
+
+    def test_unparsable_response_invalidated(self, local_cache):
+        """解析失败的回应从缓存中删除，下次重新请求模型"""
+        model = fake_model('{"sentiment": "positive", "summ', json.dumps({
+            'sentiment': 'positive', 'summary': '新雪', 'topics': ['新雪'], 'importance_score': 0.8,
+        }))
+        user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        tweet = Tweet.objects.create(x_account=XAccount.objects.create(user=user, username='skiinfo'),
+                                     tweet_id='1', content='新雪30cm', posted_at=timezone.now())
+        with use_model(CachedGenerativeModel(model, 'gemini-pro')):
+            service = GeminiService()
+
+        self.assertEqual(service.analyze_tweet_comprehensive(tweet)['summary'], '新雪30cm')
+        self.assertEqual(service.analyze_tweet_comprehensive(tweet)['summary'], '新雪')
+        self.assertEqual(model.generate_content.call_count, 2)
+        self.assertEqual(get_cache_stats()['invalidations'], 1)
+
+
+@override_settings(AI_RETRY_BASE_SECONDS=0, AI_MAX_RETRIES=2)
+class RateLimitedModelTestCase(SimpleTestCase):
+    def test_quota_error_retried(self):
+        """配额超出时退避重试，超过重试次数后抛出"""
+        model = fake_model(ResourceExhausted('quota'), 'ok')
+        limited = RateLimitedModel(model, RateLimiter(600, 100000, 2))
+        self.assertEqual(limited.generate_content('prompt').text, 'ok')
+        self.assertEqual(model.generate_content.call_count, 2)
+        self.assertIn('timeout', model.generate_content.call_args.kwargs['request_options'])
+
+        model = fake_model(*[ResourceExhausted('quota')] * 3)
+        with self.assertRaises(ResourceExhausted):
+            RateLimitedModel(model, RateLimiter(600, 100000, 2)).generate_content('prompt')
+        self.assertEqual(model.generate_content.call_count, 3)
+
+        # 其他错误不重试
+        model = fake_model(ValueError('blocked'))
+        with self.assertRaises(ValueError):
+            RateLimitedModel(model, RateLimiter(600, 100000, 2)).generate_content('prompt')
+        self.assertEqual(model.generate_content.call_count, 1)
+
+    def test_token_bucket_waits_for_refill(self):
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)   # 每0.1秒补充1个
+        bucket.acquire()
+        started = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    @override_settings(AI_MAX_CONCURRENCY=3)
+    def test_run_parallel_bounded_and_ordered(self):
+        """并行执行不超过上限，结果与输入顺序相同"""
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def work(item):
+            with lock:
+                running.append(item)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(item)
+            return item * 2
+
+        with mock.patch('ai_service.llm_client._executor', None):
+            self.assertEqual(run_parallel(work, list(range(9))), [i * 2 for i in range(9)])
+        self.assertLessEqual(max(peak), 3)
+        self.assertGreater(max(peak), 1)
+
+
+@override_settings(AI_BACKEND='stub', AI_STUB_LATENCY_MS=0, LLM_CACHE_ENABLED=False, AI_PREFILTER_ENABLED=False)
+class StubBackendTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='skiinfo')
+        now = timezone.now()
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=str(i), content=f'本日オープン！積雪{i}cm', posted_at=now)
+            for i in range(30)
+        ])
+
+    def test_pipeline_runs_offline(self):
+        """桩后端返回符合格式的JSON，整个AI流程不需要网络"""
+        self.assertIsInstance(GeminiService().model.model.model, StubModel)
+
+        result = analyze_tweets_for_recommendation(self.account.id)
+        self.assertEqual(result['analyzed'], 30)
+        self.assertTrue(0 < result['recommended'] < 30)
+        self.assertFalse(Tweet.objects.filter(ai_summary='').exists())
+
+        rule = AIPromptRule.objects.create(user=self.user, name='白馬', prompt='白马地区的滑雪场信息')
+        first = AIRecommendationService().apply_rule_to_user_tweets(self.user, rule, date_filter='all')
+        self.assertEqual(RuleEvaluation.objects.filter(rule=rule).count(), 30)
+        self.assertEqual(RuleEvaluation.objects.filter(rule=rule, matched=True).count(), first)
+
+        analysis = GeminiService().analyze_tweet_comprehensive(Tweet.objects.first())
+        self.assertIn(analysis['sentiment'], ('positive', 'neutral', 'negative'))
+
+    def test_injected_failures_deterministic(self):
+        """注入的故障由提示词决定：同样的调用顺序得到同样的结果，重试最终成功"""
+        def outcomes(model):
+            results = []
+            for _ in range(12):
+                try:
+                    results.append(model.generate_content('"is_relevant" (ID: 1)').text)
+                except ResourceExhausted:
+                    results.append('error')
+            return results
+
+        first = outcomes(StubModel(failure_rate=0.4, truncate_rate=0.3))
+        self.assertEqual(first, outcomes(StubModel(failure_rate=0.4, truncate_rate=0.3)))
+        valid = StubModel().generate_content('"is_relevant" (ID: 1)').text
+        self.assertEqual(json.loads(valid)[0]['tweet_id'], '1')
+        self.assertIn(valid, first)
+        self.assertIn('error', first)
+        self.assertTrue([text for text in first if text not in (valid, 'error')])   # 被截断的JSON
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend('unknown')
+
+
+class RuleLedgerTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        account = XAccount.objects.create(user=self.user, username='skiinfo')
+        now = timezone.now()
+        self.tweets = Tweet.objects.bulk_create([
+            Tweet(x_account=account, tweet_id=str(i), content=f'推文{i}', posted_at=now - timezone.timedelta(minutes=i))
+            for i in range(3)
+        ])
+        self.rule = AIPromptRule.objects.create(user=self.user, name='白馬', prompt='白马地区的滑雪场信息')
+
+    def apply(self, *responses):
+        model = fake_model(*responses)
+        with use_model(model):
+            count = AIRecommendationService().apply_rule_to_user_tweets(self.user, self.rule, date_filter='all')
+        return count, model.generate_content.call_count
+
+    def test_unchanged_rule_not_reevaluated(self):
+        """规则未修改时，已判断过的推文（包括不匹配的）不再发送给AI"""
+        match = '[{"tweet_id": "1", "match": true, "reason": "白馬", "relevance_score": 0.9}]'
+        self.assertEqual(self.apply(match), (1, 1))
+        self.assertEqual(RuleEvaluation.objects.filter(rule=self.rule).count(), 3)
+        self.assertEqual(RuleEvaluation.objects.filter(rule=self.rule, matched=True).get().tweet.tweet_id, '1')
+
+        self.assertEqual(self.apply(), (0, 0))
+
+        # 修改提示词后重新判断所有推文
+        self.rule.prompt = '白马47的营业信息'
+        self.rule.save()
+        self.assertEqual(self.apply('[]'), (0, 1))
+        self.assertFalse(RuleEvaluation.objects.filter(matched=True).exists())
+        self.assertEqual(set(RuleEvaluation.objects.values_list('rule_version', flat=True)), {self.rule.version_hash})
+
+    def test_failed_batch_not_recorded(self):
+        """AI调用失败的推文不记录，下次重新判断"""
+        self.assertEqual(self.apply(RuntimeError('quota exceeded')), (0, 1))
+        self.assertFalse(RuleEvaluation.objects.exists())
+        self.assertEqual(self.apply('[]'), (0, 1))
+        self.assertEqual(RuleEvaluation.objects.count(), 3)
+
+    def test_truncated_response_split_and_retried(self):
+        """回应被截断时拆分批次，只重试失败的一半"""
+        truncated = '[{"tweet_id": "1", "match": tr'
+        match = '[{"tweet_id": "2", "match": true, "reason": "白馬", "relevance_score": 0.9}]'
+        # [0, 1, 2] → [0] 成功，[1, 2] 再次被截断 → [1] 成功，[2] 成功
+        self.assertEqual(self.apply(truncated, '[]', truncated, '[]', match), (1, 5))
+        self.assertEqual(RuleEvaluation.objects.count(), 3)
+        self.assertEqual(RuleEvaluation.objects.get(matched=True).tweet.tweet_id, '2')
+
+        # 单条推文也无法解析时不记录
+        self.rule.prompt = '白马47的营业信息'
+        self.rule.save()
+        self.assertEqual(self.apply(truncated, '[]', truncated, '[]', 'not json'), (0, 5))
+        self.assertEqual(RuleEvaluation.objects.filter(rule_version=self.rule.version_hash).count(), 2)
+
+    @override_settings(LLM_CACHE_REDIS_URL='')
+    def test_truncated_response_not_served_from_cache(self):
+        """启用缓存时，截断的回应不留在缓存中：重试时重新请求模型"""
+        truncated = '[{"tweet_id": "0", "match": tr'
+        match = '[{"tweet_id": "0", "match": true, "reason": "白馬", "relevance_score": 0.9}]'
+        Tweet.objects.exclude(tweet_id='0').delete()
+        model = fake_model(truncated, match)
+        with mock.patch.object(llm_cache, '_local_cache', LRUCache(16)), \
+                use_model(CachedGenerativeModel(model, 'gemini-pro')):
+            service = AIRecommendationService()
+            self.assertEqual(service.apply_rule_to_user_tweets(self.user, self.rule, date_filter='all'), 0)
+            self.assertFalse(RuleEvaluation.objects.exists())
+            self.assertEqual(service.apply_rule_to_user_tweets(self.user, self.rule, date_filter='all'), 1)
+
+        self.assertEqual(model.generate_content.call_count, 2)
+        self.assertTrue(RuleEvaluation.objects.get().matched)
+
+
+class IngestionRulesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        other_account = XAccount.objects.create(user=self.user, username='niseko')
+        now = timezone.now()
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=str(i), content=f'推文{i}', posted_at=now) for i in range(3)
+        ])
+        self.global_rule = AIPromptRule.objects.create(user=self.user, name='営業', prompt='营业信息')
+        self.hakuba_rule = AIPromptRule.objects.create(user=self.user, name='白馬', prompt='白马的雪况')
+        self.hakuba_rule.target_accounts.add(self.account)
+        niseko_rule = AIPromptRule.objects.create(user=self.user, name='ニセコ', prompt='二世谷')
+        niseko_rule.target_accounts.add(other_account)
+        AIPromptRule.objects.create(user=self.user, name='停止', prompt='停用的规则', is_active=False)
+
+    def test_all_applicable_rules_in_one_request(self):
+        """适用于该账户的所有规则在一次请求中判断，结果批量写入"""
+        response = json.dumps([
+            {'tweet_id': '0', 'rule_id': self.global_rule.id, 'reason': '営業', 'relevance_score': 0.9},
+            {'tweet_id': '0', 'rule_id': self.hakuba_rule.id, 'reason': '雪況', 'relevance_score': 0.8},
+            {'tweet_id': '2', 'rule_id': self.hakuba_rule.id, 'reason': '雪況', 'relevance_score': 0.7},
+        ])
+        model = fake_model(response)
+        with use_model(model):
+            result = evaluate_rules_for_new_tweets(self.account.id, ['0', '1', '2'])
+
+        self.assertEqual(result['recommended'], 3)
+        self.assertEqual(model.generate_content.call_count, 1)
+        prompt = model.generate_content.call_args.args[0]
+        self.assertIn('营业信息', prompt)
+        self.assertIn('白马的雪况', prompt)
+        self.assertNotIn('二世谷', prompt)
+        self.assertEqual(
+            set(RecommendedTweet.objects.values_list('tweet__tweet_id', 'prompt_rule__name')),
+            {('0', '営業'), ('0', '白馬'), ('2', '白馬')}
+        )
+        self.assertEqual(RuleEvaluation.objects.count(), 6)
+
+        # 入库时已判断过的推文，手动应用规则时不再发送给AI
+        with use_model(fake_model()):
+            self.assertEqual(AIRecommendationService().apply_rule_to_user_tweets(
+                self.user, self.hakuba_rule, date_filter='all'), 0)
+
+    @override_settings(LLM_CACHE_REDIS_URL='')
+    def test_truncated_response_retried_with_cache(self):
+        """启用缓存时，截断的回应被删除，下次运行重新请求模型"""
+        truncated = '[{"tweet_id": "0", "rule_id": %d, "rea' % self.global_rule.id
+        response = json.dumps([
+            {'tweet_id': '0', 'rule_id': self.global_rule.id, 'reason': '営業', 'relevance_score': 0.9}
+        ])
+        model = fake_model(truncated, response)
+        with mock.patch.object(llm_cache, '_local_cache', LRUCache(16)), \
+                use_model(CachedGenerativeModel(model, 'gemini-pro')):
+            self.assertEqual(evaluate_rules_for_new_tweets(self.account.id, ['0'])['recommended'], 0)
+            self.assertFalse(RuleEvaluation.objects.exists())
+            self.assertEqual(evaluate_rules_for_new_tweets(self.account.id, ['0'])['recommended'], 1)
+
+        self.assertEqual(model.generate_content.call_count, 2)
+        self.assertEqual(RuleEvaluation.objects.count(), 2)
+
+    def test_invalid_score_skips_only_that_item(self):
+        """单条结果的 relevance_score 无效时只跳过这一条"""
+        response = json.dumps([
+            {'tweet_id': '0', 'rule_id': self.global_rule.id, 'reason': '営業', 'relevance_score': 'high'},
+            {'tweet_id': '1', 'rule_id': self.global_rule.id, 'reason': '営業', 'relevance_score': 0.9},
+        ])
+        with use_model(fake_model(response)):
+            result = evaluate_rules_for_new_tweets(self.account.id, ['0', '1'])
+
+        self.assertEqual(result['recommended'], 1)
+        self.assertEqual(RecommendedTweet.objects.get().tweet.tweet_id, '1')
+
+    def test_only_unevaluated_pairs_sent_and_new_rows_counted(self):
+        """只发送规则未判断过的推文；已有的推荐记录不计入新推荐数"""
+        RuleEvaluation.objects.create(rule=self.global_rule, tweet=Tweet.objects.get(tweet_id='0'),
+                                      rule_version=self.global_rule.version_hash, matched=True)
+        RecommendedTweet.objects.create(user=self.user, tweet=Tweet.objects.get(tweet_id='1'),
+                                        prompt_rule=self.hakuba_rule, ai_reason='')
+        responses = {
+            '0': json.dumps([{'tweet_id': '0', 'rule_id': self.hakuba_rule.id, 'reason': '雪況', 'relevance_score': 0.8}]),
+            '1': json.dumps([
+                {'tweet_id': '1', 'rule_id': self.hakuba_rule.id, 'reason': '雪況', 'relevance_score': 0.8},
+                {'tweet_id': '1', 'rule_id': self.global_rule.id, 'reason': '営業', 'relevance_score': 0.9},
+            ]),
+        }
+        prompts = {}
+
+        def respond(prompt):
+            # 各批次并行请求，按推文ID返回回应
+            tweet_id = '0' if '(ID: 0)' in prompt else '1'
+            prompts[tweet_id] = prompt
+            return mock.Mock(text=responses[tweet_id])
+
+        model = mock.Mock()
+        model.generate_content.side_effect = respond
+        with use_model(model):
+            result = evaluate_rules_for_new_tweets(self.account.id, ['0', '1'])
+
+        self.assertEqual(model.generate_content.call_count, 2)
+        # 推文0 只和白馬规则一起发送，推文1 和两条规则一起发送
+        self.assertNotIn('(ID: 1)', prompts['0'])
+        self.assertNotIn('营业信息', prompts['0'])
+        self.assertIn('营业信息', prompts['1'])
+        self.assertIn('白马的雪况', prompts['1'])
+        self.assertEqual(result['recommended'], 2)
+        self.assertEqual(RecommendedTweet.objects.count(), 3)
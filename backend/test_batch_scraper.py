@@ -0,0 +1,167 @@
+"""
+测试并发批量抓取（不启动真实浏览器）
+"""
+import asyncio
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from x_monitor.models import XAccount, Tweet, MonitoringLog
+from x_monitor.batch_scraper import _scrape_timeline, scrape_timelines_batch
+from x_monitor.browser_pool import AsyncBrowserPool
+from x_monitor.render_wait import COUNT_UNSEEN_TWEETS_SCRIPT
+from x_monitor.workaround_scraper import EXTRACT_NEW_TWEETS_SCRIPT
+from x_monitor.services import XMonitorService
+
+
+class FakeAsyncPage:
+    def __init__(self, tracker, username):
+        self.tracker = tracker
+        self.username = username
+        self.extracted = False
+
+    async def goto(self, url, **kwargs):
+        self.tracker['active'] += 1
+        self.tracker['peak'] = max(self.tracker['peak'], self.tracker['active'])
+        await asyncio.sleep(0.01)
+
+    async def wait_for_selector(self, selector, **kwargs):
+        await asyncio.sleep(0.01)
+
+    def on(self, event, handler):
+        pass
+
+    async def evaluate(self, script, *args):
+        if script == COUNT_UNSEEN_TWEETS_SCRIPT:
+            return 0 if self.extracted else 1
+        if script != EXTRACT_NEW_TWEETS_SCRIPT:
+            return None
+        if self.extracted:
+            return []
+        # 页面内脚本只返回一次新节点
+        self.extracted = True
+        return [{
+            'id': f'{self.username}-1',
+            'has_text': True,
+            'text': 'ゲレンデ情報',
+            'has_time': True,
+            'datetime': '2026-01-01T00:00:00.000Z',
+        }]
+
+    async def wait_for_timeout(self, timeout):
+        await asyncio.sleep(0)
+
+    async def close(self):
+        self.tracker['active'] -= 1
+
+
+class FakeAsyncContext:
+    def __init__(self):
+        self.tracker = {'active': 0, 'peak': 0}
+        self.usernames = iter([])
+
+    async def new_page(self):
+        return FakeAsyncPage(self.tracker, next(self.usernames))
+
+
+@override_settings(SCRAPER_MODE='dom', SCRAPER_NETWORK_QUIET_MS=10)
+class BatchScraperTestCase(TestCase):
+    def test_concurrency_cap(self):
+        """同时打开的标签页数不超过并发上限"""
+        usernames = [f'user{i}' for i in range(10)]
+        context = FakeAsyncContext()
+        context.usernames = iter(usernames)
+
+        async def run():
+            semaphore = asyncio.Semaphore(3)
+            return await asyncio.gather(*[
+                _scrape_timeline(context, semaphore, username, 5) for username in usernames
+            ])
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(len(tweets) == 1 for tweets in results))
+        self.assertEqual(context.tracker['peak'], 3)
+        self.assertEqual(context.tracker['active'], 0)
+
+    def test_batches_share_pooled_context(self):
+        """连续的批次在常驻浏览器的同一个上下文中抓取"""
+        context = FakeAsyncContext()
+        contexts = []
+
+        async def fake_checkout(profile):
+            contexts.append(context)
+            return mock.Mock(context=context, pages_served=0)
+
+        pool = AsyncBrowserPool(max_pages_per_context=100, max_pages_per_browser=100)
+        self.addCleanup(pool.close)
+        with mock.patch.object(pool, '_checkout_context', side_effect=fake_checkout), \
+                mock.patch('x_monitor.batch_scraper.get_async_browser_pool', return_value=pool), \
+                mock.patch('x_monitor.batch_scraper.get_cookies_file', return_value=mock.Mock(**{'exists.return_value': True})):
+            for batch in (['user0', 'user1'], ['user2', 'user3', 'user4']):
+                context.usernames = iter(batch)
+                results = scrape_timelines_batch(batch, max_tweets=5, concurrency=2)
+                self.assertEqual(sorted(results), batch)
+                self.assertTrue(all(len(tweets) == 1 for tweets in results.values()))
+
+        self.assertEqual(len(contexts), 2)
+        self.assertEqual(pool.total_pages_served, 5)
+
+
+class MonitorAccountsBatchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.ok_account = XAccount.objects.create(user=self.user, username='ok_account')
+        self.failed_account = XAccount.objects.create(user=self.user, username='failed_account')
+
+    def test_batch_saves_tweets_and_records_failures(self):
+        """批量监控：成功的账户保存推文，失败的账户记录错误日志"""
+        service = XMonitorService()
+        scraped = {
+            'ok_account': [{
+                'id': '1001',
+                'text': '本日オープン',
+                'created_at': timezone.now(),
+                'hashtags': [],
+                'mentions': [],
+                'media_urls': [],
+                'retweet_count': 0,
+                'like_count': 0,
+                'reply_count': 0,
+            }],
+            'failed_account': RuntimeError('page crashed'),
+        }
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets_batch', return_value=scraped):
+            results = service.monitor_accounts_batch([self.ok_account, self.failed_account])
+
+        self.assertTrue(results[self.ok_account.id]['success'])
+        self.assertEqual(results[self.ok_account.id]['new_tweets'], 1)
+        self.assertFalse(results[self.failed_account.id]['success'])
+        self.assertTrue(Tweet.objects.filter(tweet_id='1001', x_account=self.ok_account).exists())
+        self.assertEqual(MonitoringLog.objects.get(x_account=self.failed_account).result, 'error')
+
+        self.ok_account.refresh_from_db()
+        self.assertIsNotNone(self.ok_account.last_checked)
+
+    def test_recent_tweet_ids_passed_to_scraper(self):
+        """抓取时传入账户最近已入库的推文ID（高水位线）"""
+        now = timezone.now()
+        for i, tweet_id in enumerate(['900', '901', '902']):
+            Tweet.objects.create(x_account=self.ok_account, tweet_id=tweet_id, content='',
+                                 posted_at=now - timezone.timedelta(minutes=10 - i))
+
+        service = XMonitorService()
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets', return_value=[]) as get_recent:
+            service.monitor_account(self.ok_account)
+        self.assertEqual(get_recent.call_args.kwargs['known_ids'], ['902', '901', '900'])
+
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets_batch', return_value={}) as get_batch:
+            service.monitor_accounts_batch([self.ok_account, self.failed_account])
+        self.assertEqual(get_batch.call_args.kwargs['known_ids'], {
+            'ok_account': ['902', '901', '900'],
+            'failed_account': [],
+        })
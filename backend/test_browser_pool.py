@@ -0,0 +1,310 @@
+"""
+测试常驻浏览器池（使用假的playwright对象，不启动真实浏览器）
+"""
+import os
+import threading
+from unittest import mock
+from celery.signals import worker_process_shutdown
+from django.test import SimpleTestCase
+from django.core.signals import request_finished
+from x_monitor import browser_pool
+from x_monitor.browser_pool import AsyncBrowserPool, BrowserPool, get_browser_pool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    def add_init_script(self, script):
+        pass
+
+    def add_cookies(self, cookies):
+        pass
+
+    def new_page(self):
+        return FakePage()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.launched = []
+        self.chromium = self
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class FakeAsyncContext:
+    def __init__(self):
+        self.closed = False
+
+    async def add_init_script(self, script):
+        pass
+
+    async def add_cookies(self, cookies):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeAsyncContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeAsyncPlaywright:
+    def __init__(self):
+        self.launched = []
+        self.chromium = self
+        self.stopped = False
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+    async def launch(self, **kwargs):
+        browser = FakeAsyncBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class BrowserPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = mock.patch('x_monitor.browser_pool.sync_playwright', return_value=self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rss_patcher = mock.patch('x_monitor.browser_pool._child_processes_rss_mb', return_value=100.0)
+        self.rss = rss_patcher.start()
+        self.addCleanup(rss_patcher.stop)
+
+    def test_browser_launched_once_and_context_reused(self):
+        """多次借出页面只启动一次浏览器，并复用预热上下文"""
+        pool = BrowserPool(max_pages_per_context=10, max_pages_per_browser=100)
+        for _ in range(5):
+            with pool.page('guest') as page:
+                self.assertFalse(page.closed)
+            self.assertTrue(page.closed)
+
+        self.assertEqual(len(self.playwright.launched), 1)
+        self.assertEqual(len(self.playwright.launched[0].contexts), 1)
+        self.assertEqual(pool.total_pages_served, 5)
+
+    def test_context_recycled_after_page_limit(self):
+        """上下文达到页面上限后关闭并新建"""
+        pool = BrowserPool(max_pages_per_context=2, max_pages_per_browser=100)
+        for _ in range(4):
+            with pool.page('guest'):
+                pass
+
+        contexts = self.playwright.launched[0].contexts
+        self.assertEqual(len(contexts), 2)
+        self.assertTrue(contexts[0].closed)
+
+    def test_browser_recycled_after_page_limit(self):
+        """浏览器达到页面上限后回收，下次借出时重新启动"""
+        pool = BrowserPool(max_pages_per_context=10, max_pages_per_browser=3)
+        for _ in range(4):
+            with pool.page('guest'):
+                pass
+
+        self.assertEqual(len(self.playwright.launched), 2)
+        self.assertFalse(self.playwright.launched[0].connected)
+
+    def test_browser_recycled_over_memory_limit(self):
+        """内存超过上限后回收浏览器"""
+        pool = BrowserPool(max_pages_per_browser=100, memory_limit_mb=500, memory_check_interval=1)
+        self.rss.return_value = 800.0
+        with pool.page('guest'):
+            pass
+
+        self.assertFalse(self.playwright.launched[0].connected)
+        self.assertEqual(pool.stats()['idle_contexts'], {})
+
+    def test_disconnected_browser_relaunched(self):
+        """健康检查：浏览器断开后自动重新启动"""
+        pool = BrowserPool()
+        with pool.page('guest'):
+            pass
+        self.playwright.launched[0].connected = False
+
+        with pool.page('guest'):
+            pass
+        self.assertEqual(len(self.playwright.launched), 2)
+
+    def test_failed_context_not_reused(self):
+        """使用中抛出异常的上下文不再放回池中"""
+        pool = BrowserPool()
+        with self.assertRaises(RuntimeError):
+            with pool.page('guest'):
+                raise RuntimeError('page crashed')
+
+        contexts = self.playwright.launched[0].contexts
+        self.assertTrue(contexts[0].closed)
+        with pool.page('guest'):
+            pass
+        self.assertEqual(len(contexts), 2)
+
+    def test_memory_checked_every_n_pages(self):
+        """扫描 /proc 的内存检查每 N 个页面才执行一次"""
+        pool = BrowserPool(max_pages_per_browser=100, memory_check_interval=5)
+        for _ in range(12):
+            with pool.page('guest'):
+                pass
+        self.assertEqual(self.rss.call_count, 2)
+
+    def test_request_thread_pool_closed_when_request_finishes(self):
+        """Web请求结束时关闭请求线程的浏览器池，不留下Chromium进程"""
+        pool = get_browser_pool()
+        with pool.page('guest'):
+            pass
+        self.assertIs(get_browser_pool(), pool)
+
+        request_finished.send(sender=self.__class__)
+        self.assertFalse(self.playwright.launched[0].connected)
+        self.assertIsNot(get_browser_pool(), pool)
+        browser_pool.close_browser_pool()
+
+    def test_worker_pool_closed_at_process_shutdown(self):
+        """Celery prefork 子进程退出时，在执行任务的线程中关闭浏览器池"""
+        pool = get_browser_pool()
+        with pool.page('guest'):
+            pass
+        worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+        self.assertFalse(self.playwright.launched[0].connected)
+        self.assertIsNot(get_browser_pool(), pool)
+        browser_pool.close_browser_pool()
+
+    def test_close_from_other_thread_skipped(self):
+        """sync playwright 对象不能跨线程使用：其他线程（例如 atexit）不关闭浏览器池"""
+        pool = BrowserPool()
+        with pool.page('guest'):
+            pass
+        thread = threading.Thread(target=pool.close)
+        thread.start()
+        thread.join()
+        self.assertTrue(self.playwright.launched[0].connected)
+        pool.close()
+        self.assertFalse(self.playwright.launched[0].connected)
+
+
+class AsyncBrowserPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.playwright = FakeAsyncPlaywright()
+        patcher = mock.patch('x_monitor.browser_pool.async_playwright', return_value=self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rss_patcher = mock.patch('x_monitor.browser_pool._child_processes_rss_mb', return_value=100.0)
+        self.rss = rss_patcher.start()
+        self.addCleanup(rss_patcher.stop)
+
+    def make_pool(self, **kwargs):
+        pool = AsyncBrowserPool(**kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_browser_and_context_reused_across_batches(self):
+        """多个批次（每次 run）共用一个浏览器和上下文"""
+        pool = self.make_pool(max_pages_per_context=100, max_pages_per_browser=100)
+
+        async def batch(context):
+            return context
+
+        contexts = [pool.run(batch, pages=4) for _ in range(3)]
+        self.assertEqual(len(self.playwright.launched), 1)
+        self.assertIs(contexts[0], contexts[2])
+        self.assertFalse(contexts[0].closed)
+        self.assertEqual(pool.total_pages_served, 12)
+
+    def test_recycled_after_page_limits(self):
+        """上下文/浏览器达到页面上限后重建"""
+        pool = self.make_pool(max_pages_per_context=5, max_pages_per_browser=8)
+
+        async def batch(context):
+            return context
+
+        first = pool.run(batch, pages=3)
+        second = pool.run(batch, pages=3)
+        self.assertIs(first, second)
+        self.assertTrue(first.closed)
+        self.assertTrue(self.playwright.launched[0].connected)
+
+        pool.run(batch, pages=3)
+        self.assertFalse(self.playwright.launched[0].connected)
+        pool.run(batch, pages=1)
+        self.assertEqual(len(self.playwright.launched), 2)
+
+    def test_failed_batch_discards_context(self):
+        pool = self.make_pool(max_pages_per_context=100, max_pages_per_browser=100)
+
+        async def fail(context):
+            raise RuntimeError('crashed')
+
+        with self.assertRaises(RuntimeError):
+            pool.run(fail)
+        self.assertTrue(self.playwright.launched[0].contexts[0].closed)
+
+    def test_close_stops_loop_thread(self):
+        pool = AsyncBrowserPool()
+
+        async def batch(context):
+            return None
+
+        pool.run(batch)
+        thread = pool._thread
+        pool.close()
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(self.playwright.launched[0].connected)
+        self.assertTrue(self.playwright.stopped)
@@ -0,0 +1,99 @@
+"""
+测试推文互动数更新和时间序列降采样
+"""
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from x_monitor.engagement import compact_engagement_snapshots, record_engagement_snapshots
+from x_monitor.models import XAccount, Tweet, TweetEngagementSnapshot
+from x_monitor.services import XMonitorService
+
+
+def scraped(tweet_id, likes, **kwargs):
+    tweet = {
+        'id': tweet_id,
+        'text': 'ゲレンデ情報',
+        'created_at': timezone.now().isoformat(),
+        'hashtags': [],
+        'mentions': [],
+        'media_urls': [],
+        'retweet_count': 1,
+        'like_count': likes,
+        'reply_count': 0,
+    }
+    tweet.update(kwargs)
+    return tweet
+
+
+class EngagementTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        self.service = XMonitorService()
+
+    def monitor(self, tweets):
+        with mock.patch.object(self.service.scraper_client, 'get_recent_tweets', return_value=tweets):
+            return self.service.monitor_account(self.account)
+
+    def test_reseen_tweet_metrics_updated(self):
+        """再次抓取到已入库的推文时更新互动数，并记录快照"""
+        self.monitor([scraped('1', likes=5)])
+        result = self.monitor([scraped('1', likes=42, is_known=True)])
+
+        self.assertEqual(result['new_tweet_ids'], [])
+        self.assertEqual(result['updated_metrics'], 1)
+        self.assertEqual(Tweet.objects.get(tweet_id='1').like_count, 42)
+
+        # 同一小时内的两次抓取合并为一条快照，保留最新值
+        snapshot = TweetEngagementSnapshot.objects.get(tweet__tweet_id='1')
+        self.assertEqual((snapshot.granularity, snapshot.like_count), ('hour', 42))
+
+    def test_unavailable_metrics_not_overwritten(self):
+        """DOM中没有互动数时不覆盖已有的数值"""
+        self.monitor([scraped('1', likes=5)])
+        result = self.monitor([scraped('1', likes=0, metrics_available=False)])
+
+        self.assertEqual(result['updated_metrics'], 0)
+        self.assertEqual(Tweet.objects.get(tweet_id='1').like_count, 5)
+
+    def test_known_tweet_not_inserted(self):
+        """爬虫标记为已入库但数据库中不存在的推文不作为新推文保存"""
+        result = self.monitor([scraped('9', likes=1, is_known=True)])
+        self.assertEqual(result['new_tweet_ids'], [])
+        self.assertFalse(Tweet.objects.filter(tweet_id='9').exists())
+
+    def test_old_tweet_recorded_daily(self):
+        now = timezone.now()
+        tweet = Tweet.objects.create(x_account=self.account, tweet_id='1', content='', posted_at=now - timedelta(days=5))
+        record_engagement_snapshots([(tweet.pk, tweet.posted_at, 10, 1, 0)], now=now)
+        self.assertEqual(TweetEngagementSnapshot.objects.get().granularity, 'day')
+
+    def test_compaction(self):
+        """小时快照超过窗口后合并为每天最后一条的日快照，过期日快照删除"""
+        now = timezone.now()
+        tweet = Tweet.objects.create(x_account=self.account, tweet_id='1', content='', posted_at=now - timedelta(days=4))
+        base = timezone.localtime(now - timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+        for hour, likes in enumerate([10, 20, 30]):
+            TweetEngagementSnapshot.objects.create(
+                tweet=tweet, granularity='hour', bucket=base + timedelta(hours=hour), like_count=likes
+            )
+        TweetEngagementSnapshot.objects.create(
+            tweet=tweet, granularity='hour', bucket=timezone.localtime(now).replace(minute=0, second=0, microsecond=0), like_count=40
+        )
+        TweetEngagementSnapshot.objects.create(
+            tweet=tweet, granularity='day', bucket=now - timedelta(days=400), like_count=1
+        )
+
+        result = compact_engagement_snapshots(now=now)
+
+        self.assertEqual(result['hourly_compacted'], 3)
+        self.assertEqual(result['daily_expired'], 1)
+        daily = TweetEngagementSnapshot.objects.get(granularity='day')
+        self.assertEqual(daily.like_count, 30)
+        self.assertEqual(TweetEngagementSnapshot.objects.filter(granularity='hour').count(), 1)
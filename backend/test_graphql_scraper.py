@@ -0,0 +1,127 @@
+"""
+测试GraphQL响应拦截模式（使用录制的UserTweets响应，不启动真实浏览器）
+"""
+import json
+from pathlib import Path
+from django.test import SimpleTestCase
+from x_monitor.graphql_scraper import (
+    GraphQLTimelineCollector, capture_user_tweets, is_user_tweets_response, parse_user_tweets_payload
+)
+
+FIXTURE = Path(__file__).resolve().parent / 'x_monitor' / 'testdata' / 'user_tweets.json'
+
+
+def load_payload():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FakeResponse:
+    def __init__(self, url, payload=None):
+        self.url = url
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeResponseInfo:
+    def __init__(self, page):
+        self.page = page
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    @property
+    def value(self):
+        if not self.page.responses:
+            raise TimeoutError('Timeout waiting for response')
+        return self.page.responses.pop(0)
+
+
+class FakePage:
+    def __init__(self, responses):
+        self.responses = responses
+        self.visited = []
+
+    def expect_response(self, predicate, timeout=None):
+        self.responses = [r for r in self.responses if predicate(r)]
+        return FakeResponseInfo(self)
+
+    def goto(self, url, **kwargs):
+        self.visited.append(url)
+
+    def evaluate(self, script, *args):
+        return None
+
+
+class ParseUserTweetsPayloadTestCase(SimpleTestCase):
+    def test_original_tweets_in_timeline_order(self):
+        """只保留原创推文（跳过转发、回复和推广），置顶推文在前"""
+        tweets = parse_user_tweets_payload(load_payload(), 'hakuba_snow')
+        self.assertEqual([t['id'] for t in tweets], [
+            '1850000000000000001',
+            '1860000000000000005',
+            '1860000000000000004',
+            '1860000000000000001',
+            '1859000000000000001',
+        ])
+
+    def test_tweet_fields(self):
+        """与DOM爬虫相同的字典格式，包含互动数和媒体"""
+        tweet = parse_user_tweets_payload(load_payload(), 'hakuba_snow')[1]
+        self.assertEqual(tweet['text'], '本日の積雪 120cm！ゲレンデコンディション最高です @hakuba_info & 皆さまのお越しをお待ちしています')
+        self.assertEqual(tweet['created_at'], '2024-12-15T23:30:00+00:00')
+        self.assertEqual(tweet['published_at'], tweet['created_at'])
+        self.assertEqual((tweet['retweet_count'], tweet['like_count'], tweet['reply_count']), (8, 154, 6))
+        self.assertEqual(tweet['mentions'], ['@hakuba_info'])
+        self.assertEqual(len(tweet['media_urls']), 2)
+        self.assertTrue(tweet['avatar_url'].endswith('hakuba_snow_400x400.jpg'))
+
+    def test_hashtags_and_long_text(self):
+        """话题标签带#前缀，长推文使用note_tweet的完整文本"""
+        tweets = {t['id']: t for t in parse_user_tweets_payload(load_payload())}
+        self.assertEqual(tweets['1850000000000000001']['hashtags'], ['#白馬', '#スキー'])
+        self.assertTrue(tweets['1860000000000000001']['text'].startswith('【営業時間変更のお知らせ】'))
+        self.assertGreater(len(tweets['1860000000000000001']['text']), 280)
+
+    def test_pinned_flag(self):
+        tweets = parse_user_tweets_payload(load_payload())
+        self.assertEqual([t['is_pinned'] for t in tweets], [True, False, False, False, False])
+
+    def test_collector_stops_at_known_tweet(self):
+        """遇到已入库的推文（置顶除外）即停止，不收集更旧的推文"""
+        collector = GraphQLTimelineCollector('hakuba_snow', known_ids=['1850000000000000001', '1860000000000000004'])
+        collector.feed(load_payload())
+        self.assertTrue(collector.reached_known)
+        self.assertEqual([t['id'] for t in collector.tweets], ['1860000000000000005'])
+
+    def test_empty_or_unexpected_payload(self):
+        self.assertEqual(parse_user_tweets_payload({}), [])
+        self.assertEqual(parse_user_tweets_payload({'errors': [{'message': 'Rate limit exceeded'}]}), [])
+
+
+class CaptureUserTweetsTestCase(SimpleTestCase):
+    def test_returns_first_user_tweets_payload(self):
+        """忽略其他GraphQL请求，捕获到UserTweets响应即返回"""
+        page = FakePage([
+            FakeResponse('https://x.com/i/api/graphql/abc/UserByScreenName?variables=%7B%7D'),
+            FakeResponse('https://x.com/i/api/graphql/def/UserTweetsAndReplies?variables=%7B%7D'),
+            FakeResponse('https://x.com/i/api/graphql/ghi/UserTweets?variables=%7B%7D', load_payload()),
+        ])
+        tweets = capture_user_tweets(page, 'hakuba_snow', max_tweets=3)
+        self.assertEqual(page.visited, ['https://x.com/hakuba_snow'])
+        self.assertEqual(len(tweets), 3)
+
+    def test_returns_none_without_payload(self):
+        """未捕获到响应时返回None，由调用方回退到DOM解析"""
+        page = FakePage([])
+        self.assertIsNone(capture_user_tweets(page, 'hakuba_snow'))
+
+    def test_url_matching(self):
+        self.assertTrue(is_user_tweets_response(FakeResponse('https://x.com/i/api/graphql/q/UserTweets?variables=1')))
+        self.assertFalse(is_user_tweets_response(FakeResponse('https://x.com/i/api/graphql/q/UserTweetsAndReplies')))
+        self.assertFalse(is_user_tweets_response(FakeResponse('https://x.com/UserTweets')))
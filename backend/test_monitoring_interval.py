@@ -1,12 +1,15 @@
 """
 测试监控间隔功能
 """
+from unittest import mock
+from celery import current_app
 from django.test import TestCase
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import User
 from x_monitor.models import XAccount
-from x_monitor.tasks import monitor_all_active_accounts
+from x_monitor.services import XMonitorService, get_due_accounts
+from x_monitor.tasks import monitor_all_active_accounts, summarize_monitoring_run
 
 
 class MonitoringIntervalTestCase(TestCase):
@@ -101,6 +104,114 @@ class MonitoringIntervalTestCase(TestCase):
         self.assertEqual(self.account_4hours.monitoring_interval, 60)
         self.assertEqual(self.account_4hours.get_monitoring_interval_display(), '每1小时')
 
+    
+    def test_next_check_at_maintained(self):
+        """next_check_at 随 last_checked 和监控间隔更新"""
+        now = timezone.now()
+        self.assertIsNotNone(self.account_30min.next_check_at)
+        
+        self.account_30min.last_checked = now
+        self.account_30min.save()
+        self.assertEqual(self.account_30min.next_check_at, now + timedelta(minutes=30))
+        
+        self.account_30min.monitoring_interval = 60
+        self.account_30min.save(update_fields=['monitoring_interval'])
+        self.account_30min.refresh_from_db()
+        self.assertEqual(self.account_30min.next_check_at, now + timedelta(minutes=60))
+    
+    def test_unrelated_save_keeps_next_check_at(self):
+        """编辑其他字段时不覆盖失败重试的推迟时间和调度器的分发占位"""
+        now = timezone.now()
+        self.account_30min.last_checked = now
+        self.account_30min.save()
+        postponed = now + timedelta(hours=3)
+        XAccount.objects.filter(pk=self.account_30min.pk).update(next_check_at=postponed)
+
+        account = XAccount.objects.get(pk=self.account_30min.pk)
+        account.display_name = 'Hakuba'
+        account.save()
+        account.ai_filter_enabled = True
+        account.save(update_fields=['ai_filter_enabled'])
+        account.refresh_from_db()
+        self.assertEqual(account.next_check_at, postponed)
+
+        account.monitoring_interval = 60
+        account.save()
+        self.assertEqual(account.next_check_at, now + timedelta(minutes=60))
+    
+    def test_due_accounts_most_overdue_first(self):
+        """只选出到期的账户，逾期最久的优先，并限制数量"""
+        now = timezone.now()
+        self.account_30min.last_checked = now - timedelta(minutes=35)     # 逾期5分钟
+        self.account_30min.save()
+        self.account_1hour.last_checked = now - timedelta(minutes=20)     # 未到期
+        self.account_1hour.save()
+        self.account_4hours.last_checked = now - timedelta(hours=5)       # 逾期1小时
+        self.account_4hours.save()
+        self.account_12hours.is_active = False
+        self.account_12hours.save()
+        
+        with self.assertNumQueries(1):
+            due = get_due_accounts(now=now)
+        self.assertEqual(due, [self.account_4hours, self.account_30min])
+        
+        self.assertEqual(get_due_accounts(now=now, limit=1), [self.account_4hours])
+        self.assertEqual(get_due_accounts(now=now, interval=30), [self.account_30min])
+    
+    def test_failed_account_retried_later(self):
+        """监控失败的账户推迟重试，不再一直排在最前面"""
+        now = timezone.now()
+        service = XMonitorService()
+        service._record_failure(self.account_12hours, RuntimeError('timeout'), now)
+        
+        self.account_12hours.refresh_from_db()
+        self.assertGreater(self.account_12hours.next_check_at, now + timedelta(minutes=29))
+        self.assertNotIn(self.account_12hours, get_due_accounts())
+    
+    def test_due_accounts_fanned_out_with_summary(self):
+        """每个到期账户分发一个子任务，chord回调汇总结果；分发后不会被下一轮重复选中"""
+        now = timezone.now()
+        self.account_30min.last_checked = now - timedelta(minutes=35)
+        self.account_30min.save()
+        self.account_4hours.last_checked = now - timedelta(hours=5)
+        self.account_4hours.save()
+        XAccount.objects.filter(id__in=[self.account_1hour.id, self.account_12hours.id]).update(
+            next_check_at=now + timedelta(hours=1)
+        )
+        
+        def fake_monitor(service, account, **kwargs):
+            if account == self.account_4hours:
+                return {'success': False, 'error': 'page crashed'}
+            return {'success': True, 'new_tweets': 3}
+        
+        summaries = []
+        summarize = summarize_monitoring_run.run
+        
+        def capture_summary(*args):
+            summaries.append(summarize(*args))
+            return summaries[-1]
+        
+        # 在当前进程中同步执行子任务和chord回调
+        previous_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', previous_eager)
+        
+        with mock.patch.object(XMonitorService, 'monitor_account', autospec=True, side_effect=fake_monitor), \
+                mock.patch.object(summarize_monitoring_run, 'run', side_effect=capture_summary):
+            dispatched = monitor_all_active_accounts()
+        
+        self.assertEqual(dispatched['dispatched'], 2)
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0]['accounts'], 2)
+        self.assertEqual(summaries[0]['succeeded'], 1)
+        self.assertEqual(summaries[0]['failed'], 1)
+        self.assertEqual(summaries[0]['new_tweets'], 3)
+        self.assertEqual(summaries[0]['errors'], [{'account': 'test_4hours', 'error': 'page crashed'}])
+        
+        # monitor_account 被替换，没有写入新的 next_check_at：相当于子任务还在排队，不会被重复分发
+        result = monitor_all_active_accounts()
+        self.assertEqual(result, {'dispatched': 0})
+
 
 if __name__ == '__main__':
     import django
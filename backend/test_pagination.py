@@ -0,0 +1,108 @@
+"""
+测试游标分页（KeysetPagination）
+"""
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from x_monitor.models import XAccount, Tweet, AIAnalysis, RecommendedTweet
+from x_monitor.search import update_search_documents
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        now = timezone.now().replace(microsecond=123456)
+        # 发布时间和重要度有重复，游标需要靠 id 区分
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=str(i), content=f'積雪情報 {i}', ai_analyzed=True,
+                  posted_at=now - timedelta(minutes=i // 3))
+            for i in range(25)
+        ])
+        tweets = list(Tweet.objects.all())
+        for tweet in tweets:
+            if int(tweet.tweet_id) % 5:
+                AIAnalysis.objects.create(tweet=tweet, importance_score=int(tweet.tweet_id) % 4 / 4)
+        self.client = APIClient()
+
+    def pages(self, url, params, key):
+        """沿着 next 翻完所有页，返回每页的 key 列表和最后一页的响应"""
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([key(item) for item in response.data['results']])
+            if not response.data['next']:
+                return pages, response
+            response = self.client.get(response.data['next'])
+
+    def test_tweet_feed(self):
+        """按 (posted_at, id) 倒序翻页，不重复不遗漏；previous 返回上一页"""
+        self.client.force_authenticate(self.user)
+        pages, last = self.pages('/api/monitor/tweets/', {'limit': 7}, lambda item: item['id'])
+        self.assertEqual([len(page) for page in pages], [7, 7, 7, 4])
+        expected = list(Tweet.objects.order_by('-posted_at', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertNotIn('count', last.data)
+
+        previous = self.client.get(last.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], pages[-2])
+        first = self.client.get(self.client.get(previous.data['previous']).data['previous'])
+        self.assertEqual([item['id'] for item in first.data['results']], pages[0])
+        self.assertIsNone(first.data['previous'])
+
+    def test_constant_queries_per_page(self):
+        """深的页和第一页的查询数相同，不需要 COUNT(*)"""
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get('/api/monitor/tweets/', {'limit': 5})
+        for _ in range(3):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(deep), len(first))
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in deep.captured_queries))
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in deep.captured_queries))
+
+        response = self.client.get('/api/monitor/tweets/', {'limit': 5, 'count': 'true'})
+        self.assertEqual(response.data['count'], 25)
+
+    def test_mcp_resources(self):
+        """MCP 按 (重要度, posted_at, id) 翻页，没有AI分析的排在最后"""
+        pages, _ = self.pages('/api/mcp/tweets/', {'limit': 6}, lambda item: item['uri'].rsplit('/', 1)[-1])
+        tweet_ids = sum(pages, [])
+        self.assertEqual(len(tweet_ids), 25)
+        self.assertEqual(len(set(tweet_ids)), 25)
+        importance = dict(AIAnalysis.objects.values_list('tweet__tweet_id', 'importance_score'))
+        tweets = {tweet.tweet_id: tweet for tweet in Tweet.objects.all()}
+        keys = [
+            (importance.get(tweet_id, -1.0), tweets[tweet_id].posted_at, tweets[tweet_id].id)
+            for tweet_id in tweet_ids
+        ]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertTrue(all(int(tweet_id) % 5 == 0 for tweet_id in tweet_ids[-5:]))
+
+    def test_mcp_search_pages_by_rank(self):
+        update_search_documents(Tweet.objects.values_list('id', flat=True))
+        pages, _ = self.pages('/api/mcp/tweets/search/', {'q': '積雪', 'limit': 10},
+                              lambda item: item['uri'].rsplit('/', 1)[-1])
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(len(set(sum(pages, []))), 25)
+
+    def test_recommended_feed(self):
+        self.client.force_authenticate(self.user)
+        RecommendedTweet.objects.bulk_create([
+            RecommendedTweet(user=self.user, tweet=tweet, ai_reason='test') for tweet in Tweet.objects.all()[:12]
+        ])
+        pages, _ = self.pages('/api/monitor/ai/recommended/', {'limit': 5}, lambda item: item['id'])
+        self.assertEqual(sum(pages, []), list(
+            RecommendedTweet.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ))
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/monitor/tweets/', {'cursor': 'not-a-cursor'}).status_code, 404)
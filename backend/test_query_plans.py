@@ -0,0 +1,137 @@
+"""
+测试热点查询使用索引（SQLite 的 EXPLAIN QUERY PLAN）
+
+在种子数据上请求各列表接口，对主查询执行 EXPLAIN QUERY PLAN，确认读取主表时使用了预期的索引，
+而不是全表扫描。索引定义见 x_monitor/models.py 的 Meta.indexes。
+"""
+import re
+from datetime import timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from x_monitor.models import (
+    XAccount, Tweet, AIAnalysis, MonitoringLog, RecommendedTweet, UserNotification
+)
+from x_monitor.tasks import analyze_tweets_for_recommendation
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@example.com', username=f'user{i}', password='testpass123')
+            for i in range(5)
+        ]
+        cls.user = cls.users[0]
+        accounts = [
+            XAccount.objects.create(user=user, username=f'resort{i}_{j}')
+            for i, user in enumerate(cls.users) for j in range(4)
+        ]
+        cls.account = accounts[0]
+        Tweet.objects.bulk_create([
+            Tweet(x_account=account, tweet_id=f'{account.id}-{i}', content=f'tweet {i}',
+                  ai_analyzed=i % 4 != 0, ai_importance=i % 10 / 10 if i % 4 else -1.0,
+                  posted_at=now - timedelta(minutes=i))
+            for account in accounts for i in range(100)
+        ])
+        AIAnalysis.objects.bulk_create([
+            AIAnalysis(tweet=tweet, importance_score=tweet.ai_importance)
+            for tweet in Tweet.objects.filter(ai_analyzed=True)
+        ])
+        tweets = list(Tweet.objects.all()[:400])
+        RecommendedTweet.objects.bulk_create([
+            RecommendedTweet(user=user, tweet=tweet, ai_reason='', is_read=tweet.id % 3 == 0)
+            for user in cls.users for tweet in tweets[:80]
+        ])
+        UserNotification.objects.bulk_create([
+            UserNotification(user=user, notification_type='new_tweet', title=f'{i}', message='',
+                             is_read=i % 3 == 0)
+            for user in cls.users for i in range(80)
+        ])
+        MonitoringLog.objects.bulk_create([
+            MonitoringLog(x_account=account, tweets_found=i, execution_time=1.0)
+            for account in accounts for i in range(40)
+        ])
+        # 收集统计信息，查询计划与有数据的生产环境一致
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def main_query_plan(self, table, request):
+        """request 中第一个 FROM table 并排序的查询（列表本身，不是 COUNT）的计划"""
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        if hasattr(response, 'status_code'):
+            self.assertEqual(response.status_code, 200)
+        pattern = re.compile(rf'\bFROM "{table}"')
+        sql = next(query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and pattern.search(query['sql'])
+                   and 'ORDER BY' in query['sql'])
+        return self.plan(sql)
+
+    def assertUsesIndex(self, table, index, request):
+        plan = self.main_query_plan(table, request)
+        self.assertTrue(
+            any(re.search(rf'\b{table}\b.*USING (COVERING )?INDEX {index}\b', line) for line in plan),
+            f'{table} is not read through {index}: {plan}'
+        )
+
+    def test_account_tweets(self):
+        self.assertUsesIndex('x_monitor_tweet', 'tweet_account_feed_idx', lambda: self.client.get(
+            '/api/monitor/tweets/', {'account_id': self.account.id}
+        ))
+
+    def test_mcp_analyzed_tweets(self):
+        self.assertUsesIndex('x_monitor_tweet', 'tweet_analyzed_idx', lambda: self.client.get('/api/mcp/tweets/'))
+
+    def test_mcp_resources_by_importance(self):
+        """MCP资源按 (ai_importance, posted_at, id) 翻页，不需要对整个结果排序"""
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/mcp/tweets/')
+        self.assertUsesIndex('x_monitor_tweet', 'tweet_importance_idx', lambda: self.client.get(response.data['next']))
+        plan = self.main_query_plan('x_monitor_tweet', lambda: self.client.get(response.data['next']))
+        self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+
+    @override_settings(AI_BACKEND='stub', AI_STUB_LATENCY_MS=0)
+    def test_unanalyzed_tweets(self):
+        self.assertUsesIndex('x_monitor_tweet', 'tweet_unanalyzed_idx',
+                             lambda: analyze_tweets_for_recommendation(self.account.id))
+
+    def test_unread_recommendations(self):
+        self.assertUsesIndex('x_monitor_recommendedtweet', 'recommended_unread_idx', lambda: self.client.get(
+            '/api/monitor/ai/recommended/', {'is_read': 'false'}
+        ))
+
+    def test_recommendations(self):
+        self.assertUsesIndex('x_monitor_recommendedtweet', 'recommended_feed_idx', lambda: self.client.get(
+            '/api/monitor/ai/recommended/'
+        ))
+
+    def test_monitoring_logs(self):
+        self.assertUsesIndex('x_monitor_monitoringlog', 'monitoringlog_account_idx', lambda: self.client.get(
+            '/api/monitor/logs/'
+        ))
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex('x_monitor_usernotification', 'notification_unread_idx', lambda: self.client.get(
+            '/api/monitor/notifications/', {'is_read': 'false'}
+        ))
+
+    def test_notifications(self):
+        self.assertUsesIndex('x_monitor_usernotification', 'notification_feed_idx', lambda: self.client.get(
+            '/api/monitor/notifications/'
+        ))
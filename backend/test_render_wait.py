@@ -0,0 +1,69 @@
+"""
+测试自适应渲染等待（使用假的页面对象，不启动真实浏览器）
+"""
+import time
+from django.test import SimpleTestCase
+from x_monitor.render_wait import get_wait_stats, wait_for_render, wait_stats
+
+
+class FakePage:
+    def __init__(self, counts=None):
+        self.counts = list(counts or [])
+        self.handlers = {}
+        self.waited_ms = 0
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event):
+        for handler in self.handlers.get(event, []):
+            handler(object())
+
+    def evaluate(self, script, *args):
+        return self.counts.pop(0) if len(self.counts) > 1 else (self.counts[0] if self.counts else 0)
+
+    def wait_for_timeout(self, timeout):
+        self.waited_ms += timeout
+        time.sleep(timeout / 1000)
+
+
+class WaitForRenderTestCase(SimpleTestCase):
+    def setUp(self):
+        wait_stats.reset()
+
+    def test_resolves_when_new_articles_appear(self):
+        """出现新推文节点后立即结束，不等到截止时间"""
+        page = FakePage(counts=[3, 3, 5])
+        reason = wait_for_render(page, baseline=3, label='scroll', deadline_ms=5000, quiet_ms=10000)
+        self.assertEqual(reason, 'articles')
+        self.assertLess(page.waited_ms, 1000)
+
+    def test_resolves_when_network_quiet(self):
+        """没有新节点但网络安静后结束"""
+        page = FakePage(counts=[0])
+        reason = wait_for_render(page, label='scroll', deadline_ms=5000, quiet_ms=200)
+        self.assertEqual(reason, 'network_idle')
+        self.assertLess(page.waited_ms, 1000)
+
+    def test_hard_deadline_with_busy_network(self):
+        """网络一直繁忙时在截止时间结束"""
+        page = FakePage(counts=[0])
+        wait_for_render(page, label='warmup', deadline_ms=0, quiet_ms=0)
+        for _ in range(5):
+            page.emit('request')
+
+        started = time.monotonic()
+        reason = wait_for_render(page, label='initial', deadline_ms=300, quiet_ms=100)
+        self.assertEqual(reason, 'deadline')
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_wait_durations_recorded(self):
+        """按等待点记录次数、耗时和结束原因"""
+        page = FakePage(counts=[1])
+        wait_for_render(page, label='initial', deadline_ms=1000)
+        wait_for_render(page, label='initial', deadline_ms=1000)
+
+        stats = get_wait_stats()['initial']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['reasons'], {'articles': 2})
+        self.assertGreaterEqual(stats['max_ms'], stats['avg_ms'])
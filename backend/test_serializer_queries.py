@@ -0,0 +1,93 @@
+"""
+测试列表接口的查询数不随条数增加（没有 N+1 查询）
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from x_monitor.models import XAccount, Tweet, AIAnalysis, AIPromptRule, RecommendedTweet
+
+
+class ListQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.accounts = 0
+
+    def add_data(self, count):
+        """count 个账户（各3条推文）、规则和推荐"""
+        now = timezone.now()
+        for _ in range(count):
+            self.accounts += 1
+            account = XAccount.objects.create(user=self.user, username=f'resort{self.accounts}')
+            Tweet.objects.bulk_create([
+                Tweet(x_account=account, tweet_id=f'{account.id}-{i}', content=f'tweet {i}',
+                      ai_analyzed=True, ai_relevant=i == 0, posted_at=now)
+                for i in range(3)
+            ])
+            tweets = list(account.tweets.all())
+            AIAnalysis.objects.create(tweet=tweets[0], importance_score=0.5)
+            rule = AIPromptRule.objects.create(user=self.user, name=f'rule{self.accounts}', prompt='雪の情報')
+            rule.target_accounts.set([account])
+            RecommendedTweet.objects.bulk_create([
+                RecommendedTweet(user=self.user, tweet=tweet, prompt_rule=rule, ai_reason='') for tweet in tweets
+            ])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def assertConstantQueries(self, url):
+        self.add_data(2)
+        small, _ = self.count_queries(url)
+        self.add_data(5)
+        large, data = self.count_queries(url)
+        self.assertEqual(large, small, f'{url}: {small} queries for 2 accounts, {large} for 7')
+        return data
+
+    def test_accounts(self):
+        data = self.assertConstantQueries('/api/monitor/accounts/')
+        self.assertEqual({account['tweets_count'] for account in data['results']}, {3})
+
+    def test_rules(self):
+        data = self.assertConstantQueries('/api/monitor/ai/rules/')
+        rules = data['results'] if isinstance(data, dict) else data
+        self.assertEqual(len(rules), 7)
+        for rule in rules:
+            self.assertEqual(rule['recommended_count'], 3)
+            self.assertEqual(len(rule['target_account_details']), 1)
+            self.assertEqual(rule['target_accounts'], [rule['target_account_details'][0]['id']])
+
+    def test_tweets(self):
+        data = self.assertConstantQueries('/api/monitor/tweets/')
+        self.assertEqual(len(data['results']), 21)
+
+    def test_recommended_tweets(self):
+        data = self.assertConstantQueries('/api/monitor/ai/recommended/')
+        self.assertEqual(len(data['results']), 21)
+        self.assertTrue(all(item['prompt_rule_name'] for item in data['results']))
+
+    def test_mcp_accounts(self):
+        data = self.assertConstantQueries('/api/mcp/accounts/')
+        self.assertEqual(
+            {(item['metadata']['total_tweets'], item['metadata']['analyzed_tweets'],
+              item['metadata']['relevant_tweets']) for item in data['results']},
+            {(3, 3, 1)}
+        )
+
+    def test_single_objects_still_counted(self):
+        """单个对象（没有 annotate）时仍返回正确的数量"""
+        self.add_data(1)
+        account = XAccount.objects.get()
+        response = self.client.get(f'/api/monitor/accounts/{account.id}/')
+        self.assertEqual(response.data['tweets_count'], 3)
+        response = self.client.get(f'/api/mcp/accounts/{account.username}/')
+        self.assertEqual(response.data['metadata']['relevant_tweets'], 1)
+        rule = AIPromptRule.objects.get()
+        response = self.client.get(f'/api/monitor/ai/rules/{rule.id}/')
+        self.assertEqual(response.data['recommended_count'], 3)
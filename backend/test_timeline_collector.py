@@ -0,0 +1,120 @@
+"""
+测试时间线推文收集逻辑（页面内提取脚本返回的结构化数据）
+"""
+from django.test import SimpleTestCase
+from x_monitor.workaround_scraper import TimelineCollector
+
+
+def make_item(tweet_id, **kwargs):
+    item = {
+        'id': tweet_id,
+        'is_retweet': False,
+        'is_reply': False,
+        'has_text': True,
+        'text': f'推文 {tweet_id}',
+        'has_time': True,
+        'datetime': '2026-01-01T00:00:00.000Z',
+        'time_text': '1h',
+        'hashtags': [],
+        'mentions': [],
+        'media_urls': [],
+        'profile_image': None,
+    }
+    item.update(kwargs)
+    return item
+
+
+class TimelineCollectorTestCase(SimpleTestCase):
+    def test_collects_original_tweets_only(self):
+        """跳过转发和回复，只收集原创推文"""
+        collector = TimelineCollector('skiinfo', max_tweets=10)
+        new_count = collector.feed([
+            make_item('1'),
+            make_item('2', is_retweet=True),
+            make_item('3', is_reply=True),
+            make_item('4', hashtags=['#白馬'], media_urls=['https://pbs.twimg.com/media/a.jpg']),
+        ])
+
+        self.assertEqual(new_count, 2)
+        self.assertEqual([t['id'] for t in collector.tweets], ['1', '4'])
+        self.assertEqual(collector.tweets[1]['hashtags'], ['#白馬'])
+        self.assertEqual(collector.tweets[1]['created_at'], '2026-01-01T00:00:00.000Z')
+
+    def test_incremental_feeds_skip_seen_ids(self):
+        """多次滚动提取时不重复收集"""
+        collector = TimelineCollector('skiinfo', max_tweets=10)
+        collector.feed([make_item('1'), make_item('2')])
+        self.assertEqual(collector.feed([make_item('2'), make_item('3')]), 1)
+        self.assertEqual(len(collector.tweets), 3)
+
+    def test_stops_after_consecutive_non_original(self):
+        """连续5条转发/回复后停止"""
+        collector = TimelineCollector('skiinfo', max_tweets=10)
+        collector.feed([make_item(str(i), is_retweet=True) for i in range(6)] + [make_item('99')])
+
+        self.assertTrue(collector.hit_non_original_limit)
+        self.assertEqual(collector.tweets, [])
+
+    def test_relative_time_and_missing_time(self):
+        """没有datetime时解析相对时间，没有<time>时跳过"""
+        collector = TimelineCollector('skiinfo', max_tweets=10)
+        collector.feed([
+            make_item('1', datetime=None, time_text='47m'),
+            make_item('2', has_time=False, datetime=None),
+        ])
+
+        self.assertEqual([t['id'] for t in collector.tweets], ['1'])
+
+    def test_avatar_from_first_original_tweet(self):
+        """页面头部没有头像时，从第一条原创推文获取"""
+        collector = TimelineCollector('skiinfo', max_tweets=10)
+        collector.set_account_avatar(None)
+        collector.feed([make_item('1', profile_image='https://pbs.twimg.com/profile_images/x_normal.jpg')])
+
+        self.assertEqual(collector.account_avatar_url, 'https://pbs.twimg.com/profile_images/x_400x400.jpg')
+        self.assertEqual(collector.tweets[0]['avatar_url'], collector.account_avatar_url)
+
+    def test_max_tweets(self):
+        """收集够 max_tweets 条后停止"""
+        collector = TimelineCollector('skiinfo', max_tweets=2)
+        collector.feed([make_item(str(i)) for i in range(5)])
+
+        self.assertTrue(collector.is_full)
+        self.assertEqual(len(collector.tweets), 2)
+
+    def test_stops_at_known_tweet(self):
+        """遇到已入库的推文后停止，不再收集更旧的推文"""
+        collector = TimelineCollector('skiinfo', max_tweets=10, known_ids=['100', '98'])
+        collector.feed([
+            make_item('50', is_pinned=True),
+            make_item('103'),
+            make_item('102', is_retweet=True),
+            make_item('101'),
+            make_item('99'),
+            make_item('97'),
+        ])
+
+        self.assertTrue(collector.reached_known)
+        self.assertEqual([t['id'] for t in collector.tweets], ['103', '101'])
+
+    def test_known_pinned_tweet_does_not_stop(self):
+        """已入库的置顶推文（总在最前面）不触发停止"""
+        collector = TimelineCollector('skiinfo', max_tweets=10, known_ids=['100'])
+        collector.feed([make_item('60'), make_item('105'), make_item('104')])
+
+        self.assertFalse(collector.reached_known)
+        self.assertEqual([t['id'] for t in collector.tweets], ['105', '104'])
+
+    def test_known_tweets_kept_for_metrics(self):
+        """页面上已入库的推文带上互动数返回（is_known），不计入新推文"""
+        collector = TimelineCollector('skiinfo', max_tweets=10, known_ids=['100'])
+        collector.feed([
+            make_item('101', like_count=3, retweet_count=0, reply_count=1),
+            make_item('100', like_count=12, retweet_count=2, reply_count=0),
+            make_item('99'),
+        ])
+
+        self.assertEqual([t['id'] for t in collector.tweets], ['101'])
+        self.assertEqual(collector.tweets[0]['like_count'], 3)
+        self.assertEqual([(t['id'], t['like_count'], t['is_known']) for t in collector.refreshed], [('100', 12, True)])
+        self.assertEqual(len(collector.results), 2)
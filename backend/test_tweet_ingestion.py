@@ -0,0 +1,84 @@
+"""
+测试推文批量入库（monitor_account）
+"""
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from x_monitor.models import XAccount, Tweet, MonitoringLog
+from x_monitor.services import XMonitorService
+from x_monitor.tasks import evaluate_rules_for_new_tweets
+
+
+def make_tweet(tweet_id, **kwargs):
+    tweet = {
+        'id': tweet_id,
+        'text': f'ゲレンデ情報 {tweet_id}',
+        'created_at': timezone.now().isoformat(),
+        'hashtags': ['#白馬'],
+        'mentions': [],
+        'media_urls': [],
+        'retweet_count': 1,
+        'like_count': 2,
+        'reply_count': 3,
+    }
+    tweet.update(kwargs)
+    return tweet
+
+
+class TweetIngestionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        self.service = XMonitorService()
+
+    def monitor(self, tweets):
+        with mock.patch.object(self.service.scraper_client, 'get_recent_tweets', return_value=tweets):
+            return self.service.monitor_account(self.account)
+
+    def test_returns_exact_new_ids(self):
+        """已入库和重复的推文不计入，返回本次新保存的ID"""
+        Tweet.objects.create(x_account=self.account, tweet_id='1', content='', posted_at=timezone.now())
+
+        result = self.monitor([make_tweet('3'), make_tweet('2'), make_tweet('1'), make_tweet('3')])
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['new_tweet_ids'], ['3', '2'])
+        self.assertEqual(result['new_tweets'], 2)
+        self.assertEqual(Tweet.objects.count(), 3)
+        self.assertEqual(Tweet.objects.get(tweet_id='2').like_count, 2)
+
+        log = MonitoringLog.objects.get(x_account=self.account)
+        self.assertEqual((log.result, log.tweets_found), ('success', 2))
+        self.account.refresh_from_db()
+        self.assertIsNotNone(self.account.last_checked)
+
+    def test_query_count_independent_of_tweet_count(self):
+        """查询数不随推文数量增加"""
+        with self.assertNumQueries(12):
+            self.monitor([make_tweet(str(i)) for i in range(50)])
+        self.assertEqual(Tweet.objects.count(), 50)
+
+    def test_no_new_tweets(self):
+        Tweet.objects.create(x_account=self.account, tweet_id='1', content='', posted_at=timezone.now())
+
+        result = self.monitor([make_tweet('1')])
+
+        self.assertEqual(result['new_tweet_ids'], [])
+        self.assertEqual(MonitoringLog.objects.get(x_account=self.account).result, 'no_new_tweets')
+
+    def test_new_tweets_queued_for_rule_evaluation(self):
+        """提交后为新推文登记AI规则评估任务"""
+        with mock.patch.object(evaluate_rules_for_new_tweets, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.monitor([make_tweet('2'), make_tweet('1')])
+        delay.assert_called_once_with(self.account.id, ['2', '1'])
+
+        with mock.patch.object(evaluate_rules_for_new_tweets, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.monitor([make_tweet('2')])
+        delay.assert_not_called()
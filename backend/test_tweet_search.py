@@ -0,0 +1,90 @@
+"""
+测试推文全文检索（SQLite FTS5）
+"""
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from ai_service.services import GeminiService, analyze_tweet_with_ai
+from x_monitor.models import XAccount, Tweet, AIAnalysis, TweetSearchDocument
+from x_monitor.search import fts_available, query_terms, tokenize, update_search_documents
+from x_monitor.services import XMonitorService
+
+
+class TokenizeTestCase(SimpleTestCase):
+    def test_japanese_bigrams(self):
+        """日文切分为单字和bigram，英文按单词（全角统一为半角、小写）"""
+        self.assertEqual(tokenize('積雪ＰＯＷＤＥＲ'), ['積', '雪', '積雪', 'powder'])
+        self.assertEqual(query_terms('積雪情報 Pow'), [('積雪', False), ('雪情', False), ('情報', False), ('pow', True)])
+        self.assertEqual(query_terms('雪!'), [('雪', False)])
+        self.assertEqual(query_terms('!!'), [])
+
+
+class TweetSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        now = timezone.now()
+        contents = {
+            '1': '本日オープン！積雪120cm、パウダーです',
+            '2': '積雪情報：積雪80cm、新雪20cm。積雪は十分です',
+            '3': 'レストランの新メニューのお知らせ',
+            '4': 'Powder day! 雪質最高',
+        }
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=tweet_id, content=content, ai_analyzed=True, posted_at=now)
+            for tweet_id, content in contents.items()
+        ])
+        update_search_documents(Tweet.objects.values_list('id', flat=True))
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/api/mcp/tweets/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [resource['uri'].rsplit('/', 1)[-1] for resource in response.data['results']]
+
+    def test_ranked_full_text_search(self):
+        """使用FTS5检索，按相关度排序"""
+        self.assertTrue(fts_available())
+        self.assertEqual(self.search('積雪'), ['2', '1'])
+        self.assertEqual(self.search('積雪 パウダー'), ['1'])
+        self.assertEqual(set(self.search('雪')), {'1', '2', '4'})
+        self.assertEqual(self.search('pow'), ['4'])
+        self.assertEqual(self.search('白馬'), [])
+
+    def test_documents_follow_writes(self):
+        """推文入库和AI分析时更新检索文档，删除推文时从索引中移除"""
+        service = XMonitorService()
+        tweet_data = {
+            'id': '5', 'text': 'ゴンドラ運休のお知らせ', 'created_at': timezone.now().isoformat(),
+            'hashtags': ['#白馬'], 'mentions': [], 'media_urls': [],
+            'retweet_count': 0, 'like_count': 0, 'reply_count': 0,
+        }
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets', return_value=[tweet_data]):
+            service.monitor_account(self.account)
+        Tweet.objects.filter(tweet_id='5').update(ai_analyzed=True)
+        self.assertEqual(self.search('ゴンドラ'), ['5'])
+        self.assertEqual(self.search('白馬'), ['5'])
+
+        model = mock.Mock()
+        model.generate_content.return_value = mock.Mock(
+            text='{"sentiment": "neutral", "summary": "リフト営業案内", "topics": [], "importance_score": 0.5}'
+        )
+        with mock.patch.object(GeminiService, '_initialize_model', autospec=True,
+                               side_effect=lambda service: setattr(service, 'model', model)):
+            analyze_tweet_with_ai(Tweet.objects.get(tweet_id='3').id)
+        self.assertTrue(AIAnalysis.objects.filter(tweet__tweet_id='3').exists())
+        self.assertEqual(self.search('リフト'), ['3'])
+
+        Tweet.objects.filter(tweet_id='5').delete()
+        self.assertFalse(TweetSearchDocument.objects.filter(tweet__tweet_id='5').exists())
+        self.assertEqual(self.search('ゴンドラ'), [])
+
+    def test_updated_document_replaces_old_terms(self):
+        tweet = Tweet.objects.get(tweet_id='3')
+        tweet.content = 'ナイター営業開始'
+        tweet.save()
+        update_search_documents([tweet.id])
+        self.assertEqual(self.search('メニュー'), [])
+        self.assertEqual(self.search('ナイター'), ['3'])
@@ -0,0 +1,108 @@
+"""
+测试话题标签・提及・AI话题索引（TweetTag）
+"""
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from ai_service.services import GeminiService, analyze_tweet_with_ai
+from x_monitor.models import XAccount, Tweet, TweetTag
+from x_monitor.services import XMonitorService
+from x_monitor.tags import normalize_tag, parse_tags, update_tweet_tags
+
+
+class NormalizeTagTestCase(SimpleTestCase):
+    def test_normalize(self):
+        """全角统一为半角、小写，去掉开头的 # / @"""
+        self.assertEqual(normalize_tag('#スキー場'), 'スキー場')
+        self.assertEqual(normalize_tag('＃ＰＯＷＤＥＲ'), 'powder')
+        self.assertEqual(normalize_tag('@Hakuba_Info'), 'hakuba_info')
+        self.assertEqual(parse_tags(' #powder, Powder,,スキー場 '), ['powder', 'スキー場'])
+        self.assertEqual(parse_tags(None), [])
+
+
+class TweetTagTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.account = XAccount.objects.create(user=self.user, username='hakuba')
+        now = timezone.now()
+        tweets = {
+            '1': (['#スキー場', '#powder'], ['@hakuba47'], now),
+            '2': (['#スキー場'], [], now - timedelta(days=1)),
+            '3': (['#Powder'], [], now - timedelta(days=2)),
+            '4': (['#スキー場'], [], now - timedelta(days=30)),
+        }
+        Tweet.objects.bulk_create([
+            Tweet(x_account=self.account, tweet_id=tweet_id, content=f'tweet {tweet_id}', hashtags=hashtags,
+                  mentions=mentions, ai_analyzed=True, posted_at=posted_at)
+            for tweet_id, (hashtags, mentions, posted_at) in tweets.items()
+        ])
+        update_tweet_tags(Tweet.objects.values_list('id', flat=True))
+        self.client = APIClient()
+
+    def search(self, **params):
+        response = self.client.get('/api/mcp/tweets/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(resource['uri'].rsplit('/', 1)[-1] for resource in response.data['results'])
+
+    def test_filter_by_tags(self):
+        """多个标签默认AND，match=any 为OR；# / @ 和大小写不影响"""
+        self.assertEqual(self.search(hashtags='スキー場'), ['1', '2', '4'])
+        self.assertEqual(self.search(hashtags='#スキー場,POWDER'), ['1'])
+        self.assertEqual(self.search(hashtags='スキー場,powder', match='any'), ['1', '2', '3', '4'])
+        self.assertEqual(self.search(mentions='Hakuba47'), ['1'])
+        self.assertEqual(self.search(hashtags='スキー場', mentions='@hakuba47'), ['1'])
+        self.assertEqual(self.search(hashtags='snowboard'), [])
+
+    def test_top_tags(self):
+        """一段时间内出现最多的标签"""
+        response = self.client.get('/api/mcp/tweets/tags/', {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tags'], [{'value': 'powder', 'count': 2}, {'value': 'スキー場', 'count': 2}])
+
+        response = self.client.get('/api/mcp/tweets/tags/', {'days': 0, 'limit': 1})
+        self.assertEqual(response.data['tags'], [{'value': 'スキー場', 'count': 3}])
+
+        response = self.client.get('/api/mcp/tweets/tags/', {'kind': 'mention'})
+        self.assertEqual(response.data['tags'], [{'value': 'hakuba47', 'count': 1}])
+
+        self.assertEqual(self.client.get('/api/mcp/tweets/tags/', {'kind': 'emoji'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/mcp/tweets/tags/', {'days': 'week'}).status_code, 400)
+
+    def test_tags_follow_writes(self):
+        """推文入库时保存话题标签・提及，AI分析时保存话题"""
+        service = XMonitorService()
+        tweet_data = {
+            'id': '5', 'text': 'ゴンドラ運休のお知らせ', 'created_at': timezone.now().isoformat(),
+            'hashtags': ['#白馬', '#白馬'], 'mentions': ['@Hakuba47'], 'media_urls': [],
+            'retweet_count': 0, 'like_count': 0, 'reply_count': 0,
+        }
+        with mock.patch.object(service.scraper_client, 'get_recent_tweets', return_value=[tweet_data]):
+            service.monitor_account(self.account)
+        self.assertEqual(
+            set(TweetTag.objects.filter(tweet__tweet_id='5').values_list('kind', 'value')),
+            {('hashtag', '白馬'), ('mention', 'hakuba47')}
+        )
+
+        model = mock.Mock()
+        model.generate_content.return_value = mock.Mock(
+            text='{"sentiment": "neutral", "summary": "運休", "topics": ["ゴンドラ", "運休"], "importance_score": 0.5}'
+        )
+        with mock.patch.object(GeminiService, '_initialize_model', autospec=True,
+                               side_effect=lambda service: setattr(service, 'model', model)):
+            analyze_tweet_with_ai(Tweet.objects.get(tweet_id='5').id)
+        Tweet.objects.filter(tweet_id='5').update(ai_analyzed=True)
+        self.assertEqual(self.search(topics='ゴンドラ,運休'), ['5'])
+        self.assertEqual(self.search(hashtags='白馬'), ['5'])
+
+        Tweet.objects.filter(tweet_id='5').delete()
+        self.assertFalse(TweetTag.objects.filter(tweet__tweet_id='5').exists())
+
+    def test_rebuild_command(self):
+        TweetTag.objects.all().delete()
+        call_command('rebuild_tweet_tags', batch_size=3, stdout=mock.Mock())
+        self.assertEqual(TweetTag.objects.filter(kind='hashtag').count(), 5)
+        self.assertEqual(self.search(hashtags='powder'), ['1', '3'])
@@ -0,0 +1,244 @@
+"""
+账户级租约：同一个X账户同一时间只允许一个进程抓取
+
+定时调度、用户手动触发（monitor_account_now / fetch_latest_tweets）、
+trigger_monitoring 和 monitor_today_tweets 都会调用 XMonitorService.monitor_account，
+同一账户被同时触发时每次都会多启动一个Chromium。这里在Redis中为每个账户保存一个租约：
+
+- 获取租约: SET key token NX PX ttl，拿到的进程执行抓取
+- 抓取结束: 把结果（附带租约token）写入结果键，再用token比对删除租约
+- 没拿到租约: 等待持有者结束并复用它的结果（wait=False 时直接跳过）
+- 持有者崩溃: 租约到期后自动消失，等待方重新获取
+
+Redis不可用时（本地开发等）退回到进程内的租约，并且所有操作都不会阻止抓取。
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY = 'x_monitor:account_lease:{}'
+RESULT_KEY = 'x_monitor:account_result:{}'
+
+# 只删除自己持有的租约（持有者超时后租约可能已被别人获取）
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# 等待其他进程的抓取结果时的轮询间隔（秒）
+WAIT_POLL_SECONDS = 0.5
+
+# 抓取结果保留时间（秒），只需要覆盖等待方读取的时间
+RESULT_TTL_SECONDS = 60
+
+
+class LocalLeaseStore:
+    """进程内的租约存储（没有Redis时使用，只能防止同一进程内的重复抓取）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _get(self, key: str) -> Optional[str]:
+        value, expires_at = self._values.get(key, (None, 0))
+        if value is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    def set_nx(self, key: str, value: str, ttl_ms: int) -> bool:
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._values[key] = (value, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def set(self, key: str, value: str, ttl_ms: int):
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl_ms / 1000)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get(key)
+
+    def delete_if(self, key: str, value: str):
+        with self._lock:
+            if self._get(key) == value:
+                del self._values[key]
+
+
+class RedisLeaseStore:
+    """Redis中的租约存储；Redis出错时不阻止抓取（获取租约视为成功）"""
+
+    def __init__(self, client):
+        self.client = client
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def set_nx(self, key: str, value: str, ttl_ms: int) -> bool:
+        try:
+            return bool(self.client.set(key, value, nx=True, px=ttl_ms))
+        except Exception as e:
+            logger.warning(f"获取账户租约失败，不加锁继续抓取: {e}")
+            return True
+
+    def set(self, key: str, value: str, ttl_ms: int):
+        try:
+            self.client.set(key, value, px=ttl_ms)
+        except Exception as e:
+            logger.warning(f"保存抓取结果失败: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            logger.warning(f"读取账户租约失败: {e}")
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def delete_if(self, key: str, value: str):
+        try:
+            self._release(keys=[key], args=[value])
+        except Exception as e:
+            logger.warning(f"释放账户租约失败（将在到期后自动释放）: {e}")
+
+
+_local_store = LocalLeaseStore()
+_redis_stores = {}
+# 连接失败的Redis: {url: 重新尝试连接的时间（time.monotonic()）}
+_redis_unavailable = {}
+
+
+def get_lease_store():
+    """返回租约存储：ACCOUNT_LEASE_REDIS_URL（默认与Celery broker相同）可连接时使用Redis"""
+    url = getattr(settings, 'ACCOUNT_LEASE_REDIS_URL', None)
+    if url is None:
+        url = getattr(settings, 'CELERY_BROKER_URL', '')
+    if not url:
+        return _local_store
+
+    store = _redis_stores.get(url)
+    if store is not None:
+        return store
+    # 连接失败后一段时间内不再尝试，每次调用不必再等待连接超时
+    if time.monotonic() < _redis_unavailable.get(url, 0):
+        return _local_store
+    try:
+        import redis
+        client = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=5)
+        client.ping()
+    except Exception as e:
+        retry_seconds = getattr(settings, 'ACCOUNT_LEASE_REDIS_RETRY_SECONDS', 60)
+        _redis_unavailable[url] = time.monotonic() + retry_seconds
+        logger.warning(f"Redis不可用，{retry_seconds}秒内使用进程内的账户租约: {e}")
+        return _local_store
+    _redis_unavailable.pop(url, None)
+    store = _redis_stores[url] = RedisLeaseStore(client)
+    return store
+
+
+def get_lease_seconds() -> int:
+    """租约有效期：覆盖单个账户监控的最长时间（默认与监控任务的硬超时相同）"""
+    default = getattr(settings, 'MONITOR_TASK_SOFT_TIME_LIMIT', 300) + 60
+    return getattr(settings, 'ACCOUNT_LEASE_SECONDS', default)
+
+
+class AccountLease:
+    """单个账户的租约"""
+
+    def __init__(self, account_id: int, ttl_seconds: int = None, store=None):
+        self.account_id = account_id
+        self.key = LEASE_KEY.format(account_id)
+        self.result_key = RESULT_KEY.format(account_id)
+        self.ttl_ms = int((ttl_seconds or get_lease_seconds()) * 1000)
+        self.store = store or get_lease_store()
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return self.store.set_nx(self.key, self.token, self.ttl_ms)
+
+    def holder(self) -> Optional[str]:
+        """当前持有者的token（没有人持有时返回None）"""
+        return self.store.get(self.key)
+
+    def release(self, result: dict = None):
+        """释放租约；传入 result 时先发布结果供等待方复用"""
+        if result is not None:
+            payload = json.dumps({'lease': self.token, 'result': result}, default=str)
+            self.store.set(self.result_key, payload, RESULT_TTL_SECONDS * 1000)
+        self.store.delete_if(self.key, self.token)
+
+    def wait_for_result(self, holder: str, timeout: float) -> Optional[dict]:
+        """
+        等待 holder 释放租约，返回它发布的结果
+
+        Returns:
+            结果字典；超时或持有者没有发布结果（崩溃后租约到期）时返回None
+        """
+        deadline = time.monotonic() + timeout
+        while self.store.get(self.key) == holder:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(WAIT_POLL_SECONDS)
+
+        payload = self.store.get(self.result_key)
+        if not payload:
+            return None
+        published = json.loads(payload)
+        if published.get('lease') != holder:
+            return None
+        return published['result']
+
+
+def run_exclusive(account_id: int, func: Callable[[], dict], wait: bool = True,
+                  wait_timeout: float = None) -> dict:
+    """
+    持有账户租约执行 func（监控一个账户）
+
+    Args:
+        wait: 其他进程正在抓取该账户时，是否等待并复用它的结果；False 时直接返回 skipped
+        wait_timeout: 最长等待时间（秒，默认: ACCOUNT_LEASE_WAIT_SECONDS）
+
+    Returns:
+        func 的结果；复用的结果带 reused=True，跳过时带 skipped=True
+    """
+    if wait_timeout is None:
+        wait_timeout = getattr(settings, 'ACCOUNT_LEASE_WAIT_SECONDS', 120)
+    lease = AccountLease(account_id)
+    deadline = time.monotonic() + wait_timeout
+
+    while True:
+        if lease.acquire():
+            result = None
+            try:
+                result = func()
+                return result
+            finally:
+                lease.release(result)
+
+        holder = lease.holder()
+        if holder is None:
+            # 持有者刚刚释放，重新获取
+            continue
+        if not wait:
+            logger.info(f"账户 {account_id} 正在被其他进程监控，跳过")
+            return {'success': True, 'skipped': True, 'new_tweets': 0}
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(f"等待账户 {account_id} 的监控结果超时")
+            return {'success': False, 'error': 'Account is being monitored by another worker'}
+
+        logger.info(f"账户 {account_id} 正在被其他进程监控，等待其结果")
+        result = lease.wait_for_result(holder, remaining)
+        if result is not None:
+            return dict(result, reused=True)
+        # 等待超时，或持有者崩溃后租约到期：回到循环开头重新获取
@@ -22,6 +22,11 @@ from django.conf import settings
 from django.utils import timezone as django_timezone
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
+from .browser_pool import get_browser_pool
+from .render_wait import (
+    COUNT_UNSEEN_TWEETS_SCRIPT, INITIAL_NETWORK_QUIET_MS, TWEET_SELECTOR,
+    get_scroll_deadline_ms, wait_for_render, watch_network
+)
 import re
 import random
 import time
@@ -67,77 +72,6 @@ class AuthenticatedXScraperClient:
         except Exception as e:
             logger.error(f"Failed to save cookies: {e}")
     
-    def _create_authenticated_context(self, playwright):
-        """创建带认证的浏览器上下文，伪装成真实的Windows Chrome浏览器"""
-        browser = playwright.chromium.launch(
-            headless=True,  # 改回headless模式
-            args=[
-                '--disable-blink-features=AutomationControlled',  # 隐藏自动化特征
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-            ]
-        )
-        
-        # 模拟真实的Windows 10 Chrome浏览器
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},  # 常见的桌面分辨率
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',  # 最新Chrome版本
-            locale='ja-JP',  # 日本地区
-            timezone_id='Asia/Tokyo',  # 东京时区
-            bypass_csp=True,  # 添加bypass_csp（debug_scrape_url有这个）
-            java_script_enabled=True,
-            extra_http_headers={
-                'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-User': '?1',
-                'Sec-Fetch-Dest': 'document',
-                'sec-ch-ua': '"Chromium";v="131", "Not_A Brand";v="24"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"Windows"',
-            },
-            # 模拟屏幕和设备信息
-            screen={'width': 1920, 'height': 1080},
-            device_scale_factor=1,
-            has_touch=False,
-            is_mobile=False,
-        )
-        
-        # 注入脚本隐藏 WebDriver 特征
-        context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-            
-            // 伪装Chrome运行环境
-            window.chrome = {
-                runtime: {}
-            };
-            
-            // 覆盖权限查询
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
-        """)
-        
-        # 加载cookies
-        cookies = self._load_cookies()
-        if cookies:
-            context.add_cookies(cookies)
-            logger.info("Added cookies to browser context")
-        else:
-            logger.warning("No cookies available, scraper will access as guest")
-        
-        return browser, context
-    
     def _extract_tweet_id(self, tweet_url: str) -> Optional[str]:
         """从URL中提取tweet ID"""
         match = re.search(r'/status/(\d+)', tweet_url)
@@ -148,10 +82,7 @@ class AuthenticatedXScraperClient:
         try:
             self._add_random_delay()
             
-            with sync_playwright() as p:
-                browser, context = self._create_authenticated_context(p)
-                page = context.new_page()
-                
+            with get_browser_pool().page('authenticated') as page:
                 url = f"{self.base_url}/{username}"
                 page.goto(url, wait_until='domcontentloaded', timeout=30000)
                 page.wait_for_timeout(2000)
@@ -185,8 +116,6 @@ class AuthenticatedXScraperClient:
                         avatar_url = elem.get('src')
                         break
                 
-                browser.close()
-                
                 return {
                     'id': username,
                     'username': username,
@@ -205,10 +134,7 @@ class AuthenticatedXScraperClient:
             
             logger.info(f"Fetching up to {max_results} tweets for @{username} (authenticated)")
             
-            with sync_playwright() as p:
-                browser, context = self._create_authenticated_context(p)
-                page = context.new_page()
-                
+            with get_browser_pool().page('authenticated') as page:
                 # 访问用户的推文页面（帖子标签页）
                 # 注意：X.com 的用户主页默认可能显示算法排序的推文
                 # 但是当我们滚动到顶部后，应该能看到最新的推文
@@ -217,20 +143,12 @@ class AuthenticatedXScraperClient:
                 
                 try:
                     # 使用domcontentloaded代替networkidle，更可靠
+                    watch_network(page)
                     page.goto(url, wait_until='domcontentloaded', timeout=90000)
                     logger.info("Page loaded, waiting for React to render tweets...")
                     
-                    # 关键修复：等待直到页面大小增长（说明React渲染完成）
-                    max_wait = 15  # 最多等15秒
-                    for i in range(max_wait):
-                        page.wait_for_timeout(1000)  # 每次等1秒
-                        html_size = len(page.content())
-                        logger.info(f"Wait {i+1}s: HTML size = {html_size} bytes")
-                        
-                        # 如果HTML超过400KB，说明内容加载了
-                        if html_size > 400000:
-                            logger.info(f"Content loaded (size: {html_size} bytes)")
-                            break
+                    # 等待直到推文出现或网络安静（代替每秒轮询HTML大小）
+                    wait_for_render(page, label='auth_initial', quiet_ms=INITIAL_NETWORK_QUIET_MS)
                     
                     logger.info("Checking for tweets...")
                     
@@ -250,19 +168,20 @@ class AuthenticatedXScraperClient:
                     # 滚动到页面顶部，确保从最新推文开始
                     logger.info("Scrolling to top to ensure latest tweets...")
                     page.evaluate('window.scrollTo(0, 0)')
-                    page.wait_for_timeout(2000)
+                    wait_for_render(page, baseline=page.evaluate(COUNT_UNSEEN_TWEETS_SCRIPT, TWEET_SELECTOR),
+                                    label='auth_scroll_top', deadline_ms=get_scroll_deadline_ms())
                     
                 except PlaywrightTimeoutError as e:
                     logger.error(f"Timeout waiting for page: {e}")
                     logger.info("Waiting additional time for page to load...")
-                    # 即使超时，也多等待一些时间让页面加载
-                    page.wait_for_timeout(10000)  # 额外等待10秒
+                    # 即使超时，也再等待推文出现（最多到截止时间）
+                    wait_for_render(page, label='auth_timeout_retry')
                     
                     # 尝试滚动页面，触发动态加载
                     logger.info("Trying to scroll to trigger content loading...")
                     for _ in range(3):
                         page.evaluate('window.scrollBy(0, 500)')
-                        page.wait_for_timeout(1000)
+                        wait_for_render(page, label='auth_timeout_scroll', deadline_ms=get_scroll_deadline_ms())
                     
                     # 检查是否有推文加载出来
                     tweet_count = page.evaluate('document.querySelectorAll(\'article[data-testid="tweet"]\').length')
@@ -283,8 +202,9 @@ class AuthenticatedXScraperClient:
                 logger.info("Scrolling to load more tweets...")
                 for scroll_count in range(10):
                     prev_height = page.evaluate('document.body.scrollHeight')
+                    prev_count = page.evaluate(COUNT_UNSEEN_TWEETS_SCRIPT, TWEET_SELECTOR)
                     page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    page.wait_for_timeout(2000)
+                    wait_for_render(page, baseline=prev_count, label='auth_scroll', deadline_ms=get_scroll_deadline_ms())
                     
                     tweet_count = page.evaluate('document.querySelectorAll(\'article[data-testid="tweet"]\').length')
                     new_height = page.evaluate('document.body.scrollHeight')
@@ -314,7 +234,6 @@ class AuthenticatedXScraperClient:
                     logger.warning(f"Failed to save debug HTML: {e}")
                 
                 soup = BeautifulSoup(html, 'lxml')
-                browser.close()
                 
                 # 解析推文
                 tweets = []
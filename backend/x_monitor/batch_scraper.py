@@ -0,0 +1,128 @@
+"""
+并发批量爬虫：在一个已登录的浏览器上下文中同时打开多个标签页，
+并行抓取多个账户的时间线
+
+单个账户的抓取大部分时间都在等待页面渲染和滚动加载，
+多个标签页并行可以让这些等待互相重叠。
+
+使用方法：
+    from x_monitor.batch_scraper import scrape_timelines_batch
+
+    results = scrape_timelines_batch(['user_a', 'user_b'], max_tweets=20, concurrency=4)
+    # {'user_a': [...], 'user_b': [...]}，单个账户失败时值为异常对象
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Union
+
+from django.conf import settings
+
+from .browser_pool import get_async_browser_pool, get_cookies_file
+from .graphql_scraper import capture_user_tweets_async
+from .render_wait import INITIAL_NETWORK_QUIET_MS, get_scroll_deadline_ms, wait_for_render_async, watch_network
+from .workaround_scraper import EXTRACT_ACCOUNT_AVATAR_SCRIPT, EXTRACT_NEW_TWEETS_SCRIPT, TimelineCollector, get_scraper_mode
+
+logger = logging.getLogger(__name__)
+
+
+async def _scrape_timeline(context, semaphore: asyncio.Semaphore, username: str, max_tweets: int,
+                           known_ids=None) -> List[Dict]:
+    """在新标签页中抓取单个账户的时间线（与 scrape_with_working_method 相同的收集逻辑）"""
+    async with semaphore:
+        url = f"https://x.com/{username}"
+        page = await context.new_page()
+        watch_network(page)
+        try:
+            if get_scraper_mode() == 'graphql':
+                tweets = await capture_user_tweets_async(page, username, max_tweets, known_ids=known_ids)
+                if tweets is not None:
+                    return tweets
+                logger.warning(f"[batch] @{username}: GraphQL模式失败，回退到DOM解析")
+            else:
+                logger.info(f"[batch] 访问: {url}")
+                try:
+                    await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                except Exception as e:
+                    logger.warning(f"[batch] @{username} domcontentloaded 超时，尝试 load: {e}")
+                    try:
+                        await page.goto(url, wait_until='load', timeout=60000)
+                    except Exception as e2:
+                        logger.warning(f"[batch] @{username} load 也超时: {e2}")
+
+            # 等待推文元素出现或网络安静（其他标签页的等待与此重叠）
+            if await wait_for_render_async(page, label='batch_initial', quiet_ms=INITIAL_NETWORK_QUIET_MS) != 'articles':
+                logger.warning(f"[batch] @{username} 未检测到推文元素，但继续解析")
+
+            collector = TimelineCollector(username, max_tweets, known_ids=known_ids)
+            collector.set_account_avatar(await page.evaluate(EXTRACT_ACCOUNT_AVATAR_SCRIPT, username))
+
+            scroll_attempts = 0
+            max_scroll_attempts = 5
+            no_new_tweets_count = 0
+            while (scroll_attempts < max_scroll_attempts and not collector.is_full
+                   and not collector.reached_known and no_new_tweets_count < 2):
+                if collector.feed(await page.evaluate(EXTRACT_NEW_TWEETS_SCRIPT)) > 0:
+                    no_new_tweets_count = 0
+                else:
+                    no_new_tweets_count += 1
+
+                if collector.is_full or collector.reached_known or collector.hit_non_original_limit:
+                    break
+
+                scroll_attempts += 1
+                if scroll_attempts < max_scroll_attempts:
+                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                    await wait_for_render_async(page, label='batch_scroll', deadline_ms=get_scroll_deadline_ms())
+
+            logger.info(f"[batch] @{username}: 成功解析 {len(collector.tweets)} 条原创推文")
+            return collector.results
+        finally:
+            await page.close()
+
+
+async def _scrape_batch(context, usernames: List[str], max_tweets: int, concurrency: int,
+                       known_ids: Dict[str, Iterable[str]]) -> Dict[str, Union[List[Dict], Exception]]:
+    """在常驻浏览器的上下文中并发抓取（上下文由 AsyncBrowserPool 提供，不在这里关闭）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *[_scrape_timeline(context, semaphore, username, max_tweets, known_ids.get(username))
+          for username in usernames],
+        return_exceptions=True
+    )
+
+    for username, result in zip(usernames, results):
+        if isinstance(result, Exception):
+            logger.error(f"[batch] 抓取 @{username} 失败: {result}")
+    return dict(zip(usernames, results))
+
+
+def scrape_timelines_batch(usernames: List[str], max_tweets: int = 20, concurrency: int = None,
+                           known_ids: Dict[str, Iterable[str]] = None) -> Dict[str, Union[List[Dict], Exception]]:
+    """
+    并发抓取多个账户的时间线
+
+    Args:
+        usernames: X.com用户名列表（重复的用户名只抓取一次）
+        max_tweets: 每个账户最多收集的原创推文数
+        concurrency: 同一浏览器内同时打开的标签页上限（默认: SCRAPER_BATCH_CONCURRENCY）
+        known_ids: {username: 最近已入库的推文ID}，遇到后停止滚动
+
+    Returns:
+        {username: 推文列表}，抓取失败的账户值为异常对象
+    """
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return {}
+
+    cookie_file = get_cookies_file()
+    if not cookie_file.exists():
+        logger.error(f"Cookie文件不存在: {cookie_file}")
+        return {username: [] for username in usernames}
+
+    concurrency = concurrency or getattr(settings, 'SCRAPER_BATCH_CONCURRENCY', 4)
+    logger.info(f"[batch] 并发抓取 {len(usernames)} 个账户（并发上限 {concurrency}）")
+    return get_async_browser_pool().run(
+        lambda context: _scrape_batch(context, usernames, max_tweets, concurrency, known_ids or {}),
+        profile='workaround',
+        pages=len(usernames)
+    )
@@ -0,0 +1,634 @@
+"""
+常驻 Chromium 浏览器池
+
+每个 worker 进程（每个线程）只启动一次 Chromium，按 profile 维护预热的 BrowserContext，
+抓取时借出 Page、用完归还。浏览器在累计打开 N 个页面或内存超过上限后自动回收重启，
+避免每个账户都重新 launch 一次浏览器（每次耗时数秒、占用数百MB）。
+
+Web 请求线程（视图中直接抓取时）的浏览器池在请求结束时关闭（request_finished 信号），
+不会在每个请求线程里留下一个 Chromium 进程。常驻只用于 Celery worker。
+sync playwright 对象只能在创建它的线程中使用，浏览器池都由自己的线程关闭：
+请求线程在 request_finished 时，Celery prefork 子进程在 worker_process_shutdown 时，
+主线程在 atexit 时（atexit 不关闭其他线程的浏览器池）。
+
+并发批量爬虫（batch_scraper）使用 async playwright，对象绑定在创建它的事件循环上，
+不能用 asyncio.run() 每次新建循环。AsyncBrowserPool 在专用线程中运行一个常驻事件循环，
+浏览器和上下文在各批次之间复用（每个进程一个，get_async_browser_pool()）。
+
+使用方法：
+    from x_monitor.browser_pool import get_browser_pool
+
+    with get_browser_pool().page('workaround') as page:
+        page.goto('https://x.com/username')
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.signals import request_finished
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',  # 隐藏自动化特征
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+]
+
+WEBDRIVER_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
+
+# 各爬虫原有的浏览器上下文配置，按 profile 名称区分
+CONTEXT_PROFILES = {
+    # workaround_scraper / debug_scrape_url 使用的配置
+    'workaround': {
+        'options': {
+            'viewport': {'width': 1920, 'height': 1080},
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+            'locale': 'ja-JP',
+            'timezone_id': 'Asia/Tokyo',
+            'device_scale_factor': 1,
+            'has_touch': False,
+            'java_script_enabled': True,
+            'bypass_csp': True,
+        },
+        'init_script': WEBDRIVER_INIT_SCRIPT,
+        'cookies': True,
+    },
+    # AuthenticatedXScraperClient 使用的配置（模拟真实的Windows Chrome浏览器）
+    'authenticated': {
+        'options': {
+            'viewport': {'width': 1920, 'height': 1080},
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+            'locale': 'ja-JP',
+            'timezone_id': 'Asia/Tokyo',
+            'bypass_csp': True,
+            'java_script_enabled': True,
+            'extra_http_headers': {
+                'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Sec-Fetch-Site': 'none',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-User': '?1',
+                'Sec-Fetch-Dest': 'document',
+                'sec-ch-ua': '"Chromium";v="131", "Not_A Brand";v="24"',
+                'sec-ch-ua-mobile': '?0',
+                'sec-ch-ua-platform': '"Windows"',
+            },
+            'screen': {'width': 1920, 'height': 1080},
+            'device_scale_factor': 1,
+            'has_touch': False,
+            'is_mobile': False,
+        },
+        'init_script': WEBDRIVER_INIT_SCRIPT + """
+            // 伪装Chrome运行环境
+            window.chrome = {
+                runtime: {}
+            };
+
+            // 覆盖权限查询
+            const originalQuery = window.navigator.permissions.query;
+            window.navigator.permissions.query = (parameters) => (
+                parameters.name === 'notifications' ?
+                    Promise.resolve({ state: Notification.permission }) :
+                    originalQuery(parameters)
+            );
+        """,
+        'cookies': True,
+    },
+    # XScraperClient（游客模式）使用的配置
+    'guest': {
+        'options': {
+            'viewport': {'width': 1280, 'height': 720},
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'extra_http_headers': {
+                'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
+            },
+        },
+        'init_script': None,
+        'cookies': False,
+    },
+}
+
+
+def get_cookies_file() -> Path:
+    """X.com cookies 文件路径"""
+    return Path(settings.BASE_DIR) / 'data' / 'x_cookies.json'
+
+
+def _cookies_mtime() -> Optional[float]:
+    try:
+        return get_cookies_file().stat().st_mtime
+    except OSError:
+        return None
+
+
+def load_cookies() -> Optional[List[Dict]]:
+    cookie_file = get_cookies_file()
+    if not cookie_file.exists():
+        return None
+    try:
+        with open(cookie_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load cookies: {e}")
+        return None
+
+
+def _child_processes_rss_mb() -> Optional[float]:
+    """当前进程所有子孙进程（playwright driver + Chromium）的RSS合计（MB）
+
+    仅支持 Linux（读取 /proc），其他平台返回 None，此时不做内存检查。
+    """
+    proc = Path('/proc')
+    if not proc.is_dir():
+        return None
+
+    parents = {}
+    rss_kb = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            status = (entry / 'status').read_text()
+        except OSError:
+            continue
+        pid = int(entry.name)
+        for line in status.splitlines():
+            if line.startswith('PPid:'):
+                parents[pid] = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss_kb[pid] = int(line.split()[1])
+
+    root = os.getpid()
+    total_kb = 0
+    for pid in parents:
+        ancestor = parents.get(pid)
+        depth = 0
+        while ancestor and ancestor != root and depth < 32:
+            ancestor = parents.get(ancestor)
+            depth += 1
+        if ancestor == root:
+            total_kb += rss_kb.get(pid, 0)
+    return total_kb / 1024
+
+
+class _PooledContext:
+    """池中的一个预热上下文"""
+
+    def __init__(self, context, profile: str, cookies_mtime: Optional[float]):
+        self.context = context
+        self.profile = profile
+        self.cookies_mtime = cookies_mtime
+        self.pages_served = 0
+
+
+class BrowserPool:
+    """常驻浏览器池（非线程安全，每个线程通过 get_browser_pool() 获取自己的实例）"""
+
+    def __init__(
+        self,
+        max_idle_contexts: int = None,
+        max_pages_per_context: int = None,
+        max_pages_per_browser: int = None,
+        memory_limit_mb: int = None,
+        memory_check_interval: int = None,
+    ):
+        self.max_idle_contexts = max_idle_contexts or getattr(settings, 'BROWSER_POOL_MAX_IDLE_CONTEXTS', 2)
+        self.max_pages_per_context = max_pages_per_context or getattr(settings, 'BROWSER_POOL_MAX_PAGES_PER_CONTEXT', 25)
+        self.max_pages_per_browser = max_pages_per_browser or getattr(settings, 'BROWSER_POOL_MAX_PAGES_PER_BROWSER', 200)
+        self.memory_limit_mb = memory_limit_mb or getattr(settings, 'BROWSER_POOL_MEMORY_LIMIT_MB', 1536)
+        # 内存检查要扫描整个 /proc，每 N 个页面检查一次
+        self.memory_check_interval = memory_check_interval or getattr(settings, 'BROWSER_POOL_MEMORY_CHECK_INTERVAL', 10)
+
+        self._pid = os.getpid()
+        self._thread_id = threading.get_ident()
+        self._playwright = None
+        self._browser = None
+        self._idle: Dict[str, List[_PooledContext]] = {}
+        self._browser_pages_served = 0
+        self.launch_count = 0
+        self.total_pages_served = 0
+
+    # ---------- 浏览器生命周期 ----------
+
+    def _ensure_browser(self):
+        """浏览器未启动或已断开时（重新）启动"""
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        if self._browser is not None:
+            logger.warning("Pooled Chromium is disconnected, relaunching")
+            self._discard_browser()
+
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+
+        self._browser = self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        self._browser_pages_served = 0
+        self.launch_count += 1
+        logger.info(f"Launched pooled Chromium (launch #{self.launch_count}, pid {os.getpid()})")
+        return self._browser
+
+    def _discard_browser(self):
+        """关闭所有上下文和浏览器"""
+        for contexts in self._idle.values():
+            for pooled in contexts:
+                self._close_context(pooled)
+        self._idle = {}
+
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled browser: {e}")
+            self._browser = None
+
+    def recycle(self, reason: str = ''):
+        """回收浏览器，下次借出时重新启动"""
+        logger.info(f"Recycling pooled Chromium after {self._browser_pages_served} pages {reason}".rstrip())
+        self._discard_browser()
+
+    def close(self):
+        """关闭浏览器和playwright（只能在创建浏览器池的线程中调用）"""
+        if threading.get_ident() != self._thread_id:
+            logger.warning("BrowserPool.close() called from another thread, skipped")
+            return
+        self._discard_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping playwright: {e}")
+            self._playwright = None
+
+    # ---------- 上下文管理 ----------
+
+    def _new_context(self, profile: str) -> _PooledContext:
+        config = CONTEXT_PROFILES[profile]
+        browser = self._ensure_browser()
+        context = browser.new_context(**config['options'])
+
+        if config.get('init_script'):
+            context.add_init_script(config['init_script'])
+
+        cookies_mtime = None
+        if config.get('cookies'):
+            cookies_mtime = _cookies_mtime()
+            cookies = load_cookies()
+            if cookies:
+                context.add_cookies(cookies)
+                logger.info(f"Added {len(cookies)} cookies to pooled '{profile}' context")
+            else:
+                logger.warning(f"No cookies available, pooled '{profile}' context will access as guest")
+
+        return _PooledContext(context, profile, cookies_mtime)
+
+    def _close_context(self, pooled: _PooledContext):
+        try:
+            pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled context: {e}")
+
+    def _is_healthy(self, pooled: _PooledContext) -> bool:
+        """健康检查：浏览器仍连接、cookies文件未被更新、上下文未超过页面上限"""
+        if self._browser is None or not self._browser.is_connected():
+            return False
+        if pooled.context.browser is not self._browser:
+            return False
+        if CONTEXT_PROFILES[pooled.profile].get('cookies') and pooled.cookies_mtime != _cookies_mtime():
+            logger.info(f"Cookies file changed, discarding pooled '{pooled.profile}' context")
+            return False
+        return pooled.pages_served < self.max_pages_per_context
+
+    def _checkout_context(self, profile: str) -> _PooledContext:
+        if profile not in CONTEXT_PROFILES:
+            raise ValueError(f"Unknown browser profile: {profile}")
+
+        self._ensure_browser()
+        idle = self._idle.setdefault(profile, [])
+        while idle:
+            pooled = idle.pop()
+            if self._is_healthy(pooled):
+                return pooled
+            self._close_context(pooled)
+        return self._new_context(profile)
+
+    def _return_context(self, pooled: _PooledContext, healthy: bool):
+        idle = self._idle.setdefault(pooled.profile, [])
+        if healthy and self._is_healthy(pooled) and len(idle) < self.max_idle_contexts:
+            idle.append(pooled)
+        else:
+            self._close_context(pooled)
+
+    def _should_recycle_browser(self) -> Optional[str]:
+        if self._browser_pages_served >= self.max_pages_per_browser:
+            return f"(page limit {self.max_pages_per_browser})"
+        if self._browser_pages_served % self.memory_check_interval:
+            return None
+        memory_mb = _child_processes_rss_mb()
+        if memory_mb is not None and memory_mb > self.memory_limit_mb:
+            return f"(memory {memory_mb:.0f}MB > {self.memory_limit_mb}MB)"
+        return None
+
+    # ---------- 对外接口 ----------
+
+    @contextmanager
+    def page(self, profile: str = 'workaround'):
+        """借出一个页面，退出时关闭页面并归还上下文
+
+        Args:
+            profile: CONTEXT_PROFILES 中的配置名（workaround / authenticated / guest）
+        """
+        pooled = self._checkout_context(profile)
+        page = pooled.context.new_page()
+        healthy = True
+        try:
+            yield page
+        except Exception:
+            # 出错的上下文可能处于异常状态（例如页面崩溃），不再复用
+            healthy = False
+            raise
+        finally:
+            try:
+                page.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled page: {e}")
+                healthy = False
+
+            pooled.pages_served += 1
+            self._browser_pages_served += 1
+            self.total_pages_served += 1
+            self._return_context(pooled, healthy)
+
+            reason = self._should_recycle_browser()
+            if reason:
+                self.recycle(reason)
+
+    def stats(self) -> Dict:
+        """浏览器池状态（用于调试）"""
+        return {
+            'browser_connected': bool(self._browser and self._browser.is_connected()),
+            'launch_count': self.launch_count,
+            'browser_pages_served': self._browser_pages_served,
+            'total_pages_served': self.total_pages_served,
+            'idle_contexts': {profile: len(contexts) for profile, contexts in self._idle.items()},
+            'memory_mb': _child_processes_rss_mb(),
+        }
+
+
+# 每个进程、每个线程各自持有一个浏览器池（sync playwright 对象不能跨线程使用）
+_local = threading.local()
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取当前 worker（进程+线程）的浏览器池"""
+    pool = getattr(_local, 'pool', None)
+    # fork 后子进程不能复用父进程的浏览器
+    if pool is None or getattr(_local, 'pid', None) != os.getpid():
+        pool = BrowserPool()
+        _local.pool = pool
+        _local.pid = os.getpid()
+    return pool
+
+
+class AsyncBrowserPool:
+    """
+    async playwright 的常驻浏览器（在专用的事件循环线程中运行）
+
+    每个 profile 保留一个上下文，批次内的多个标签页共享它。
+    与 BrowserPool 相同：上下文/浏览器达到页面上限、cookies 文件更新、内存超过上限时重建。
+    同一进程内的批次依次执行（批次内部已经是并发的）。
+    """
+
+    def __init__(
+        self,
+        max_pages_per_context: int = None,
+        max_pages_per_browser: int = None,
+        memory_limit_mb: int = None,
+        memory_check_interval: int = None,
+    ):
+        self.max_pages_per_context = max_pages_per_context or getattr(settings, 'BROWSER_POOL_MAX_PAGES_PER_CONTEXT', 25)
+        self.max_pages_per_browser = max_pages_per_browser or getattr(settings, 'BROWSER_POOL_MAX_PAGES_PER_BROWSER', 200)
+        self.memory_limit_mb = memory_limit_mb or getattr(settings, 'BROWSER_POOL_MEMORY_LIMIT_MB', 1536)
+        self.memory_check_interval = memory_check_interval or getattr(settings, 'BROWSER_POOL_MEMORY_CHECK_INTERVAL', 10)
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._contexts: Dict[str, _PooledContext] = {}
+        self._browser_pages_served = 0
+        self._pages_since_memory_check = 0
+        self.launch_count = 0
+        self.total_pages_served = 0
+
+    def run(self, func: Callable[..., Awaitable[T]], profile: str = 'workaround', pages: int = 1) -> T:
+        """
+        在 profile 的常驻上下文上执行 await func(context) 并返回结果
+
+        Args:
+            pages: func 打开的页面数（计入上下文/浏览器的页面上限）
+        """
+        if profile not in CONTEXT_PROFILES:
+            raise ValueError(f"Unknown browser profile: {profile}")
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool-loop', daemon=True)
+                self._thread.start()
+            return asyncio.run_coroutine_threadsafe(self._run(func, profile, pages), self._loop).result()
+
+    async def _run(self, func, profile: str, pages: int):
+        pooled = await self._checkout_context(profile)
+        healthy = True
+        try:
+            return await func(pooled.context)
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            pooled.pages_served += pages
+            self._browser_pages_served += pages
+            self._pages_since_memory_check += pages
+            self.total_pages_served += pages
+            if not healthy or pooled.pages_served >= self.max_pages_per_context:
+                await self._close_context(profile)
+
+            reason = self._should_recycle_browser()
+            if reason:
+                logger.info(f"Recycling pooled async Chromium after {self._browser_pages_served} pages {reason}")
+                await self._discard_browser()
+
+    async def _ensure_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+        if self._browser is not None:
+            logger.warning("Pooled async Chromium is disconnected, relaunching")
+            await self._discard_browser()
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        self._browser_pages_served = 0
+        self.launch_count += 1
+        logger.info(f"Launched pooled async Chromium (launch #{self.launch_count}, pid {os.getpid()})")
+        return self._browser
+
+    async def _checkout_context(self, profile: str) -> _PooledContext:
+        browser = await self._ensure_browser()
+        config = CONTEXT_PROFILES[profile]
+        pooled = self._contexts.get(profile)
+        if pooled is not None and config.get('cookies') and pooled.cookies_mtime != _cookies_mtime():
+            logger.info(f"Cookies file changed, discarding pooled async '{profile}' context")
+            await self._close_context(profile)
+            pooled = None
+        if pooled is not None:
+            return pooled
+
+        context = await browser.new_context(**config['options'])
+        if config.get('init_script'):
+            await context.add_init_script(config['init_script'])
+        cookies_mtime = None
+        if config.get('cookies'):
+            cookies_mtime = _cookies_mtime()
+            cookies = load_cookies()
+            if cookies:
+                await context.add_cookies(cookies)
+        pooled = self._contexts[profile] = _PooledContext(context, profile, cookies_mtime)
+        return pooled
+
+    async def _close_context(self, profile: str):
+        pooled = self._contexts.pop(profile, None)
+        if pooled is None:
+            return
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled async context: {e}")
+
+    async def _discard_browser(self):
+        for profile in list(self._contexts):
+            await self._close_context(profile)
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled async browser: {e}")
+            self._browser = None
+
+    def _should_recycle_browser(self) -> Optional[str]:
+        if self._browser_pages_served >= self.max_pages_per_browser:
+            return f"(page limit {self.max_pages_per_browser})"
+        if self._pages_since_memory_check < self.memory_check_interval:
+            return None
+        self._pages_since_memory_check = 0
+        memory_mb = _child_processes_rss_mb()
+        if memory_mb is not None and memory_mb > self.memory_limit_mb:
+            return f"(memory {memory_mb:.0f}MB > {self.memory_limit_mb}MB)"
+        return None
+
+    async def _shutdown(self):
+        await self._discard_browser()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping async playwright: {e}")
+            self._playwright = None
+
+    def close(self):
+        """关闭浏览器、playwright 和事件循环线程"""
+        with self._lock:
+            if self._loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=30)
+            except Exception as e:
+                logger.debug(f"Error shutting down async browser pool: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+_async_pool: Optional[AsyncBrowserPool] = None
+_async_pool_lock = threading.Lock()
+
+
+def get_async_browser_pool() -> AsyncBrowserPool:
+    """获取当前进程的 AsyncBrowserPool（批量爬虫使用）"""
+    global _async_pool
+    with _async_pool_lock:
+        # fork 后子进程没有父进程的事件循环线程
+        if _async_pool is None or _async_pool._pid != os.getpid():
+            _async_pool = AsyncBrowserPool()
+        return _async_pool
+
+
+def close_browser_pool():
+    """关闭当前线程的浏览器池（下次 get_browser_pool() 时重新创建）"""
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        return
+    _local.pool = None
+    if pool._pid == os.getpid():
+        try:
+            pool.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser pool: {e}")
+
+
+def _close_request_browser_pool(sender, **kwargs):
+    # request_finished 在处理请求的线程中发送：关闭该请求线程使用过的浏览器池
+    close_browser_pool()
+
+
+request_finished.connect(_close_request_browser_pool, dispatch_uid='x_monitor.browser_pool.close_request_pool')
+
+
+def _close_worker_browser_pool(**kwargs):
+    # prefork 子进程在执行任务的（主）线程中发送 worker_process_shutdown
+    close_browser_pool()
+
+
+worker_process_shutdown.connect(_close_worker_browser_pool, dispatch_uid='x_monitor.browser_pool.close_worker_pool')
+
+
+@atexit.register
+def _close_pools_at_exit():
+    # atexit 在主线程中执行：只关闭主线程自己的浏览器池和 AsyncBrowserPool（其事件循环在专用线程中，
+    # close() 通过 run_coroutine_threadsafe 在那个线程中关闭）
+    close_browser_pool()
+    pool = _async_pool
+    # fork 出来的子进程不关闭父进程的浏览器
+    if pool is not None and pool._pid == os.getpid():
+        try:
+            pool.close()
+        except Exception as e:
+            logger.debug(f"Error closing async browser pool: {e}")
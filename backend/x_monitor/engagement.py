@@ -0,0 +1,118 @@
+"""
+推文互动数的时间序列
+
+每次抓取到推文时记录一条快照：发布后 ENGAGEMENT_HOURLY_WINDOW_HOURS 小时内按小时分桶，
+之后按天分桶，同一个桶内只保留最后一次的数值（upsert）。
+compact_engagement_snapshots 定期把过了小时窗口的小时快照合并为日快照，
+并删除超过 ENGAGEMENT_DAILY_RETENTION_DAYS 天的日快照，使表保持很小。
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone as django_timezone
+
+from .models import TweetEngagementSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = ['like_count', 'retweet_count', 'reply_count']
+
+
+def _hourly_window() -> timedelta:
+    return timedelta(hours=getattr(settings, 'ENGAGEMENT_HOURLY_WINDOW_HOURS', 48))
+
+
+def _hour_bucket(moment: datetime) -> datetime:
+    return django_timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_bucket(moment: datetime) -> datetime:
+    return django_timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def snapshot_bucket(posted_at: datetime, now: datetime) -> Tuple[str, datetime]:
+    """根据推文的发布时间决定快照粒度和时间桶"""
+    if now - posted_at < _hourly_window():
+        return 'hour', _hour_bucket(now)
+    return 'day', _day_bucket(now)
+
+
+def record_engagement_snapshots(rows: Iterable[Tuple[int, datetime, int, int, int]], now: datetime = None) -> int:
+    """
+    批量记录互动数快照（同一时间桶内覆盖为最新值）
+
+    Args:
+        rows: (tweet主键, 发布时间, like_count, retweet_count, reply_count)
+
+    Returns:
+        写入的快照数
+    """
+    now = now or django_timezone.now()
+    snapshots = []
+    for tweet_pk, posted_at, like_count, retweet_count, reply_count in rows:
+        granularity, bucket = snapshot_bucket(posted_at, now)
+        snapshots.append(TweetEngagementSnapshot(
+            tweet_id=tweet_pk,
+            granularity=granularity,
+            bucket=bucket,
+            like_count=like_count,
+            retweet_count=retweet_count,
+            reply_count=reply_count
+        ))
+
+    if snapshots:
+        TweetEngagementSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['tweet', 'granularity', 'bucket'],
+            update_fields=SNAPSHOT_FIELDS + ['recorded_at']
+        )
+    return len(snapshots)
+
+
+def compact_engagement_snapshots(now: datetime = None) -> dict:
+    """
+    降采样：过了小时窗口的小时快照合并为日快照（每天取最后一条），并删除过期的日快照
+    """
+    now = now or django_timezone.now()
+    hourly_cutoff = _hour_bucket(now - _hourly_window())
+    retention_days = getattr(settings, 'ENGAGEMENT_DAILY_RETENTION_DAYS', 90)
+
+    with transaction.atomic():
+        old_hourly = TweetEngagementSnapshot.objects.filter(granularity='hour', bucket__lt=hourly_cutoff)
+
+        # 按时间顺序遍历，同一天的后一条覆盖前一条
+        latest_per_day = {}
+        for snapshot in old_hourly.order_by('bucket').iterator():
+            latest_per_day[(snapshot.tweet_id, _day_bucket(snapshot.bucket))] = snapshot
+
+        daily = [
+            TweetEngagementSnapshot(
+                tweet_id=tweet_pk,
+                granularity='day',
+                bucket=day,
+                like_count=snapshot.like_count,
+                retweet_count=snapshot.retweet_count,
+                reply_count=snapshot.reply_count
+            )
+            for (tweet_pk, day), snapshot in latest_per_day.items()
+        ]
+        # 已存在的日快照是推文离开小时窗口后记录的，总比小时快照新，保留它
+        if daily:
+            TweetEngagementSnapshot.objects.bulk_create(daily, ignore_conflicts=True)
+
+        hourly_deleted, _ = old_hourly.delete()
+        daily_deleted, _ = TweetEngagementSnapshot.objects.filter(
+            granularity='day',
+            bucket__lt=_day_bucket(now - timedelta(days=retention_days))
+        ).delete()
+
+    logger.info(f"互动数快照降采样: {hourly_deleted} 条小时快照合并为 {len(daily)} 条日快照，删除 {daily_deleted} 条过期日快照")
+    return {
+        'hourly_compacted': hourly_deleted,
+        'daily_written': len(daily),
+        'daily_expired': daily_deleted
+    }
@@ -0,0 +1,306 @@
+"""
+GraphQL响应拦截模式：监听时间线页面自身发出的 UserTweets 请求，
+直接解码返回的JSON中的推文实体，而不是等React渲染完再解析DOM
+
+页面加载时X会通过 /i/api/graphql/<queryId>/UserTweets 获取时间线数据，
+其中已经包含推文ID、完整文本、发布时间、互动数和媒体。
+捕获到第一个响应后立即返回，不需要固定等待渲染。
+
+解析函数 parse_user_tweets_payload 不依赖浏览器，可以用录制的JSON离线测试。
+"""
+import html
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from .known_tweets import KnownTweetIds
+
+logger = logging.getLogger(__name__)
+
+# 等待 UserTweets 响应的超时（毫秒）
+RESPONSE_TIMEOUT_MS = 20000
+
+# 默认只使用第一个响应（约20条时间线条目），>1 时滚动加载后续页
+DEFAULT_MAX_PAGES = 1
+
+# X API 的时间格式: "Wed Oct 10 20:19:24 +0000 2018"
+TWITTER_TIME_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+
+def is_user_tweets_response(response) -> bool:
+    """判断网络响应是否为时间线的 UserTweets GraphQL 响应（不含 UserTweetsAndReplies）"""
+    path = urlparse(response.url).path
+    return '/graphql/' in path and path.endswith('/UserTweets')
+
+
+def _iter_timeline_entries(payload: Dict):
+    """按时间线顺序遍历所有条目，返回 (条目, 是否置顶)"""
+    user_result = (((payload or {}).get('data') or {}).get('user') or {}).get('result') or {}
+    # 新旧两种结构: timeline_v2.timeline / timeline.timeline
+    timeline = (user_result.get('timeline_v2') or user_result.get('timeline') or {}).get('timeline') or {}
+
+    for instruction in timeline.get('instructions') or []:
+        instruction_type = instruction.get('type')
+        if instruction_type == 'TimelinePinEntry':
+            if instruction.get('entry'):
+                yield instruction['entry'], True
+        elif instruction_type == 'TimelineAddEntries':
+            for entry in instruction.get('entries') or []:
+                yield entry, False
+
+
+def _iter_tweet_results(entry: Dict):
+    """从单个条目中取出推文结果（普通条目或自我回复的会话模块）"""
+    entry_id = entry.get('entryId', '')
+    # 推广推文不属于该账户
+    if entry_id.startswith('promoted'):
+        return
+
+    content = entry.get('content') or {}
+    if content.get('entryType') == 'TimelineTimelineItem' or 'itemContent' in content:
+        item_content = content.get('itemContent') or {}
+        if item_content.get('promotedMetadata'):
+            return
+        yield (item_content.get('tweet_results') or {}).get('result')
+    elif content.get('entryType') == 'TimelineTimelineModule' or 'items' in content:
+        for module_item in content.get('items') or []:
+            item_content = (module_item.get('item') or {}).get('itemContent') or {}
+            yield (item_content.get('tweet_results') or {}).get('result')
+
+
+def _unwrap_tweet(result: Optional[Dict]) -> Optional[Dict]:
+    """受限可见的推文包在 TweetWithVisibilityResults 中"""
+    if not result:
+        return None
+    if result.get('__typename') == 'TweetWithVisibilityResults':
+        result = result.get('tweet')
+    if not result or not result.get('legacy'):
+        return None
+    return result
+
+
+def _author(tweet: Dict) -> Dict:
+    return ((tweet.get('core') or {}).get('user_results') or {}).get('result') or {}
+
+
+def _author_screen_name(tweet: Dict) -> str:
+    user = _author(tweet)
+    return ((user.get('core') or {}).get('screen_name')
+            or (user.get('legacy') or {}).get('screen_name')
+            or '')
+
+
+def _author_avatar_url(tweet: Dict) -> Optional[str]:
+    user = _author(tweet)
+    src = ((user.get('avatar') or {}).get('image_url')
+           or (user.get('legacy') or {}).get('profile_image_url_https'))
+    return src.replace('_normal', '_400x400') if src else None
+
+
+def _tweet_text(tweet: Dict) -> str:
+    """完整文本：长推文取 note_tweet，去掉末尾的媒体短链接，与DOM中显示的一致"""
+    legacy = tweet['legacy']
+    note = (((tweet.get('note_tweet') or {}).get('note_tweet_results') or {}).get('result') or {})
+    text = note.get('text') or legacy.get('full_text') or ''
+
+    for media in (legacy.get('extended_entities') or legacy.get('entities') or {}).get('media') or []:
+        if media.get('url'):
+            text = text.replace(media['url'], '')
+    return html.unescape(text).strip()
+
+
+def _parse_created_at(value: str) -> Optional[str]:
+    try:
+        return datetime.strptime(value, TWITTER_TIME_FORMAT).astimezone(timezone.utc).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_tweet(tweet: Dict, is_pinned: bool = False) -> Optional[Dict]:
+    """构建与 scrape_with_working_method 相同格式的推文字典"""
+    legacy = tweet['legacy']
+    tweet_id = tweet.get('rest_id') or legacy.get('id_str')
+    published_at = _parse_created_at(legacy.get('created_at'))
+    if not tweet_id or not published_at:
+        logger.warning(f"推文 {tweet_id} 缺少ID或发布时间，跳过")
+        return None
+
+    entities = legacy.get('entities') or {}
+    media = (legacy.get('extended_entities') or entities).get('media') or []
+
+    return {
+        'id': tweet_id,
+        'text': _tweet_text(tweet),
+        'created_at': published_at,
+        'hashtags': [f"#{tag['text']}" for tag in entities.get('hashtags') or []],
+        'mentions': [f"@{mention['screen_name']}" for mention in entities.get('user_mentions') or []],
+        'retweet_count': legacy.get('retweet_count', 0),
+        'like_count': legacy.get('favorite_count', 0),
+        'reply_count': legacy.get('reply_count', 0),
+        'media_urls': [m['media_url_https'] for m in media if m.get('media_url_https')],
+        'avatar_url': _author_avatar_url(tweet),
+        'published_at': published_at,
+        'is_pinned': is_pinned,
+        'metrics_available': True
+    }
+
+
+def parse_user_tweets_payload(payload: Dict, username: str = None) -> List[Dict]:
+    """
+    解码 UserTweets 响应中的原创推文（跳过转发、回复和推广推文）
+
+    Args:
+        payload: UserTweets GraphQL 响应的JSON
+        username: 指定时只保留该账户发布的推文
+
+    Returns:
+        推文字典列表，按时间线顺序
+    """
+    tweets = []
+    seen_ids = set()
+    for entry, is_pinned in _iter_timeline_entries(payload):
+        for result in _iter_tweet_results(entry):
+            tweet = _unwrap_tweet(result)
+            if tweet is None:
+                continue
+
+            legacy = tweet['legacy']
+            tweet_id = tweet.get('rest_id') or legacy.get('id_str')
+            if tweet_id in seen_ids:
+                continue
+            seen_ids.add(tweet_id)
+
+            if legacy.get('retweeted_status_result') or (legacy.get('full_text') or '').startswith('RT @'):
+                logger.info(f"推文 {tweet_id} 是转发，跳过")
+                continue
+            if legacy.get('in_reply_to_status_id_str'):
+                logger.info(f"推文 {tweet_id} 是回复，跳过")
+                continue
+            if username and _author_screen_name(tweet).lower() != username.lower():
+                continue
+
+            try:
+                built = _build_tweet(tweet, is_pinned)
+            except Exception as e:
+                logger.warning(f"解析推文 {tweet_id} 失败: {e}")
+                continue
+            if built:
+                tweets.append(built)
+    return tweets
+
+
+class GraphQLTimelineCollector:
+    """
+    累积多个 UserTweets 响应中的推文（按ID去重，达到上限后截断）
+
+    传入 known_ids 时，遇到已入库的非置顶推文即停止（reached_known）；
+    响应中的已入库推文放入 refreshed，用于更新互动数
+    """
+
+    def __init__(self, username: str, max_tweets: int = 20, known_ids=None):
+        self.username = username
+        self.max_tweets = max_tweets
+        self.known_ids = KnownTweetIds(known_ids)
+        self.reached_known = False
+        self.tweets = []
+        self.refreshed = []  # 已入库的推文（只用于更新互动数，不计入max_tweets）
+        self.collected_tweet_ids = set()
+        self.pages = 0
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.tweets) >= self.max_tweets
+
+    @property
+    def results(self) -> List[Dict]:
+        """新收集的推文 + 已入库推文（is_known=True，用于更新互动数）"""
+        return self.tweets + self.refreshed
+
+    def feed(self, payload: Dict) -> int:
+        """处理一个响应，返回新收集的推文数"""
+        self.pages += 1
+        new_tweets = 0
+        for tweet in parse_user_tweets_payload(payload, self.username):
+            if tweet['id'] in self.collected_tweet_ids:
+                continue
+            self.collected_tweet_ids.add(tweet['id'])
+            if tweet['id'] in self.known_ids:
+                tweet['is_known'] = True
+                self.refreshed.append(tweet)
+                if not tweet['is_pinned'] and not self.reached_known:
+                    self.reached_known = True
+                    logger.info(f"@{self.username}: 推文 {tweet['id']} 已入库，之后的内容都已抓取过")
+                continue
+            # 到达已入库内容之后的推文都是旧的；已收集够时也不再添加
+            if self.reached_known or self.is_full:
+                continue
+            self.tweets.append(tweet)
+            new_tweets += 1
+        logger.info(f"@{self.username}: 第 {self.pages} 个UserTweets响应中收集到 {new_tweets} 条原创推文")
+        return new_tweets
+
+
+def capture_user_tweets(page, username: str, max_tweets: int = 20, max_pages: int = DEFAULT_MAX_PAGES,
+                        timeout: int = RESPONSE_TIMEOUT_MS, known_ids=None) -> Optional[List[Dict]]:
+    """
+    在页面中打开用户时间线，拦截 UserTweets 响应并解码推文
+    known_ids: 账户最近已入库的推文ID，遇到后不再加载下一页
+
+    Returns:
+        推文列表；未捕获到响应时返回None（调用方可回退到DOM解析，页面已完成导航）
+    """
+    url = f"https://x.com/{username}"
+    collector = GraphQLTimelineCollector(username, max_tweets, known_ids)
+
+    try:
+        with page.expect_response(is_user_tweets_response, timeout=timeout) as response_info:
+            page.goto(url, wait_until='domcontentloaded', timeout=60000)
+        collector.feed(response_info.value.json())
+    except Exception as e:
+        logger.warning(f"@{username}: 未捕获到UserTweets响应: {e}")
+        return None
+
+    # 需要更多推文时滚动，触发下一页请求
+    while collector.pages < max_pages and not collector.is_full and not collector.reached_known:
+        try:
+            with page.expect_response(is_user_tweets_response, timeout=timeout) as response_info:
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            if collector.feed(response_info.value.json()) == 0:
+                break
+        except Exception as e:
+            logger.info(f"@{username}: 没有更多UserTweets响应: {e}")
+            break
+
+    logger.info(f"@{username}: GraphQL模式解析 {len(collector.tweets)} 条原创推文")
+    return collector.results
+
+
+async def capture_user_tweets_async(page, username: str, max_tweets: int = 20, max_pages: int = DEFAULT_MAX_PAGES,
+                                    timeout: int = RESPONSE_TIMEOUT_MS, known_ids=None) -> Optional[List[Dict]]:
+    """capture_user_tweets 的异步版本（batch_scraper 使用）"""
+    url = f"https://x.com/{username}"
+    collector = GraphQLTimelineCollector(username, max_tweets, known_ids)
+
+    try:
+        async with page.expect_response(is_user_tweets_response, timeout=timeout) as response_info:
+            await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+        response = await response_info.value
+        collector.feed(await response.json())
+    except Exception as e:
+        logger.warning(f"[batch] @{username}: 未捕获到UserTweets响应: {e}")
+        return None
+
+    while collector.pages < max_pages and not collector.is_full and not collector.reached_known:
+        try:
+            async with page.expect_response(is_user_tweets_response, timeout=timeout) as response_info:
+                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            response = await response_info.value
+            if collector.feed(await response.json()) == 0:
+                break
+        except Exception as e:
+            logger.info(f"[batch] @{username}: 没有更多UserTweets响应: {e}")
+            break
+
+    logger.info(f"[batch] @{username}: GraphQL模式解析 {len(collector.tweets)} 条原创推文")
+    return collector.results
@@ -0,0 +1,25 @@
+"""
+已入库推文的高水位线：爬虫遇到已入库的推文即可停止滚动
+
+时间线（置顶推文除外）按发布时间倒序排列，推文ID是随时间递增的雪花ID，
+所以遇到一条已入库的推文后，后面的内容都已经抓取过了。
+"""
+from typing import Iterable, Optional
+
+
+class KnownTweetIds:
+    """账户最近已入库的推文ID集合及其中最大的ID（高水位线）"""
+
+    def __init__(self, tweet_ids: Optional[Iterable[str]] = None):
+        self.ids = set(str(tweet_id) for tweet_id in (tweet_ids or ()))
+        numeric_ids = [int(tweet_id) for tweet_id in self.ids if tweet_id.isdigit()]
+        self.high_water_mark = max(numeric_ids) if numeric_ids else None
+
+    def __bool__(self):
+        return bool(self.ids)
+
+    def __contains__(self, tweet_id) -> bool:
+        tweet_id = str(tweet_id)
+        if tweet_id in self.ids:
+            return True
+        return self.high_water_mark is not None and tweet_id.isdigit() and int(tweet_id) <= self.high_water_mark
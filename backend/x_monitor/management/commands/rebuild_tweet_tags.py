@@ -0,0 +1,33 @@
+"""
+Django管理命令：重建推文的话题标签・提及・AI话题索引（TweetTag）
+
+迁移 0012 之前保存的推文没有标签索引，部署后运行一次：
+    python manage.py rebuild_tweet_tags [--batch-size 1000]
+之后的推文在保存 / AI分析时自动更新。
+"""
+from django.core.management.base import BaseCommand
+from x_monitor.models import Tweet
+from x_monitor.tags import update_tweet_tags
+
+
+class Command(BaseCommand):
+    help = '重建所有推文的标签索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的推文数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Tweet.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            total += update_tweet_tags(ids)
+            last_id = ids[-1]
+            self.stdout.write(f'  {total} 条推文已处理')
+
+        self.stdout.write(self.style.SUCCESS(f'完成：{total} 条推文的标签索引已更新'))
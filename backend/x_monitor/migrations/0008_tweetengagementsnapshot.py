@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0007_aipromptrule_target_accounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TweetEngagementSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=10)),
+                ('bucket', models.DateTimeField(help_text='时间桶的开始时间（整点或零点）')),
+                ('like_count', models.IntegerField(default=0)),
+                ('retweet_count', models.IntegerField(default=0)),
+                ('reply_count', models.IntegerField(default=0)),
+                ('recorded_at', models.DateTimeField(auto_now=True, help_text='桶内最后一次记录的时间')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_snapshots', to='x_monitor.tweet')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'unique_together': {('tweet', 'granularity', 'bucket')},
+            },
+        ),
+    ]
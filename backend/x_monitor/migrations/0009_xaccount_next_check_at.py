@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:49
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_next_check_at(apps, schema_editor):
+    """已有账户：next_check_at = last_checked + monitoring_interval，从未检查过的立即到期"""
+    XAccount = apps.get_model('x_monitor', 'XAccount')
+    now = timezone.now()
+    accounts = list(XAccount.objects.all())
+    for account in accounts:
+        if account.last_checked:
+            account.next_check_at = account.last_checked + timedelta(minutes=account.monitoring_interval)
+        else:
+            account.next_check_at = now
+    XAccount.objects.bulk_update(accounts, ['next_check_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0008_tweetengagementsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xaccount',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, help_text='下次监控时间（last_checked + monitoring_interval，调度器按此字段筛选到期账户）', null=True),
+        ),
+        migrations.RunPython(populate_next_check_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='xaccount',
+            index=models.Index(fields=['is_active', 'next_check_at'], name='xaccount_due_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0009_xaccount_next_check_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuleEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_version', models.CharField(help_text='判断时规则提示词的哈希（AIPromptRule.version_hash）', max_length=16)),
+                ('matched', models.BooleanField(default=False)),
+                ('evaluated_at', models.DateTimeField(auto_now=True)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='x_monitor.aipromptrule')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rule_evaluations', to='x_monitor.tweet')),
+            ],
+            options={
+                'unique_together': {('rule', 'tweet')},
+            },
+        ),
+    ]
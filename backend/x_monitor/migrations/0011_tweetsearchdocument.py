@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# PostgreSQL: 文档的 tsvector 上的GIN索引（表达式与 x_monitor/search.py 的 ToTsVector 相同）
+POSTGRES_SQL = [
+    "CREATE INDEX x_monitor_tweetsearch_document_gin ON x_monitor_tweetsearchdocument "
+    "USING gin (to_tsvector('simple'::regconfig, document))",
+]
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS x_monitor_tweetsearch_document_gin",
+]
+
+# SQLite: FTS5 表（rowid = 推文主键），由触发器与文档表同步
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE x_monitor_tweet_fts USING fts5(document)",
+    "CREATE TRIGGER x_monitor_tweet_fts_insert AFTER INSERT ON x_monitor_tweetsearchdocument BEGIN "
+    "INSERT INTO x_monitor_tweet_fts (rowid, document) VALUES (new.tweet_id, new.document); END",
+    "CREATE TRIGGER x_monitor_tweet_fts_update AFTER UPDATE ON x_monitor_tweetsearchdocument BEGIN "
+    "DELETE FROM x_monitor_tweet_fts WHERE rowid = old.tweet_id; "
+    "INSERT INTO x_monitor_tweet_fts (rowid, document) VALUES (new.tweet_id, new.document); END",
+    "CREATE TRIGGER x_monitor_tweet_fts_delete AFTER DELETE ON x_monitor_tweetsearchdocument BEGIN "
+    "DELETE FROM x_monitor_tweet_fts WHERE rowid = old.tweet_id; END",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS x_monitor_tweet_fts_insert",
+    "DROP TRIGGER IF EXISTS x_monitor_tweet_fts_update",
+    "DROP TRIGGER IF EXISTS x_monitor_tweet_fts_delete",
+    "DROP TABLE IF EXISTS x_monitor_tweet_fts",
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def run_vendor_sql(postgres_sql, sqlite_sql):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite' and not sqlite_has_fts5(schema_editor.connection):
+            return  # 没有FTS5时搜索退回到 icontains
+        statements = {'postgresql': postgres_sql, 'sqlite': sqlite_sql}.get(vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0010_ruleevaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TweetSearchDocument',
+            fields=[
+                ('tweet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='x_monitor.tweet')),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(
+            run_vendor_sql(POSTGRES_SQL, SQLITE_SQL),
+            run_vendor_sql(POSTGRES_REVERSE_SQL, SQLITE_REVERSE_SQL),
+        ),
+    ]
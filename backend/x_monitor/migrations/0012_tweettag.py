@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0011_tweetsearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TweetTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hashtag', 'Hashtag'), ('mention', 'Mention'), ('topic', 'AI Topic')], max_length=10)),
+                ('value', models.CharField(help_text='规范化后的值（NFKC、小写、去掉开头的 # / @）', max_length=255)),
+                ('posted_at', models.DateTimeField(help_text='推文的发布时间（冗余保存，按时间聚合时不需要JOIN推文表）')),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='x_monitor.tweet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value', 'tweet'], name='tweettag_lookup_idx'), models.Index(fields=['kind', 'posted_at', 'value'], name='tweettag_recent_idx')],
+                'unique_together': {('tweet', 'kind', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0012_tweettag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recommendedtweet',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='recommended_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['posted_at', 'id'], name='tweet_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['x_account', 'posted_at', 'id'], name='tweet_account_feed_idx'),
+        ),
+    ]
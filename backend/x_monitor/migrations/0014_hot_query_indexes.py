@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0013_feed_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='monitoringlog',
+            name='x_account',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='x_monitor.xaccount'),
+        ),
+        migrations.AlterField(
+            model_name='recommendedtweet',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recommended_tweets', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tweet',
+            name='x_account',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tweets', to='x_monitor.xaccount'),
+        ),
+        migrations.AlterField(
+            model_name='usernotification',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='monitoringlog',
+            index=models.Index(fields=['x_account', 'created_at'], name='monitoringlog_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendedtweet',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at', 'id'], name='recommended_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(condition=models.Q(('ai_analyzed', True)), fields=['x_account', 'posted_at', 'id'], name='tweet_analyzed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(condition=models.Q(('ai_analyzed', False)), fields=['x_account', 'posted_at', 'id'], name='tweet_unanalyzed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usernotification',
+            index=models.Index(fields=['user', 'created_at'], name='notification_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usernotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='ai_label_source',
+            field=models.CharField(blank=True, choices=[('llm', 'AI判断'), ('prefilter', '本地预筛选'), ('heuristic', '关键词启发式（AI调用失败时）')], help_text='ai_relevant 的判断来源（为空表示未分析或来源未记录）', max_length=16),
+        ),
+    ]
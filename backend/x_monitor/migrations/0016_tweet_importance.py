@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_ai_importance(apps, schema_editor):
+    """已有的AI分析：把 importance_score 复制到 Tweet.ai_importance"""
+    Tweet = apps.get_model('x_monitor', 'Tweet')
+    AIAnalysis = apps.get_model('x_monitor', 'AIAnalysis')
+    Tweet.objects.filter(ai_analysis__isnull=False).update(ai_importance=Subquery(
+        AIAnalysis.objects.filter(tweet=OuterRef('pk')).values('importance_score')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('x_monitor', '0015_tweet_label_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='ai_importance',
+            field=models.FloatField(default=-1.0, help_text='AIAnalysis.importance_score 的冗余（没有AI分析时为 -1），MCP资源按此排序'),
+        ),
+        migrations.RunPython(populate_ai_importance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(condition=models.Q(('ai_analyzed', True)), fields=['ai_importance', 'posted_at', 'id'], name='tweet_importance_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import hashlib
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -32,17 +35,69 @@ class XAccount(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_checked = models.DateTimeField(blank=True, null=True)
+    next_check_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="下次监控时间（last_checked + monitoring_interval，调度器按此字段筛选到期账户）"
+    )
     
     class Meta:
         unique_together = ['user', 'username']
+        indexes = [
+            models.Index(fields=['is_active', 'next_check_at'], name='xaccount_due_idx'),
+        ]
         
     def __str__(self):
         return f"@{self.username} monitored by {self.user.email}"
+    
+    def compute_next_check_at(self):
+        """根据上次检查时间和监控间隔计算下次监控时间（从未检查过的账户立即到期）"""
+        if self.last_checked:
+            return self.last_checked + timedelta(minutes=self.monitoring_interval)
+        return self.next_check_at or timezone.now()
+    
+    SCHEDULE_FIELDS = ('last_checked', 'monitoring_interval')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_schedule = instance._schedule_values()
+        return instance
+
+    def _schedule_values(self):
+        # 延迟加载（defer）的字段不在 __dict__ 中，不触发额外查询
+        return tuple(self.__dict__.get(name) for name in self.SCHEDULE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # 只在 last_checked / monitoring_interval 变化时重新计算 next_check_at，
+        # 其他编辑（API、管理后台）不覆盖失败重试的推迟时间和调度器的分发占位
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            schedule_changed = bool(set(self.SCHEDULE_FIELDS) & set(update_fields))
+        else:
+            schedule_changed = (
+                self.next_check_at is None
+                or self._schedule_values() != getattr(self, '_saved_schedule', None)
+            )
+        if schedule_changed:
+            self.next_check_at = self.compute_next_check_at()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'next_check_at'}
+        super().save(*args, **kwargs)
+        self._saved_schedule = self._schedule_values()
 
 
 class Tweet(models.Model):
     """取得したツイート"""
-    x_account = models.ForeignKey(XAccount, on_delete=models.CASCADE, related_name='tweets')
+    
+    # ai_relevant 标签的来源（预筛选模型只用AI给出的标签训练）
+    LABEL_SOURCE_CHOICES = [
+        ('llm', 'AI判断'),
+        ('prefilter', '本地预筛选'),
+        ('heuristic', '关键词启发式（AI调用失败时）'),
+    ]
+    # 外键的单列索引由以 x_account 开头的复合索引代替（Meta.indexes）
+    x_account = models.ForeignKey(XAccount, on_delete=models.CASCADE, related_name='tweets', db_index=False)
     tweet_id = models.CharField(max_length=255, unique=True)
     content = models.TextField()
     media_urls = models.JSONField(default=list, blank=True)
@@ -56,16 +111,71 @@ class Tweet(models.Model):
     ai_analyzed = models.BooleanField(default=False, help_text="是否已进行AI分析")
     ai_relevant = models.BooleanField(default=False, help_text="AI判断是否相关")
     ai_summary = models.TextField(blank=True, help_text="AI生成的摘要")
+    ai_label_source = models.CharField(
+        max_length=16,
+        choices=LABEL_SOURCE_CHOICES,
+        blank=True,
+        help_text="ai_relevant 的判断来源（为空表示未分析或来源未记录）"
+    )
+    ai_importance = models.FloatField(
+        default=-1.0,
+        help_text="AIAnalysis.importance_score 的冗余（没有AI分析时为 -1），MCP资源按此排序"
+    )
     posted_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-posted_at']
+        indexes = [
+            # 推文列表的游标分页键 (posted_at, id)（x_monitor/pagination.py）
+            models.Index(fields=['posted_at', 'id'], name='tweet_feed_idx'),
+            models.Index(fields=['x_account', 'posted_at', 'id'], name='tweet_account_feed_idx'),
+            # 部分索引：MCP只读取已分析的推文，推荐分析任务只读取未分析的推文
+            models.Index(
+                fields=['x_account', 'posted_at', 'id'],
+                condition=models.Q(ai_analyzed=True),
+                name='tweet_analyzed_idx'
+            ),
+            models.Index(
+                fields=['x_account', 'posted_at', 'id'],
+                condition=models.Q(ai_analyzed=False),
+                name='tweet_unanalyzed_idx'
+            ),
+            # MCP资源的游标分页键 (ai_importance, posted_at, id)
+            models.Index(
+                fields=['ai_importance', 'posted_at', 'id'],
+                condition=models.Q(ai_analyzed=True),
+                name='tweet_importance_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"Tweet {self.tweet_id} from @{self.x_account.username}"
 
 
+class TweetEngagementSnapshot(models.Model):
+    """推文互动数的时间序列（刚发布的推文按小时，之后按天降采样）"""
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+    
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='engagement_snapshots')
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField(help_text="时间桶的开始时间（整点或零点）")
+    like_count = models.IntegerField(default=0)
+    retweet_count = models.IntegerField(default=0)
+    reply_count = models.IntegerField(default=0)
+    recorded_at = models.DateTimeField(auto_now=True, help_text="桶内最后一次记录的时间")
+    
+    class Meta:
+        ordering = ['-bucket']
+        unique_together = ['tweet', 'granularity', 'bucket']
+        
+    def __str__(self):
+        return f"Engagement of Tweet {self.tweet_id} at {self.bucket} ({self.granularity})"
+
+
 class MonitoringLog(models.Model):
     """監視ログ"""
     RESULT_CHOICES = [
@@ -74,7 +184,7 @@ class MonitoringLog(models.Model):
         ('no_new_tweets', 'No New Tweets'),
     ]
     
-    x_account = models.ForeignKey(XAccount, on_delete=models.CASCADE, related_name='logs')
+    x_account = models.ForeignKey(XAccount, on_delete=models.CASCADE, related_name='logs', db_index=False)
     result = models.CharField(max_length=20, choices=RESULT_CHOICES, default='success')
     tweets_found = models.IntegerField(default=0)
     error_message = models.TextField(blank=True)
@@ -83,6 +193,9 @@ class MonitoringLog(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['x_account', 'created_at'], name='monitoringlog_account_idx'),
+        ]
         
     def __str__(self):
         return f"Log for @{self.x_account.username} - {self.result}"
@@ -109,6 +222,66 @@ class AIPromptRule(models.Model):
         
     def __str__(self):
         return f"{self.name} - {self.user.email}"
+    
+    @property
+    def version_hash(self):
+        """提示词的哈希：提示词改变后，之前的判断结果（RuleEvaluation）不再有效"""
+        return hashlib.sha256(self.prompt.strip().encode('utf-8')).hexdigest()[:16]
+
+
+class RuleEvaluation(models.Model):
+    """规则对推文的判断记录（包括不匹配的），同一版本的规则不会重复发送给AI"""
+    rule = models.ForeignKey(AIPromptRule, on_delete=models.CASCADE, related_name='evaluations')
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='rule_evaluations')
+    rule_version = models.CharField(max_length=16, help_text="判断时规则提示词的哈希（AIPromptRule.version_hash）")
+    matched = models.BooleanField(default=False)
+    evaluated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['rule', 'tweet']
+        
+    def __str__(self):
+        return f"Rule {self.rule_id} on Tweet {self.tweet_id}: {'match' if self.matched else 'no match'}"
+
+
+class TweetSearchDocument(models.Model):
+    """推文的全文检索文档（内容・AI摘要・话题标签切分后的词，见 x_monitor/search.py）
+
+    PostgreSQL 上有 to_tsvector('simple', document) 的GIN索引，
+    SQLite 上由触发器同步到 FTS5 表 x_monitor_tweet_fts（迁移 0011 创建）
+    """
+    tweet = models.OneToOneField(Tweet, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Search document for Tweet {self.tweet_id}"
+
+
+class TweetTag(models.Model):
+    """推文的话题标签・提及・AI话题（从 JSONField 展开的索引表，见 x_monitor/tags.py）"""
+    KIND_CHOICES = [
+        ('hashtag', 'Hashtag'),
+        ('mention', 'Mention'),
+        ('topic', 'AI Topic'),
+    ]
+
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='tags')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255, help_text="规范化后的值（NFKC、小写、去掉开头的 # / @）")
+    posted_at = models.DateTimeField(help_text="推文的发布时间（冗余保存，按时间聚合时不需要JOIN推文表）")
+
+    class Meta:
+        unique_together = ['tweet', 'kind', 'value']
+        indexes = [
+            # 按标签查推文（多个标签的 AND / OR）
+            models.Index(fields=['kind', 'value', 'tweet'], name='tweettag_lookup_idx'),
+            # 一段时间内的热门标签
+            models.Index(fields=['kind', 'posted_at', 'value'], name='tweettag_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} '{self.value}' on Tweet {self.tweet_id}"
 
 
 class AIAnalysis(models.Model):
@@ -122,11 +295,20 @@ class AIAnalysis(models.Model):
     
     def __str__(self):
         return f"AI Analysis for Tweet {self.tweet.tweet_id}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # 重要度冗余保存到 Tweet.ai_importance（MCP资源按它排序，JOIN 后的列无法使用索引）
+        Tweet.objects.filter(pk=self.tweet_id).update(ai_importance=self.importance_score)
+    
+    def delete(self, *args, **kwargs):
+        Tweet.objects.filter(pk=self.tweet_id).update(ai_importance=-1.0)
+        return super().delete(*args, **kwargs)
 
 
 class RecommendedTweet(models.Model):
     """AI推荐的推文"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommended_tweets')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommended_tweets', db_index=False)
     tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name='recommendations')
     prompt_rule = models.ForeignKey(
         'AIPromptRule', 
@@ -144,6 +326,16 @@ class RecommendedTweet(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'tweet', 'prompt_rule']
+        indexes = [
+            # 推荐列表的游标分页键 (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id'], name='recommended_feed_idx'),
+            # 部分索引：未读的推荐（?is_read=false）
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                condition=models.Q(is_read=False),
+                name='recommended_unread_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"Recommended Tweet {self.tweet.tweet_id} for {self.user.email}"
@@ -157,7 +349,7 @@ class UserNotification(models.Model):
         ('error', 'Error'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     notification_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     title = models.CharField(max_length=255)
     message = models.TextField()
@@ -167,6 +359,15 @@ class UserNotification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notification_feed_idx'),
+            # 部分索引：未读的通知（?is_read=false）
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"Notification for {self.user.email}: {self.title}"
\ No newline at end of file
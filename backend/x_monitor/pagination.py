@@ -0,0 +1,186 @@
+"""
+键集（游标）分页
+
+PageNumberPagination 每次请求都要 OFFSET 扫描到第N页，再 COUNT(*) 一次，翻得越深越慢。
+KeysetPagination 按 queryset 的排序键取"上一页最后一条之后"的记录：
+
+    WHERE (posted_at < %s) OR (posted_at = %s AND id < %s) ORDER BY posted_at DESC, id DESC LIMIT n + 1
+
+每页的开销与页数无关（排序键上有索引时只读 n + 1 行）。
+
+- 排序键取 queryset.order_by()（没有时用模型 Meta.ordering），末尾自动加上主键保证唯一。
+  排序键可以是字段、关联字段（ai_analysis__importance_score）或 annotate 的名称（search_rank），
+  但值不能为 NULL（可为 NULL 的字段先用 Coalesce 注解）
+- 游标是最后一条（previous 为第一条）的排序键值，base64 编码后放在 ?cursor= 中
+- 响应为 {'next', 'previous', 'results'}。总数需要 COUNT(*)，只在 ?count=true 时返回 'count'
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        self.count = queryset.count() if self.count_requested(request) else None
+
+        # previous 方向：反转排序取数据，再把结果反转回来
+        ordering = [self._flip(key) for key in self.ordering] if reverse else self.ordering
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+                'count': {'type': 'integer', 'description': f'only with ?{self.count_query_param}=true'},
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def count_requested(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, queryset):
+        """queryset 的排序键（字符串），末尾加上主键"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if any(not isinstance(key, str) for key in ordering):
+            raise ImproperlyConfigured(
+                'KeysetPagination only supports field or annotation names in order_by(); '
+                'annotate expressions before ordering by them.'
+            )
+        if not any(key.lstrip('-') in ('pk', queryset.model._meta.pk.name) for key in ordering):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    # ---- 游标 ----
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # 超出末尾的空页：回到第一页
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        position = [self._encode_value(self._value(instance, key.lstrip('-'))) for key in self.ordering]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """(排序键的值, 是否 previous 方向)，没有游标时为 (None, False)"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            position = [self._decode_value(value) for value in payload['p']]
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def _value(instance, path: str):
+        value = instance
+        for name in path.split('__'):
+            value = getattr(value, 'pk' if name == 'pk' else name)
+        return value
+
+    @staticmethod
+    def _encode_value(value):
+        # DjangoJSONEncoder 会截断微秒，不能用作游标
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        if isinstance(value, date):
+            return {'d': value.isoformat()}
+        return value
+
+    @staticmethod
+    def _decode_value(value):
+        if isinstance(value, dict):
+            if 'dt' in value:
+                parsed = parse_datetime(value['dt'])
+                if parsed is None:
+                    raise ValueError(value)
+                return parsed
+            return date.fromisoformat(value['d'])
+        return value
+
+    # ---- 条件 ----
+
+    @staticmethod
+    def _flip(key: str) -> str:
+        return key[1:] if key.startswith('-') else '-' + key
+
+    @staticmethod
+    def _after(ordering, position) -> Q:
+        """排序在 position 之后的记录：(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ..."""
+        conditions = []
+        for i, key in enumerate(ordering):
+            equal = {ordering[j].lstrip('-'): position[j] for j in range(i)}
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            conditions.append(Q(**equal, **{f'{key.lstrip("-")}__{lookup}': position[i]}))
+        return reduce(or_, conditions)
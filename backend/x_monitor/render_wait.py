@@ -0,0 +1,195 @@
+"""
+自适应渲染等待：代替爬虫中固定的 time.sleep / wait_for_timeout
+
+满足以下任一条件即结束等待：
+- 页面上出现了新的推文节点（articles）
+- 网络安静：一段时间内没有请求开始或结束（network_idle）
+- 达到硬性截止时间（deadline）
+
+每次等待的实际耗时和结束原因都会被记录（get_wait_stats），用于调整截止时间。
+
+使用方法：
+    watch_network(page)            # 导航前调用，开始跟踪网络请求
+    page.goto(url)
+    wait_for_render(page, label='initial')
+"""
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TWEET_SELECTOR = 'article[data-testid="tweet"]'
+
+# 统计页面上尚未被 EXTRACT_NEW_TWEETS_SCRIPT 处理过的推文节点数；
+# 页面上没有已处理集合时返回节点总数（调用方传入之前的数量作为基准）
+COUNT_UNSEEN_TWEETS_SCRIPT = """
+(selector) => {
+    const seen = window.__xmSeenTweetIds;
+    let count = 0;
+    for (const article of document.querySelectorAll(selector)) {
+        if (!seen) { count++; continue; }
+        const link = article.querySelector('a[href*="/status/"]');
+        if (link && !seen.has(link.getAttribute('href').split('/status/').pop().split('?')[0])) count++;
+    }
+    return count;
+}
+"""
+
+# 轮询间隔（毫秒）
+POLL_INTERVAL_MS = 100
+
+# 首次渲染时脚本加载和接口请求之间可能有短暂空档，需要更长的安静时间才算网络安静
+INITIAL_NETWORK_QUIET_MS = 2000
+
+# X页面保持着长连接（实时推送等），进行中的请求不超过这个数也视为网络安静
+IDLE_MAX_INFLIGHT = 2
+
+
+class NetworkTracker:
+    """通过页面的 request / requestfinished / requestfailed 事件跟踪网络活动"""
+
+    def __init__(self, page):
+        self.inflight = 0
+        self.last_activity = time.monotonic()
+        page.on('request', self._on_start)
+        page.on('requestfinished', self._on_end)
+        page.on('requestfailed', self._on_end)
+
+    def _on_start(self, request):
+        self.inflight += 1
+        self.last_activity = time.monotonic()
+
+    def _on_end(self, request):
+        self.inflight = max(0, self.inflight - 1)
+        self.last_activity = time.monotonic()
+
+    def is_idle(self, quiet_ms: int, since: float) -> bool:
+        """从 since（等待开始时间）和最后一次网络活动中较晚者起，安静了 quiet_ms"""
+        quiet_from = max(self.last_activity, since)
+        return (self.inflight <= IDLE_MAX_INFLIGHT
+                and (time.monotonic() - quiet_from) * 1000 >= quiet_ms)
+
+
+_trackers = weakref.WeakKeyDictionary()
+
+
+def watch_network(page) -> NetworkTracker:
+    """开始跟踪页面的网络活动（同一页面只注册一次）"""
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = NetworkTracker(page)
+        _trackers[page] = tracker
+    return tracker
+
+
+class WaitStats:
+    """按标签汇总的等待耗时（线程安全，进程内累计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, label: str, elapsed_ms: float, reason: str):
+        with self._lock:
+            entry = self._stats.setdefault(label, {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'reasons': {}
+            })
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['reasons'][reason] = entry['reasons'].get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                label: {
+                    'count': entry['count'],
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                    'total_ms': round(entry['total_ms'], 1),
+                    'reasons': dict(entry['reasons']),
+                }
+                for label, entry in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+wait_stats = WaitStats()
+
+
+def get_wait_stats() -> Dict[str, dict]:
+    """返回各等待点的耗时统计 {label: {count, avg_ms, max_ms, total_ms, reasons}}"""
+    return wait_stats.snapshot()
+
+
+def get_scroll_deadline_ms() -> int:
+    """滚动后等待新内容的截止时间"""
+    return getattr(settings, 'SCRAPER_SCROLL_DEADLINE_MS', 5000)
+
+
+def _resolve_timing(deadline_ms: Optional[int], quiet_ms: Optional[int]):
+    if deadline_ms is None:
+        deadline_ms = getattr(settings, 'SCRAPER_RENDER_DEADLINE_MS', 15000)
+    if quiet_ms is None:
+        quiet_ms = getattr(settings, 'SCRAPER_NETWORK_QUIET_MS', 500)
+    return deadline_ms, quiet_ms
+
+
+def _finish(label: str, started: float, reason: str, count: int) -> str:
+    elapsed_ms = (time.monotonic() - started) * 1000
+    wait_stats.record(label, elapsed_ms, reason)
+    logger.info(f"渲染等待 [{label}]: {elapsed_ms:.0f}ms ({reason}, {count} 个新节点)")
+    return reason
+
+
+def wait_for_render(page, baseline: int = 0, label: str = 'render', deadline_ms: int = None,
+                    quiet_ms: int = None, selector: str = TWEET_SELECTOR) -> str:
+    """
+    等待新推文节点出现或网络安静，最多等待 deadline_ms
+
+    Args:
+        baseline: 之前的节点数，超过它才算出现了新节点
+        label: 统计用的等待点名称
+
+    Returns:
+        结束原因: 'articles' / 'network_idle' / 'deadline'
+    """
+    deadline_ms, quiet_ms = _resolve_timing(deadline_ms, quiet_ms)
+    tracker = watch_network(page)
+    started = time.monotonic()
+
+    while True:
+        count = page.evaluate(COUNT_UNSEEN_TWEETS_SCRIPT, selector)
+        if count > baseline:
+            return _finish(label, started, 'articles', count - baseline)
+        if tracker.is_idle(quiet_ms, started):
+            return _finish(label, started, 'network_idle', 0)
+        if (time.monotonic() - started) * 1000 >= deadline_ms:
+            return _finish(label, started, 'deadline', 0)
+        page.wait_for_timeout(POLL_INTERVAL_MS)
+
+
+async def wait_for_render_async(page, baseline: int = 0, label: str = 'render', deadline_ms: int = None,
+                                quiet_ms: int = None, selector: str = TWEET_SELECTOR) -> str:
+    """wait_for_render 的异步版本（batch_scraper 使用）"""
+    deadline_ms, quiet_ms = _resolve_timing(deadline_ms, quiet_ms)
+    tracker = watch_network(page)
+    started = time.monotonic()
+
+    while True:
+        count = await page.evaluate(COUNT_UNSEEN_TWEETS_SCRIPT, selector)
+        if count > baseline:
+            return _finish(label, started, 'articles', count - baseline)
+        if tracker.is_idle(quiet_ms, started):
+            return _finish(label, started, 'network_idle', 0)
+        if (time.monotonic() - started) * 1000 >= deadline_ms:
+            return _finish(label, started, 'deadline', 0)
+        await page.wait_for_timeout(POLL_INTERVAL_MS)
@@ -0,0 +1,175 @@
+"""
+推文全文检索
+
+以前的搜索是 content__icontains / ai_analysis__summary__icontains，每次都要扫描所有推文。
+这里为每条推文保存一个检索文档（TweetSearchDocument），在数据库的全文索引上搜索并按相关度排序：
+
+- PostgreSQL: to_tsvector('simple', document) 的GIN索引，ts_rank 排序
+- SQLite: FTS5 虚拟表 x_monitor_tweet_fts（由触发器与文档表同步），bm25 排序
+- 其他数据库 / FTS5 不可用时退回到 icontains
+
+日文没有空格分词，PostgreSQL 和 SQLite 的分词器都不能处理。因此在Python中切分：
+连续的日文/中文字符切分为单字和相邻两字（bigram），英文和数字按单词（小写）。
+检索词同样切分，所有词都要出现（AND）；英文单词按前缀匹配。
+
+文档在写入推文（_save_scraped_tweets）和AI分析（analyze_tweet_with_ai）时更新，
+已有数据用 python manage.py rebuild_search_index 建立。
+"""
+import logging
+import re
+import unicodedata
+from typing import Iterable, List
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Func, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Tweet, TweetSearchDocument
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'x_monitor_tweet_fts'
+
+# 下划线也作为分隔符（与 PostgreSQL 的分词器一致）
+WORD_PATTERN = re.compile(r'[^\W_]+')
+# 单词内的ASCII部分与非ASCII（日文/中文等）部分
+SCRIPT_PATTERN = re.compile(r'[0-9a-z]+|[^0-9a-z]+')
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def _segments(text: str):
+    """(是否ASCII, 片段)"""
+    for word in WORD_PATTERN.findall(_normalize(text)):
+        for segment in SCRIPT_PATTERN.findall(word):
+            yield segment.isascii(), segment
+
+
+def tokenize(text: str) -> List[str]:
+    """文档的词：英文单词 + 日文/中文的单字和bigram"""
+    tokens = []
+    for is_ascii, segment in _segments(text):
+        if is_ascii:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment)
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def query_terms(query: str) -> List[tuple]:
+    """检索词：[(词, 是否前缀匹配)]。日文/中文两字以上用bigram，单字直接匹配"""
+    terms = []
+    for is_ascii, segment in _segments(query):
+        if is_ascii:
+            terms.append((segment, True))
+        elif len(segment) == 1:
+            terms.append((segment, False))
+        else:
+            terms.extend((segment[i:i + 2], False) for i in range(len(segment) - 1))
+    # 去重（保持顺序）
+    return list(dict.fromkeys(terms))
+
+
+def build_document(content: str, summary: str = '', hashtags: Iterable[str] = ()) -> str:
+    return ' '.join(tokenize(' '.join([content or '', summary or '', *(hashtags or [])])))
+
+
+def update_search_documents(tweet_ids: Iterable[int]) -> int:
+    """重新生成这些推文（主键）的检索文档，返回更新的条数"""
+    tweet_ids = list(tweet_ids)
+    if not tweet_ids:
+        return 0
+    rows = Tweet.objects.filter(id__in=tweet_ids).values('id', 'content', 'hashtags', 'ai_analysis__summary')
+    documents = [
+        TweetSearchDocument(
+            tweet_id=row['id'],
+            document=build_document(row['content'], row['ai_analysis__summary'], row['hashtags'])
+        )
+        for row in rows
+    ]
+    TweetSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['tweet'],
+        update_fields=['document', 'updated_at']
+    )
+    return len(documents)
+
+
+class ToTsVector(Func):
+    # 与迁移 0011 中GIN索引的表达式相同，才会使用索引
+    template = "to_tsvector('simple'::regconfig, %(expressions)s)"
+
+
+class ToTsQuery(Func):
+    template = "to_tsquery('simple'::regconfig, %(expressions)s)"
+
+
+class TsMatch(Func):
+    template = '%(expressions)s'
+    arg_joiner = ' @@ '
+    output_field = BooleanField()
+
+
+def _postgres_query(terms) -> str:
+    return ' & '.join(
+        "'{}'{}".format(term.replace("'", "''"), ':*' if prefix else '')
+        for term, prefix in terms
+    )
+
+
+def _fts5_query(terms) -> str:
+    return ' AND '.join(
+        '"{}"{}'.format(term.replace('"', '""'), '*' if prefix else '')
+        for term, prefix in terms
+    )
+
+
+_fts_available = None
+
+
+def fts_available() -> bool:
+    """当前数据库是否有全文索引"""
+    global _fts_available
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def search_tweets(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    在 queryset（Tweet）中全文检索 query，添加 search_rank（越大越相关）并按它排序
+
+    没有全文索引时退回到 content / AI摘要 的 icontains（search_rank 为 0）。
+    """
+    terms = query_terms(query)
+    if not terms or not fts_available():
+        return queryset.filter(
+            Q(content__icontains=query) | Q(ai_analysis__summary__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        vector = ToTsVector(F('search_document__document'))
+        tsquery = ToTsQuery(Value(_postgres_query(terms)))
+        queryset = queryset.filter(TsMatch(vector, tsquery)).annotate(
+            search_rank=Func(vector, tsquery, function='ts_rank', output_field=FloatField())
+        )
+    else:
+        fts_query = _fts5_query(terms)
+        # bm25() 越小越相关，取负数
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {Tweet._meta.db_table}.id',
+            [fts_query],
+            output_field=FloatField()
+        ))
+    return queryset.order_by('-search_rank', *queryset.query.order_by)
@@ -18,6 +18,9 @@ class XAccountSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'last_checked', 'username', 'display_name', 'avatar_url']
     
     def get_tweets_count(self, obj):
+        # 一覧・詳細ビューでは annotate した件数を使う（アカウントごとのCOUNTを避ける）
+        if hasattr(obj, 'tweets_count'):
+            return obj.tweets_count
         return obj.tweets.count()
     
     def get_monitoring_interval_display(self, obj):
@@ -117,11 +120,13 @@ class AIPromptRuleSerializer(serializers.ModelSerializer):
             self.fields['target_accounts'].queryset = XAccount.objects.filter(user=request.user)
     
     def get_recommended_count(self, obj):
-        """获取该规则推荐的推文数量"""
+        """获取该规则推荐的推文数量（列表视图中使用 annotate 的值，避免每条规则一次COUNT）"""
+        if hasattr(obj, 'recommended_count'):
+            return obj.recommended_count
         return obj.recommended_tweets.count()
     
     def get_target_account_details(self, obj):
-        """获取关联账号的详细信息"""
+        """获取关联账号的详细信息（视图中 prefetch_related('target_accounts')）"""
         return [
             {
                 'id': account.id,
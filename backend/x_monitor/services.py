@@ -6,10 +6,16 @@ import time
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone as django_timezone
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
-from .models import XAccount, Tweet, MonitoringLog
+from .models import XAccount, Tweet, MonitoringLog, TweetTag
+from .account_lease import AccountLease, run_exclusive
+from .browser_pool import get_browser_pool
+from .engagement import record_engagement_snapshots
+from .search import update_search_documents
+from .tags import build_tags
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,7 @@ USE_WORKAROUND = True  # 临时启用workaround
 if USE_WORKAROUND:
     logger.info("🔧 Using workaround scraper (temporary fix for X.com anti-automation)")
     from .workaround_scraper import scrape_with_working_method
+    from .batch_scraper import scrape_timelines_batch
     SCRAPER_AVAILABLE = True
 else:
     # 根据配置选择爬虫实现
@@ -82,24 +89,7 @@ class XScraperClient:
             # 添加随机延迟
             self._add_random_delay()
             
-            with sync_playwright() as p:
-                browser = p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1280, 'height': 720},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    extra_http_headers={
-                        'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
-                    }
-                )
-                page = context.new_page()
-                
+            with get_browser_pool().page('guest') as page:
                 # ユーザープロフィールページにアクセス
                 url = f"{self.base_url}/{username}"
                 logger.info(f"Navigating to user profile: {url}")
@@ -110,7 +100,6 @@ class XScraperClient:
                     page.wait_for_selector('[data-testid="UserName"]', timeout=20000)
                 except PlaywrightTimeoutError as e:
                     logger.error(f"Timeout loading user profile: {e}")
-                    browser.close()
                     return None
                 
                 # 随机等待 2-5 秒
@@ -160,8 +149,6 @@ class XScraperClient:
                     logger.warning(f"Failed to extract avatar: {e}")
                     avatar_url = 'https://abs.twimg.com/sticky/default_profile_images/default_profile_400x400.png'
                 
-                browser.close()
-                
                 logger.info(f"User info scraped - username: {username}, display_name: {display_name}, avatar: {avatar_url}")
                 
                 # ユーザーIDを生成(スクレイピングではユーザーIDを取得できないため、ユーザー名をIDとして使用)
@@ -176,30 +163,65 @@ class XScraperClient:
             logger.error(f"Error scraping user {username}: {e}")
             return None
     
-    def get_recent_tweets(self, username: str, max_results: int = 10, hours: int = 6) -> List[Dict]:
+    def _filter_recent_tweets(self, tweets: List[Dict], hours: int) -> List[Dict]:
+        """workaround scraper的结果中只保留指定時間以内的推文"""
+        time_ago = django_timezone.now() - django_timezone.timedelta(hours=hours)
+        recent_tweets = []
+        for tweet in tweets:
+            try:
+                # 保存済みツイートは古くてもエンゲージメント数の更新に使う
+                if tweet.get('is_known'):
+                    recent_tweets.append(tweet)
+                    continue
+                tweet_time = django_timezone.datetime.fromisoformat(tweet['published_at'].replace('Z', '+00:00'))
+                if tweet_time >= time_ago:
+                    recent_tweets.append(tweet)
+            except:
+                pass
+        return recent_tweets
+    
+    def get_recent_tweets_batch(self, usernames: List[str], max_results: int = 10, hours: int = 6,
+                                known_ids: Dict[str, List[str]] = None) -> Dict[str, object]:
+        """複数アカウントの最新ツイートを並行スクレイピング（1つのブラウザで複数タブ）
+        
+        Args:
+            known_ids: {username: 保存済みの最新ツイートID}、到達したらスクロールを停止
+        
+        Returns:
+            {username: ツイートリスト}、失敗したアカウントは例外オブジェクト
+        """
+        if not USE_WORKAROUND:
+            # 并发批量模式仅支持workaround scraper，其他模式逐个抓取
+            return {
+                username: self.get_recent_tweets(username, max_results=max_results, hours=hours,
+                                                 known_ids=(known_ids or {}).get(username))
+                for username in usernames
+            }
+        
+        results = scrape_timelines_batch(usernames, max_tweets=max_results, known_ids=known_ids)
+        for username, tweets in results.items():
+            if not isinstance(tweets, Exception):
+                results[username] = self._filter_recent_tweets(tweets, hours)
+        return results
+    
+    def get_recent_tweets(self, username: str, max_results: int = 10, hours: int = 6,
+                          known_ids: List[str] = None) -> List[Dict]:
         """最新のツイートをスクレイピング（指定時間以内のツイートのみ）
         
         Args:
             username: X.com用户名
             max_results: 最大取得ツイート数
             hours: 時間範囲（デフォルト: 6時間）
+            known_ids: 保存済みの最新ツイートID（workaround scraperは到達したらスクロールを停止）
         """
         try:
             # 如果启用了workaround，使用它
             if USE_WORKAROUND:
                 logger.info(f"使用workaround scraper获取 @{username} 的推文")
-                tweets = scrape_with_working_method(username, max_tweets=max_results)
+                tweets = scrape_with_working_method(username, max_tweets=max_results, known_ids=known_ids)
                 
                 # 过滤指定时间内的推文
-                time_ago = django_timezone.now() - django_timezone.timedelta(hours=hours)
-                recent_tweets = []
-                for tweet in tweets:
-                    try:
-                        tweet_time = django_timezone.datetime.fromisoformat(tweet['published_at'].replace('Z', '+00:00'))
-                        if tweet_time >= time_ago:
-                            recent_tweets.append(tweet)
-                    except:
-                        pass
+                recent_tweets = self._filter_recent_tweets(tweets, hours)
                 
                 logger.info(f"Workaround scraper找到 {len(tweets)} 条推文，其中 {len(recent_tweets)} 条在{hours}小时内")
                 return recent_tweets
@@ -212,26 +234,7 @@ class XScraperClient:
             six_hours_ago = django_timezone.now() - django_timezone.timedelta(hours=6)
             logger.info(f"Fetching tweets since: {six_hours_ago}")
             
-            with sync_playwright() as p:
-                browser = p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-dev-shm-usage',
-                        '--no-sandbox',
-                        '--disable-gpu',
-                        '--disable-software-rasterizer'
-                    ]
-                )
-                context = browser.new_context(
-                    viewport={'width': 1280, 'height': 720},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    extra_http_headers={
-                        'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    }
-                )
-                
+            with get_browser_pool().page('guest') as page:
                 # 禁用字体、样式表等非必要资源以加快加载速度（保留图片和视频）
                 def block_resources(route):
                     resource_type = route.request.resource_type
@@ -240,8 +243,7 @@ class XScraperClient:
                     else:
                         route.continue_()
                 
-                context.route("**/*", block_resources)
-                page = context.new_page()
+                page.route("**/*", block_resources)
                 
                 # ユーザーのタイムラインにアクセス
                 url = f"{self.base_url}/{username}"
@@ -258,7 +260,6 @@ class XScraperClient:
                     screenshot_path = f"/tmp/x_scrape_error_{username}.png"
                     page.screenshot(path=screenshot_path)
                     logger.error(f"Screenshot saved to {screenshot_path}")
-                    browser.close()
                     return []
                 
                 # 最小化滚动：只滚动一次，快速获取最新推文
@@ -367,7 +368,6 @@ class XScraperClient:
                         logger.warning(f"Error parsing individual tweet: {e}")
                         continue
                 
-                browser.close()
                 logger.info(f"Successfully scraped {len(tweets)} tweets for @{username} (recent: {recent_count}, old: {old_count})")
                 return tweets
                 
@@ -375,24 +375,16 @@ class XScraperClient:
             logger.error(f"Error scraping tweets for user {username}: {e}")
             return []
     
-    def get_today_tweets(self, username: str) -> List[Dict]:
+    def get_today_tweets(self, username: str, known_ids: List[str] = None) -> List[Dict]:
         """当日のツイートのみを取得（24小時以内）"""
         try:
             # 如果启用了workaround，使用它获取更多推文
             if USE_WORKAROUND:
                 logger.info(f"使用workaround scraper获取 @{username} 当日推文")
-                tweets = scrape_with_working_method(username, max_tweets=50)  # 获取更多推文
+                tweets = scrape_with_working_method(username, max_tweets=50, known_ids=known_ids)  # 获取更多推文
                 
                 # 过滤24小时内的推文
-                twenty_four_hours_ago = django_timezone.now() - django_timezone.timedelta(hours=24)
-                today_tweets = []
-                for tweet in tweets:
-                    try:
-                        tweet_time = django_timezone.datetime.fromisoformat(tweet['published_at'].replace('Z', '+00:00'))
-                        if tweet_time >= twenty_four_hours_ago:
-                            today_tweets.append(tweet)
-                    except:
-                        pass
+                today_tweets = self._filter_recent_tweets(tweets, 24)
                 
                 logger.info(f"Workaround scraper找到 {len(tweets)} 条推文，其中 {len(today_tweets)} 条在24小时内")
                 return today_tweets
@@ -417,6 +409,46 @@ class XScraperClient:
             return []
 
 
+# スクレイパーに渡す保存済みツイートIDの件数
+RECENT_TWEET_IDS_LIMIT = 20
+
+# 再取得時に更新するエンゲージメント数
+METRIC_FIELDS = ['like_count', 'retweet_count', 'reply_count']
+
+# 監視に失敗したアカウントの再試行までの時間（分）
+FAILURE_RETRY_MINUTES = 30
+
+
+def get_due_accounts(now=None, limit: int = None, interval: int = None) -> List[XAccount]:
+    """監視時刻を過ぎたアカウントを取得（期限切れの長い順、最大 limit 件）
+    
+    (is_active, next_check_at) インデックスの範囲検索のみで、全アカウントは読み込まない
+    
+    Args:
+        limit: 1回の実行で監視する最大アカウント数（デフォルト: SCHEDULER_MAX_DUE_ACCOUNTS）
+        interval: 指定した監視間隔のアカウントのみ
+    """
+    now = now or django_timezone.now()
+    if limit is None:
+        limit = getattr(settings, 'SCHEDULER_MAX_DUE_ACCOUNTS', 200)
+    
+    query = XAccount.objects.filter(is_active=True, next_check_at__lte=now)
+    if interval:
+        query = query.filter(monitoring_interval=interval)
+    return list(query.order_by('next_check_at')[:limit])
+
+
+def dispatch_rule_evaluation(x_account: XAccount, tweet_ids: List[str]) -> None:
+    """新しいツイートのAIルール評価タスクを登録（AI_RULES_ON_INGEST=False の場合は何もしない）"""
+    if not getattr(settings, 'AI_RULES_ON_INGEST', True):
+        return
+    from .tasks import evaluate_rules_for_new_tweets
+    try:
+        evaluate_rules_for_new_tweets.delay(x_account.id, tweet_ids)
+    except Exception as e:
+        logger.warning(f"Failed to queue AI rule evaluation for @{x_account.username}: {e}")
+
+
 class XMonitorService:
     """X監視サービス"""
     
@@ -432,92 +464,261 @@ class XMonitorService:
             self.scraper_client = XScraperClient()
             logger.info("XMonitorService initialized with guest scraper")
     
-    def monitor_account(self, x_account: XAccount, today_only: bool = False, max_tweets: int = 20, hours: int = 6) -> dict:
+    def monitor_account(self, x_account: XAccount, today_only: bool = False, max_tweets: int = 20, hours: int = 6,
+                        wait: bool = True) -> dict:
         """アカウントを監視して新しいツイートを取得
         
+        同じアカウントを同時に監視するのは1プロセスのみ（アカウント単位のリース）
+        
         Args:
             x_account: 監視するXアカウント
             today_only: Trueの場合、当日のツイートのみを取得
             max_tweets: 取得する最大ツイート数（デフォルト: 20）
             hours: 時間範囲（デフォルト: 6時間、today_onlyがFalseの場合のみ有効）
+            wait: 他のプロセスが監視中の場合、完了を待ってその結果を再利用する（Falseの場合はスキップ）
         """
+        return run_exclusive(
+            x_account.id,
+            lambda: self._monitor_account(x_account, today_only, max_tweets, hours),
+            wait=wait
+        )
+    
+    def _monitor_account(self, x_account: XAccount, today_only: bool, max_tweets: int, hours: int) -> dict:
         start_time = django_timezone.now()
         
         try:
             # Webスクレイピングでツイートを取得
+            # 保存済みの最新ツイートに到達したらスクレイピングを打ち切る
+            known_ids = self._recent_tweet_ids(x_account)
             if today_only:
                 tweets_data = self.scraper_client.get_today_tweets(
-                    username=x_account.username
+                    username=x_account.username,
+                    known_ids=known_ids
                 )
             else:
                 tweets_data = self.scraper_client.get_recent_tweets(
                     username=x_account.username,
                     max_results=max_tweets,
-                    hours=hours
+                    hours=hours,
+                    known_ids=known_ids
                 )
             
-            new_tweets_count = 0
+            return self._save_scraped_tweets(x_account, tweets_data, start_time)
             
-            # 不再从推文中更新账户头像
-            # 头像应该只在首次添加账户时从用户资料页获取，之后不再变更
+        except Exception as e:
+            return self._record_failure(x_account, e, start_time)
+    
+    def monitor_accounts_batch(self, x_accounts: List[XAccount], max_tweets: int = 20, hours: int = 6) -> Dict[int, dict]:
+        """複数アカウントを1つのブラウザで並行監視
+        
+        Args:
+            x_accounts: 監視するXアカウントのリスト
+            max_tweets: アカウントごとの最大ツイート数
+            hours: 時間範囲（デフォルト: 6時間）
+        
+        Returns:
+            {account.id: monitor_account と同じ形式の結果}
+        """
+        start_time = django_timezone.now()
+        
+        if not hasattr(self.scraper_client, 'get_recent_tweets_batch'):
+            return {
+                account.id: self.monitor_account(account, max_tweets=max_tweets, hours=hours, wait=False)
+                for account in x_accounts
+            }
+        
+        # 他のプロセスが監視中のアカウントはスキップ
+        results = {}
+        leases = {}
+        for account in x_accounts:
+            lease = AccountLease(account.id)
+            if lease.acquire():
+                leases[account.id] = lease
+            else:
+                logger.info(f"@{account.username} は他のプロセスが監視中のためスキップ")
+                results[account.id] = {'success': True, 'skipped': True, 'new_tweets': 0}
+        leased_accounts = [account for account in x_accounts if account.id in leases]
+        
+        try:
+            if leased_accounts:
+                results.update(self._monitor_leased_batch(leased_accounts, max_tweets, hours, start_time))
+        finally:
+            for account_id, lease in leases.items():
+                lease.release(results.get(account_id))
+        return results
+    
+    def _monitor_leased_batch(self, x_accounts: List[XAccount], max_tweets: int, hours: int, start_time) -> Dict[int, dict]:
+        try:
+            scraped = self.scraper_client.get_recent_tweets_batch(
+                [account.username for account in x_accounts],
+                max_results=max_tweets,
+                hours=hours,
+                known_ids={account.username: self._recent_tweet_ids(account) for account in x_accounts}
+            )
+        except Exception as e:
+            return {account.id: self._record_failure(account, e, start_time) for account in x_accounts}
+        
+        results = {}
+        for account in x_accounts:
+            tweets_data = scraped.get(account.username, [])
+            try:
+                if isinstance(tweets_data, Exception):
+                    raise tweets_data
+                results[account.id] = self._save_scraped_tweets(account, tweets_data, start_time)
+            except Exception as e:
+                results[account.id] = self._record_failure(account, e, start_time)
+        return results
+    
+    def _recent_tweet_ids(self, x_account: XAccount) -> List[str]:
+        """保存済みの最新ツイートID（スクレイパーの高水位線）"""
+        return list(
+            Tweet.objects.filter(x_account=x_account)
+            .order_by('-posted_at')
+            .values_list('tweet_id', flat=True)[:RECENT_TWEET_IDS_LIMIT]
+        )
+    
+    def _save_scraped_tweets(self, x_account: XAccount, tweets_data: List[Dict], start_time) -> dict:
+        """スクレイピング結果を一括保存し、監視ログを記録
+        
+        既存IDの確認は1クエリ、INSERTは bulk_create(ignore_conflicts=True) で1回、
+        保存済みツイートのエンゲージメント数は bulk_update で1回更新し、
+        スナップショット記録・アカウント更新・ログ記録を含めて1トランザクションで実行する
+        
+        Returns:
+            new_tweet_ids に今回新しく保存したツイートIDのリスト（時間線の順）
+        """
+        # 不再从推文中更新账户头像
+        # 头像应该只在首次添加账户时从用户资料页获取，之后不再变更
+        
+        # 同じIDが重複して取得された場合は最初のものを使う
+        scraped = {}
+        for tweet_data in tweets_data:
+            scraped.setdefault(tweet_data['id'], tweet_data)
+        
+        now = django_timezone.now()
+        with transaction.atomic():
+            # 保存済みのツイートを1クエリで確認
+            existing = {
+                row['tweet_id']: row
+                for row in Tweet.objects.filter(tweet_id__in=list(scraped)).values('id', 'tweet_id', 'posted_at', *METRIC_FIELDS)
+            }
+            # is_known はスクレイパーが保存済みと判断したツイート（エンゲージメント数の更新のみ）
+            candidate_ids = [
+                tweet_id for tweet_id in scraped
+                if tweet_id not in existing and not scraped[tweet_id].get('is_known')
+            ]
             
-            # 新しいツイートをデータベースに保存
-            for tweet_data in tweets_data:
-                if not Tweet.objects.filter(tweet_id=tweet_data['id']).exists():
-                    Tweet.objects.create(
+            new_tweet_ids = []
+            inserted = []
+            if candidate_ids:
+                Tweet.objects.bulk_create([
+                    Tweet(
                         x_account=x_account,
-                        tweet_id=tweet_data['id'],
-                        content=tweet_data['text'],
-                        hashtags=tweet_data['hashtags'],
-                        mentions=tweet_data['mentions'],
-                        media_urls=tweet_data['media_urls'],
-                        retweet_count=tweet_data['retweet_count'],
-                        like_count=tweet_data['like_count'],
-                        reply_count=tweet_data['reply_count'],
-                        posted_at=tweet_data['created_at']
+                        tweet_id=tweet_id,
+                        content=scraped[tweet_id]['text'],
+                        hashtags=scraped[tweet_id]['hashtags'],
+                        mentions=scraped[tweet_id]['mentions'],
+                        media_urls=scraped[tweet_id]['media_urls'],
+                        retweet_count=scraped[tweet_id]['retweet_count'],
+                        like_count=scraped[tweet_id]['like_count'],
+                        reply_count=scraped[tweet_id]['reply_count'],
+                        posted_at=scraped[tweet_id]['created_at']
                     )
-                    new_tweets_count += 1
-            
-            # アカウントの最終チェック時刻を更新
-            x_account.last_checked = django_timezone.now()
-            x_account.save()
+                    for tweet_id in candidate_ids
+                ], ignore_conflicts=True)
+                
+                # 同時に別のワーカーが保存した分（同じユーザー名を監視する別アカウント）を除外
+                inserted = list(
+                    Tweet.objects.filter(tweet_id__in=candidate_ids, x_account=x_account)
+                    .values('id', 'tweet_id', 'posted_at', *METRIC_FIELDS)
+                )
+                inserted_ids = {row['tweet_id'] for row in inserted}
+                new_tweet_ids = [tweet_id for tweet_id in candidate_ids if tweet_id in inserted_ids]
+                
+                # 全文検索の文書を作成（search.py）
+                update_search_documents(row['id'] for row in inserted)
+                
+                # ハッシュタグ・メンションの索引（tags.py）
+                TweetTag.objects.bulk_create([
+                    tag
+                    for row in inserted
+                    for tag in build_tags(row['id'], row['posted_at'],
+                                          scraped[row['tweet_id']]['hashtags'], scraped[row['tweet_id']]['mentions'])
+                ], ignore_conflicts=True)
             
-            # ログを記録
-            execution_time = (django_timezone.now() - start_time).total_seconds()
-            log_result = 'success' if new_tweets_count > 0 else 'no_new_tweets'
+            # 保存済みツイートのエンゲージメント数を最新値に更新
+            changed = []
+            for tweet_id, row in existing.items():
+                tweet_data = scraped[tweet_id]
+                if not tweet_data.get('metrics_available', True):
+                    continue
+                if any(row[field] != tweet_data[field] for field in METRIC_FIELDS):
+                    changed.append(Tweet(pk=row['id'], **{field: tweet_data[field] for field in METRIC_FIELDS}))
+                    row.update({field: tweet_data[field] for field in METRIC_FIELDS})
+            if changed:
+                Tweet.objects.bulk_update(changed, METRIC_FIELDS)
             
-            MonitoringLog.objects.create(
-                x_account=x_account,
-                result=log_result,
-                tweets_found=new_tweets_count,
-                execution_time=execution_time
-            )
+            # エンゲージメントの時系列を記録（ダウンサンプリングは compact_engagement_snapshots）
+            record_engagement_snapshots([
+                (row['id'], row['posted_at'], row['like_count'], row['retweet_count'], row['reply_count'])
+                for row in list(existing.values()) + inserted
+                if scraped[row['tweet_id']].get('metrics_available', True)
+            ], now=now)
             
-            return {
-                'success': True,
-                'new_tweets': new_tweets_count,
-                'execution_time': execution_time
-            }
+            # アカウントの最終チェック時刻と次回チェック時刻を更新
+            x_account.last_checked = now
+            x_account.next_check_at = x_account.compute_next_check_at()
+            XAccount.objects.filter(pk=x_account.pk).update(last_checked=now, next_check_at=x_account.next_check_at)
             
-        except Exception as e:
+            # ログを記録
             execution_time = (django_timezone.now() - start_time).total_seconds()
+            log_result = 'success' if new_tweet_ids else 'no_new_tweets'
             
-            # エラーログを記録
             MonitoringLog.objects.create(
                 x_account=x_account,
-                result='error',
-                tweets_found=0,
-                error_message=str(e),
+                result=log_result,
+                tweets_found=len(new_tweet_ids),
                 execution_time=execution_time
             )
             
-            logger.error(f"Error monitoring account @{x_account.username}: {e}")
-            
-            return {
-                'success': False,
-                'error': str(e),
-                'execution_time': execution_time
-            }
+            # 新しいツイートに有効なAIルールをまとめて適用（コミット後にCeleryで実行）
+            if new_tweet_ids:
+                transaction.on_commit(lambda: dispatch_rule_evaluation(x_account, new_tweet_ids))
+        
+        return {
+            'success': True,
+            'new_tweets': len(new_tweet_ids),
+            'new_tweet_ids': new_tweet_ids,
+            'updated_metrics': len(changed),
+            'execution_time': execution_time
+        }
+    
+    def _record_failure(self, x_account: XAccount, error: Exception, start_time) -> dict:
+        """監視失敗時のエラーログを記録"""
+        now = django_timezone.now()
+        execution_time = (now - start_time).total_seconds()
+        
+        # 失敗したアカウントは少し後に再試行（期限切れのままだと毎回先頭に並び、他のアカウントを圧迫する）
+        retry_minutes = min(x_account.monitoring_interval, FAILURE_RETRY_MINUTES)
+        x_account.next_check_at = now + django_timezone.timedelta(minutes=retry_minutes)
+        XAccount.objects.filter(pk=x_account.pk).update(next_check_at=x_account.next_check_at)
+        
+        # エラーログを記録
+        MonitoringLog.objects.create(
+            x_account=x_account,
+            result='error',
+            tweets_found=0,
+            error_message=str(error),
+            execution_time=execution_time
+        )
+        
+        logger.error(f"Error monitoring account @{x_account.username}: {error}")
+        
+        return {
+            'success': False,
+            'error': str(error),
+            'execution_time': execution_time
+        }
     
     def setup_account_monitoring(self, username: str) -> Optional[dict]:
         """アカウント監視のセットアップ"""
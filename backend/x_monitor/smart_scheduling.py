@@ -10,7 +10,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import F
 from .models import XAccount
-from .services import XMonitorService
+from .services import XMonitorService, get_due_accounts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,7 +27,7 @@ def trigger_monitoring(request):
     
     成本优化:
         - 不再每次触发都监控所有账号
-        - 根据 last_checked + monitoring_interval 判断是否需要监控
+        - 根据 next_check_at（= last_checked + monitoring_interval）判断是否需要监控
         - 分级调度: 不同间隔的账号使用不同的 cron
         
     使用示例:
@@ -40,28 +40,11 @@ def trigger_monitoring(request):
         interval = request.query_params.get('interval')
         now = timezone.now()
         
-        # 构建查询条件
-        query = XAccount.objects.filter(is_active=True)
-        
-        # 如果指定了间隔，只获取该间隔的账号
+        # 只获取需要监控的账号（next_check_at <= 现在）
+        # 数据库端按索引范围查询，逾期最久的优先，每次最多 SCHEDULER_MAX_DUE_ACCOUNTS 个
         if interval:
             interval = int(interval)
-            query = query.filter(monitoring_interval=interval)
-        
-        # 只获取需要监控的账号（上次检查时间 + 间隔 <= 现在）
-        # 使用 F 表达式进行数据库级别的计算
-        from datetime import timedelta
-        accounts_to_monitor = []
-        
-        for account in query:
-            if not account.last_checked:
-                # 从未检查过，需要监控
-                accounts_to_monitor.append(account)
-            else:
-                # 计算下次应该检查的时间
-                next_check_time = account.last_checked + timedelta(minutes=account.monitoring_interval)
-                if now >= next_check_time:
-                    accounts_to_monitor.append(account)
+        accounts_to_monitor = get_due_accounts(now=now, interval=interval)
         
         if not accounts_to_monitor:
             return Response({
@@ -78,7 +61,7 @@ def trigger_monitoring(request):
         for account in accounts_to_monitor:
             try:
                 logger.info(f"监控账号: @{account.username} (间隔: {account.monitoring_interval}分钟)")
-                monitor_service.monitor_account(account)
+                monitor_service.monitor_account(account, wait=False)
                 successful += 1
             except Exception as e:
                 logger.error(f"监控失败 @{account.username}: {e}")
@@ -0,0 +1,107 @@
+"""
+推文的话题标签・提及・AI话题索引
+
+Tweet.hashtags / Tweet.mentions / AIAnalysis.topics 是 JSONField，
+以前按标签筛选用 hashtags__contains=[tag]，每个标签扫描一次全表（SQLite 不支持，PostgreSQL 也没有GIN索引）。
+这里把它们展开到 TweetTag 表（一个值一行），按标签筛选和热门标签统计都走索引：
+
+- (kind, value, tweet)：按标签查推文，多个标签的 OR（value IN ...）/ AND（GROUP BY tweet HAVING COUNT = 标签数）
+- (kind, posted_at, value)：一段时间内的热门标签（posted_at 冗余保存在 TweetTag 上）
+
+值统一规范化（NFKC、小写、去掉开头的 # / @），'#スキー場'、'スキー場'、'＃スキー場' 是同一个标签。
+
+标签在写入推文（_save_scraped_tweets）和AI分析（analyze_tweet_with_ai）时更新，
+已有数据用 python manage.py rebuild_tweet_tags 建立。
+"""
+import logging
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, QuerySet
+
+from .models import Tweet, TweetTag
+
+logger = logging.getLogger(__name__)
+
+TAG_KINDS = [kind for kind, _ in TweetTag.KIND_CHOICES]
+VALUE_MAX_LENGTH = TweetTag._meta.get_field('value').max_length
+
+
+def normalize_tag(value) -> str:
+    """'#スキー場' / '＃スキー場' / 'スキー場' → 'スキー場'，'@Hakuba' → 'hakuba'"""
+    value = unicodedata.normalize('NFKC', str(value or '')).strip().lower()
+    return value.lstrip('#@').strip()[:VALUE_MAX_LENGTH]
+
+
+def parse_tags(text: Optional[str]) -> List[str]:
+    """查询参数 'a, #b,,c' → ['a', 'b', 'c']（规范化、去重）"""
+    values = (normalize_tag(value) for value in (text or '').split(','))
+    return list(dict.fromkeys(value for value in values if value))
+
+
+def build_tags(tweet_pk: int, posted_at: datetime, hashtags: Iterable = (), mentions: Iterable = (),
+               topics: Iterable = ()) -> List[TweetTag]:
+    """一条推文的 TweetTag（未保存）"""
+    tags = []
+    for kind, values in (('hashtag', hashtags), ('mention', mentions), ('topic', topics)):
+        for value in dict.fromkeys(normalize_tag(value) for value in values or []):
+            if value:
+                tags.append(TweetTag(tweet_id=tweet_pk, kind=kind, value=value, posted_at=posted_at))
+    return tags
+
+
+def update_tweet_tags(tweet_ids: Iterable[int]) -> int:
+    """根据推文和AI分析重新生成这些推文（主键）的标签，返回推文条数"""
+    tweet_ids = list(tweet_ids)
+    if not tweet_ids:
+        return 0
+    rows = list(
+        Tweet.objects.filter(id__in=tweet_ids)
+        .values('id', 'posted_at', 'hashtags', 'mentions', 'ai_analysis__topics')
+    )
+    tags = [
+        tag
+        for row in rows
+        for tag in build_tags(row['id'], row['posted_at'], row['hashtags'], row['mentions'],
+                              row['ai_analysis__topics'])
+    ]
+    with transaction.atomic():
+        TweetTag.objects.filter(tweet_id__in=tweet_ids).delete()
+        TweetTag.objects.bulk_create(tags, ignore_conflicts=True)
+    return len(rows)
+
+
+def filter_by_tags(queryset: QuerySet, kind: str, values: List[str], match_all: bool = True) -> QuerySet:
+    """
+    筛选有这些标签（已规范化）的推文
+
+    match_all=True 时要有全部标签（AND），False 时有任意一个即可（OR）。
+    """
+    if not values:
+        return queryset
+    tagged = TweetTag.objects.filter(kind=kind, value__in=values)
+    if match_all and len(values) > 1:
+        # (tweet, kind, value) 唯一，标签数等于 values 的数量即全部命中
+        tagged = tagged.values('tweet_id').annotate(matched=Count('id')).filter(matched=len(values))
+    return queryset.filter(id__in=tagged.values('tweet_id'))
+
+
+def top_tags(kind: str, since: Optional[datetime] = None, tweets: Optional[Dict] = None,
+             limit: int = 20) -> List[Dict]:
+    """
+    since 之后发布的推文中出现最多的标签：[{'value': ..., 'count': ...}]
+
+    tweets 是对推文的额外条件（例如 {'x_account__user': user}），以 tweet__ 前缀应用到 TweetTag 上。
+    """
+    queryset = TweetTag.objects.filter(kind=kind)
+    if since is not None:
+        queryset = queryset.filter(posted_at__gte=since)
+    if tweets:
+        queryset = queryset.filter(**{f'tweet__{key}': value for key, value in tweets.items()})
+    return list(
+        queryset.values('value')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'value')[:limit]
+    )
@@ -1,49 +1,100 @@
-from celery import shared_task
+from datetime import datetime, timedelta
+from celery import chord, group, shared_task
+from celery.signals import worker_process_shutdown
+from django.conf import settings
 from django.utils import timezone
 from .models import XAccount
-from .services import XMonitorService
+from .services import XMonitorService, get_due_accounts
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@worker_process_shutdown.connect
+def close_browser_pool(**kwargs):
+    """worker进程退出时关闭常驻浏览器"""
+    from .browser_pool import get_browser_pool
+    get_browser_pool().close()
+
+
 @shared_task
 def monitor_all_active_accounts():
-    """すべてのアクティブなアカウントを監視するタスク（根据监控间隔智能调度）"""
-    from datetime import timedelta
+    """すべてのアクティブなアカウントを監視するタスク（根据监控间隔智能调度）
+    
+    到期账户各自作为一个 monitor_single_account 子任务分发（group），
+    并行度由消费 SCRAPER_TASK_QUEUE 的worker数和并发数决定；
+    全部完成后由 chord 回调 summarize_monitoring_run 汇总本轮结果。
+    本任务只负责分发，立即返回。
+    """
+    # 到了监控时间的账户（数据库端按 next_check_at 范围查询，逾期最久的优先，每次最多 SCHEDULER_MAX_DUE_ACCOUNTS 个）
+    due_accounts = get_due_accounts()
+    logger.info(f"{len(due_accounts)} accounts due for monitoring")
+    if not due_accounts:
+        return {'dispatched': 0}
+    
+    if not getattr(settings, 'SCRAPER_FANOUT_ENABLED', True):
+        return _monitor_accounts_in_process(due_accounts)
     
     now = timezone.now()
-    active_accounts = XAccount.objects.filter(is_active=True)
-    monitor_service = XMonitorService()
+    account_ids = [account.id for account in due_accounts]
+    
+    # 先把这些账户的下次监控时间推后，避免子任务还在排队时被下一轮调度重复分发
+    # （子任务完成后会写入真正的 next_check_at；任务丢失时过了这段时间会重新到期）
+    claim_minutes = getattr(settings, 'SCRAPER_DISPATCH_CLAIM_MINUTES', 60)
+    XAccount.objects.filter(id__in=account_ids).update(next_check_at=now + timedelta(minutes=claim_minutes))
+    
+    queue = getattr(settings, 'SCRAPER_TASK_QUEUE', '')
+    subtasks = []
+    for account_id in account_ids:
+        signature = monitor_single_account.si(account_id, wait=False)
+        if queue:
+            signature = signature.set(queue=queue)
+        subtasks.append(signature)
     
+    summary = chord(group(subtasks))(summarize_monitoring_run.s(now.isoformat(), len(account_ids)))
+    logger.info(f"Dispatched {len(account_ids)} monitor_single_account tasks (summary task: {summary.id})")
+    return {
+        'dispatched': len(account_ids),
+        'summary_task_id': summary.id
+    }
+
+
+def _monitor_accounts_in_process(due_accounts):
+    """不分发子任务，在当前任务内依次（或按批）监控（SCRAPER_FANOUT_ENABLED=False 时使用）"""
+    monitor_service = XMonitorService()
     results = []
-    for account in active_accounts:
-        try:
-            # 检查是否到了该监控的时间
-            should_monitor = False
-            
-            if account.last_checked is None:
-                # 从未监控过，立即监控
-                should_monitor = True
-            else:
-                # 计算距离上次检查的时间（分钟）
-                time_since_last_check = (now - account.last_checked).total_seconds() / 60
-                
-                # 如果超过了监控间隔，则监控
-                if time_since_last_check >= account.monitoring_interval:
-                    should_monitor = True
+    
+    if getattr(settings, 'SCRAPER_BATCH_ENABLED', True):
+        # 并发批量模式：每批账户共用一个浏览器，多个标签页并行抓取
+        batch_size = getattr(settings, 'SCRAPER_BATCH_SIZE', 20)
+        for i in range(0, len(due_accounts), batch_size):
+            batch = due_accounts[i:i + batch_size]
+            try:
+                batch_results = monitor_service.monitor_accounts_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to monitor batch of {len(batch)} accounts: {e}")
+                results.extend({'account': account.username, 'error': str(e)} for account in batch)
+                continue
             
-            if should_monitor:
-                result = monitor_service.monitor_account(account)
+            for account in batch:
+                result = batch_results[account.id]
                 results.append({
                     'account': account.username,
                     'interval': account.get_monitoring_interval_display(),
                     'result': result
                 })
                 logger.info(f"Monitored @{account.username} (间隔: {account.get_monitoring_interval_display()}): {result}")
-            else:
-                logger.debug(f"Skipped @{account.username} (not time yet)")
-                
+        return results
+    
+    for account in due_accounts:
+        try:
+            result = monitor_service.monitor_account(account, wait=False)
+            results.append({
+                'account': account.username,
+                'interval': account.get_monitoring_interval_display(),
+                'result': result
+            })
+            logger.info(f"Monitored @{account.username} (间隔: {account.get_monitoring_interval_display()}): {result}")
         except Exception as e:
             logger.error(f"Failed to monitor @{account.username}: {e}")
             results.append({
@@ -55,14 +106,44 @@ def monitor_all_active_accounts():
 
 
 @shared_task
-def monitor_single_account(account_id):
-    """単一のアカウントを監視するタスク"""
+def summarize_monitoring_run(results, started_at, account_count):
+    """chord回调：汇总一轮监控的结果"""
+    started = datetime.fromisoformat(started_at)
+    succeeded = [r for r in results if r and r.get('success')]
+    failed = [r for r in results if not r or not r.get('success')]
+    
+    summary = {
+        'accounts': account_count,
+        'succeeded': len(succeeded),
+        'failed': len(failed),
+        'skipped': sum(1 for r in succeeded if r.get('skipped')),  # 其他进程正在监控的账户
+        'new_tweets': sum(r.get('new_tweets', 0) for r in succeeded),
+        'errors': [{'account': r.get('account'), 'error': r.get('error')} for r in failed if r],
+        'duration_seconds': round((timezone.now() - started).total_seconds(), 1)
+    }
+    logger.info(
+        f"Monitoring run finished: {summary['succeeded']}/{account_count} succeeded, "
+        f"{summary['new_tweets']} new tweets, {summary['duration_seconds']}s"
+    )
+    return summary
+
+
+@shared_task(
+    soft_time_limit=getattr(settings, 'MONITOR_TASK_SOFT_TIME_LIMIT', 300),
+    time_limit=getattr(settings, 'MONITOR_TASK_SOFT_TIME_LIMIT', 300) + 60
+)
+def monitor_single_account(account_id, wait=True):
+    """単一のアカウントを監視するタスク
+    
+    soft_time_limit を超えた抓取は SoftTimeLimitExceeded で中断され、エラーとして記録される
+    wait=False の場合、他のプロセスが監視中ならスキップする（定期実行用）
+    """
     try:
         account = XAccount.objects.get(id=account_id, is_active=True)
         monitor_service = XMonitorService()
-        result = monitor_service.monitor_account(account)
+        result = monitor_service.monitor_account(account, wait=wait)
         logger.info(f"Monitored @{account.username}: {result}")
-        return result
+        return dict(result, account=account.username)
     except XAccount.DoesNotExist:
         logger.error(f"Account with id {account_id} not found or inactive")
         return {'error': 'Account not found or inactive'}
@@ -81,7 +162,7 @@ def monitor_today_tweets():
     for account in active_accounts:
         try:
             # 当日のツイートのみを取得
-            result = monitor_service.monitor_account(account, today_only=True)
+            result = monitor_service.monitor_account(account, today_only=True, wait=False)
             results.append({
                 'account': account.username,
                 'result': result
@@ -108,8 +189,8 @@ def fetch_initial_tweets(account_id):
         result = monitor_service.monitor_account(account, max_tweets=10)
         
         # 如果启用了AI过滤，自动分析所有新推文
-        if account.ai_filter_enabled and result.get('new_tweets', 0) > 0:
-            analyze_tweets_for_recommendation.delay(account.id)
+        if account.ai_filter_enabled and result.get('new_tweet_ids'):
+            analyze_tweets_for_recommendation.delay(account.id, result['new_tweet_ids'])
         
         logger.info(f"Initial tweets fetched for @{account.username}: {result}")
         return result
@@ -123,8 +204,13 @@ def fetch_initial_tweets(account_id):
 
 
 @shared_task
-def analyze_tweets_for_recommendation(account_id):
-    """使用AI分析推文并生成推荐"""
+def analyze_tweets_for_recommendation(account_id, tweet_ids=None):
+    """使用AI分析推文并生成推荐（指定tweet_ids时只分析这些新保存的推文）
+    
+    推文按 AI_RELEVANCE_BATCH_SIZE 条打包成一次AI请求，结果按推文ID对应回来，
+    分析标记和推荐记录分别用 bulk_update / bulk_create 一次写入
+    """
+    from django.db import transaction
     from .models import Tweet, RecommendedTweet
     from ai_service.services import AIService
     
@@ -136,41 +222,54 @@ def analyze_tweets_for_recommendation(account_id):
             x_account=account,
             ai_analyzed=False
         )
+        if tweet_ids is not None:
+            unanalyzed_tweets = unanalyzed_tweets.filter(tweet_id__in=tweet_ids)
+        # 从旧到新，与部分索引 tweet_unanalyzed_idx 的顺序一致（发布时间相同时按保存顺序，批次的组成是确定的）
+        tweets = list(unanalyzed_tweets.order_by('posted_at', 'id'))
+        if not tweets:
+            return {'account': account.username, 'analyzed': 0, 'recommended': 0}
         
-        ai_service = AIService()
-        recommended_count = 0
+        # 使用AI判断是否推荐（批量）
+        analyses = AIService().analyze_tweets_relevance(tweets)
         
-        for tweet in unanalyzed_tweets:
-            try:
-                # 使用AI判断是否推荐
-                analysis = ai_service.analyze_tweet_relevance(tweet.content)
-                
-                tweet.ai_analyzed = True
-                tweet.ai_relevant = analysis.get('is_relevant', False)
-                tweet.ai_summary = analysis.get('summary', '')
-                tweet.save()
-                
-                # 如果AI判断为相关，创建推荐记录
-                if tweet.ai_relevant:
-                    RecommendedTweet.objects.get_or_create(
-                        user=account.user,
-                        tweet=tweet,
-                        defaults={
-                            'ai_reason': analysis.get('reason', ''),
-                            'relevance_score': analysis.get('score', 0.0)
-                        }
-                    )
-                    recommended_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to analyze tweet {tweet.tweet_id}: {e}")
-                continue
+        relevant = []
+        for tweet in tweets:
+            analysis = analyses[tweet.tweet_id]
+            tweet.ai_analyzed = True
+            tweet.ai_relevant = analysis.get('is_relevant', False)
+            tweet.ai_summary = analysis.get('summary', '')
+            tweet.ai_label_source = analysis.get('source', '')
+            if tweet.ai_relevant:
+                relevant.append(tweet)
         
-        logger.info(f"Analyzed tweets for @{account.username}, {recommended_count} recommended")
+        with transaction.atomic():
+            Tweet.objects.bulk_update(tweets, ['ai_analyzed', 'ai_relevant', 'ai_summary', 'ai_label_source'])
+            
+            # 如果AI判断为相关，创建推荐记录（prompt_rule 为空时唯一约束不生效，先排除已有的记录）
+            already_recommended = set(
+                RecommendedTweet.objects.filter(
+                    user_id=account.user_id,
+                    tweet__in=relevant,
+                    prompt_rule__isnull=True
+                ).values_list('tweet_id', flat=True)
+            )
+            recommendations = [
+                RecommendedTweet(
+                    user_id=account.user_id,
+                    tweet=tweet,
+                    ai_reason=analyses[tweet.tweet_id].get('reason', ''),
+                    relevance_score=analyses[tweet.tweet_id].get('score', 0.0)
+                )
+                for tweet in relevant
+                if tweet.id not in already_recommended
+            ]
+            RecommendedTweet.objects.bulk_create(recommendations)
+        
+        logger.info(f"Analyzed {len(tweets)} tweets for @{account.username}, {len(recommendations)} recommended")
         return {
             'account': account.username,
-            'analyzed': unanalyzed_tweets.count(),
-            'recommended': recommended_count
+            'analyzed': len(tweets),
+            'recommended': len(recommendations)
         }
         
     except XAccount.DoesNotExist:
@@ -178,4 +277,37 @@ def analyze_tweets_for_recommendation(account_id):
         return {'error': 'Account not found'}
     except Exception as e:
         logger.error(f"Failed to analyze tweets for account {account_id}: {e}")
-        return {'error': str(e)}
\ No newline at end of file
+        return {'error': str(e)}
+
+
+@shared_task
+def evaluate_rules_for_new_tweets(account_id, tweet_ids):
+    """新保存的推文入库后，一次性应用该用户所有有效的AI规则"""
+    from ai_service.services import AIRecommendationService
+    
+    try:
+        account = XAccount.objects.get(id=account_id)
+        recommended = AIRecommendationService().apply_rules_to_new_tweets(account, tweet_ids)
+        return {
+            'account': account.username,
+            'tweets': len(tweet_ids),
+            'recommended': recommended
+        }
+    except XAccount.DoesNotExist:
+        logger.error(f"Account with id {account_id} not found")
+        return {'error': 'Account not found'}
+    except Exception as e:
+        logger.error(f"Failed to evaluate AI rules for account {account_id}: {e}")
+        return {'error': str(e)}
+
+
+@shared_task
+def compact_engagement_snapshots():
+    """互动数快照降采样：小时快照合并为日快照，删除过期的日快照"""
+    from .engagement import compact_engagement_snapshots as compact
+    
+    try:
+        return compact()
+    except Exception as e:
+        logger.error(f"Failed to compact engagement snapshots: {e}")
+        return {'error': str(e)}
@@ -2,6 +2,7 @@ import logging
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -14,6 +15,7 @@ from .serializers import (
     MonitoringLogSerializer, UserNotificationSerializer,
     AIPromptRuleSerializer, RecommendedTweetSerializer
 )
+from .pagination import KeysetPagination
 from .services import XMonitorService
 from .tasks import monitor_single_account
 from ai_service.services import analyze_tweet_with_ai, AIRecommendationService
@@ -246,7 +248,7 @@ class XAccountListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return XAccount.objects.filter(user=self.request.user)
+        return XAccount.objects.filter(user=self.request.user).annotate(tweets_count=Count('tweets'))
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -335,7 +337,7 @@ class XAccountDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return XAccount.objects.filter(user=self.request.user)
+        return XAccount.objects.filter(user=self.request.user).annotate(tweets_count=Count('tweets'))
 
 
 @swagger_auto_schema(
@@ -386,9 +388,10 @@ def monitor_account_now(request, account_id):
 
 
 class TweetListView(generics.ListAPIView):
-    """ツイート一覧API"""
+    """ツイート一覧API（(posted_at, id) のカーソルページング、?cursor= / ?limit= / ?count=true）"""
     serializer_class = TweetSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user_accounts = XAccount.objects.filter(user=self.request.user)
@@ -580,9 +583,13 @@ class NotificationListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserNotification.objects.filter(
-            user=self.request.user
-        ).select_related('tweet').order_by('-created_at')
+        queryset = UserNotification.objects.filter(user=self.request.user)
+        
+        is_read = self.request.query_params.get('is_read')
+        if is_read is not None:
+            queryset = queryset.filter(is_read=is_read.lower() == 'true')
+        
+        return queryset.select_related('tweet').order_by('-created_at')
 
 
 @swagger_auto_schema(
@@ -787,7 +794,7 @@ def debug_scrape_url(request):
         url = 'https://' + url
     
     try:
-        from playwright.sync_api import sync_playwright
+        from .browser_pool import get_browser_pool
         import json
         import os
         import time
@@ -809,32 +816,10 @@ def debug_scrape_url(request):
         
         logger.info(f"已加载 {len(cookies)} 个cookies")
         
-        # 启动浏览器
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            
-            # 创建浏览器上下文，添加反检测和浏览器指纹
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                locale='ja-JP',
-                timezone_id='Asia/Tokyo',
-                device_scale_factor=1,
-                has_touch=False,
-                java_script_enabled=True,
-                bypass_csp=True,
-            )
-            
-            # 添加cookies
-            context.add_cookies(cookies)
-            logger.info("已添加cookies到浏览器上下文")
-            
-            # 注入反检测脚本
-            context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                
+        # 从常驻浏览器池借出页面（上下文已添加cookies和反检测脚本）
+        with get_browser_pool().page('workaround') as page:
+            # 注入额外的浏览器指纹伪装
+            page.add_init_script("""
                 window.chrome = {
                     runtime: {}
                 };
@@ -848,8 +833,6 @@ def debug_scrape_url(request):
                 });
             """)
             
-            page = context.new_page()
-            
             # 访问URL（使用更宽松的等待策略）
             logger.info(f"正在访问: {url}")
             try:
@@ -910,9 +893,6 @@ def debug_scrape_url(request):
                 logger.info(f"截图已保存到: {screenshot_filepath}")
             except Exception as e:
                 logger.warning(f"截图失败: {e}")
-            
-            # 关闭浏览器
-            browser.close()
         
         return Response({
             'success': True,
@@ -939,7 +919,10 @@ class AIPromptRuleListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return AIPromptRule.objects.filter(user=self.request.user)
+        # GROUP BY 查询不使用 Meta.ordering，需要显式排序
+        return AIPromptRule.objects.filter(user=self.request.user).annotate(
+            recommended_count=Count('recommended_tweets')
+        ).prefetch_related('target_accounts').order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -997,9 +980,10 @@ def apply_ai_rule(request, rule_id):
 
 
 class RecommendedTweetListView(generics.ListAPIView):
-    """AI推荐推文列表"""
+    """AI推荐推文列表（按推荐时间 (created_at, id) 的游标分页）"""
     serializer_class = RecommendedTweetSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = RecommendedTweet.objects.filter(user=self.request.user)
@@ -1014,7 +998,7 @@ class RecommendedTweetListView(generics.ListAPIView):
         if is_read is not None:
             queryset = queryset.filter(is_read=is_read.lower() == 'true')
         
-        return queryset
+        return queryset.select_related('tweet__x_account', 'tweet__ai_analysis', 'prompt_rule')
 
 
 @api_view(['POST'])
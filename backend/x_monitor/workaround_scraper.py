@@ -3,62 +3,320 @@
 因为authenticated_scraper被X.com的反自动化机制阻止
 """
 import logging
-import time
-import json
-from pathlib import Path
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 from django.conf import settings
+from .browser_pool import get_browser_pool, get_cookies_file
+from .graphql_scraper import capture_user_tweets
+from .known_tweets import KnownTweetIds
+from .render_wait import INITIAL_NETWORK_QUIET_MS, get_scroll_deadline_ms, wait_for_render, watch_network
 
 logger = logging.getLogger(__name__)
 
 
-def scrape_with_working_method(username: str, max_tweets: int = 20):
+# 在页面内执行的提取脚本：只返回之前没见过的推文节点的结构化数据，
+# 避免每次滚动都序列化整个页面（约500KB）再用BeautifulSoup重新解析所有推文
+EXTRACT_NEW_TWEETS_SCRIPT = """
+() => {
+    const seen = window.__xmSeenTweetIds || (window.__xmSeenTweetIds = new Set());
+    const results = [];
+    for (const article of document.querySelectorAll('article[data-testid="tweet"]')) {
+        const link = article.querySelector('a[href*="/status/"]');
+        if (!link) continue;
+        const id = link.getAttribute('href').split('/status/').pop().split('?')[0];
+        if (seen.has(id)) continue;
+        seen.add(id);
+
+        const spans = Array.from(article.querySelectorAll('span'), span => span.textContent || '');
+        const socialContext = Array.from(article.querySelectorAll('[data-testid="socialContext"]'), e => e.textContent || '');
+        const textElem = article.querySelector('[data-testid="tweetText"]') || article.querySelector('div[lang]');
+        const timeElem = article.querySelector('time');
+        const imgs = Array.from(article.querySelectorAll('img'), img => img.getAttribute('src') || '');
+        // 互动数：按钮的aria-label中是精确数字（如 "12 Likes. Like" / "12 件のいいね"），找不到按钮时为null
+        const metric = (testIds) => {
+            for (const testId of testIds) {
+                const button = article.querySelector(`button[data-testid="${testId}"]`);
+                if (!button) continue;
+                const match = (button.getAttribute('aria-label') || '').replace(/[,，]/g, '').match(/\\d+/);
+                return match ? parseInt(match[0], 10) : 0;
+            }
+            return null;
+        };
+
+        results.push({
+            id: id,
+            is_retweet: spans.some(t => t.includes('Retweeted') || t.includes('转推了') || t.includes('リツイート')),
+            is_pinned: socialContext.some(t => t.includes('Pinned') || t.includes('固定') || t.includes('置顶')),
+            is_reply: !!article.querySelector('div[data-testid="reply"]') ||
+                spans.some(t => t.includes('Replying to') || t.includes('返信先:') || t.includes('回复')),
+            has_text: !!textElem,
+            text: textElem ? textElem.innerText.trim() : '',
+            has_time: !!timeElem,
+            datetime: timeElem ? timeElem.getAttribute('datetime') : null,
+            time_text: timeElem ? timeElem.textContent.trim() : '',
+            hashtags: textElem ? Array.from(textElem.querySelectorAll('a[href*="/hashtag/"]'), a => a.textContent.trim()) : [],
+            mentions: textElem ? Array.from(textElem.querySelectorAll('a[href^="/"]'), a => a.textContent.trim()).filter(t => t.startsWith('@')) : [],
+            media_urls: imgs.filter(src => src.includes('pbs.twimg.com/media/')),
+            profile_image: imgs.find(src => src.includes('profile_images')) || null,
+            reply_count: metric(['reply']),
+            retweet_count: metric(['retweet', 'unretweet']),
+            like_count: metric(['like', 'unlike']),
+        });
+    }
+    return results;
+}
+"""
+
+# 从页面头部的用户信息中提取账户头像
+EXTRACT_ACCOUNT_AVATAR_SCRIPT = """
+(username) => {
+    const name = username.toLowerCase();
+    for (const img of document.querySelectorAll('img[alt]')) {
+        const src = img.getAttribute('src') || '';
+        if (img.alt.toLowerCase().includes(name) && src.includes('profile_images')) return src;
+    }
+    return null;
+}
+"""
+
+
+class TimelineCollector:
+    """
+    从时间线中逐步收集原创推文（跳过转发和回复）
+
+    输入是 EXTRACT_NEW_TWEETS_SCRIPT 在页面内提取的结构化数据，
+    同步爬虫（scrape_with_working_method）和并发批量爬虫（batch_scraper）共用
+
+    传入 known_ids（账户最近已入库的推文ID）时，遇到已入库的推文即停止（reached_known）；
+    页面上已经出现的已入库推文放入 refreshed，用于更新互动数
+    """
+
+    def __init__(self, username: str, max_tweets: int = 20, max_consecutive_non_original: int = 5,
+                 known_ids=None):
+        self.username = username
+        self.known_ids = KnownTweetIds(known_ids)
+        self.reached_known = False  # 已到达之前抓取过的内容
+        self.items_seen = 0
+        self.max_tweets = max_tweets
+        self.max_consecutive_non_original = max_consecutive_non_original
+        self.tweets = []
+        self.refreshed = []  # 已入库的推文（只用于更新互动数，不计入max_tweets）
+        self.collected_tweet_ids = set()  # 用于去重
+        self.consecutive_non_original = 0  # 连续遇到的转发/回复数
+        self.account_avatar_url = None
+        self.first_original_tweet_processed = False
+
+    @property
+    def is_full(self) -> bool:
+        """已收集够推文"""
+        return len(self.tweets) >= self.max_tweets
+
+    @property
+    def hit_non_original_limit(self) -> bool:
+        """连续遇到太多转发/回复"""
+        return self.consecutive_non_original >= self.max_consecutive_non_original
+
+    def set_account_avatar(self, src):
+        """设置从页面头部提取的账户头像（EXTRACT_ACCOUNT_AVATAR_SCRIPT 的结果）"""
+        if src:
+            self.account_avatar_url = src.replace('_normal', '_400x400')
+            logger.info(f"从页面头部找到账户头像: {self.account_avatar_url[:80]}...")
+        else:
+            # 如果从页面头部找不到，尝试从第一条原创推文获取
+            logger.info("页面头部未找到账户头像，将从第一条推文获取")
+
+    def feed(self, items) -> int:
+        """处理本次新出现的推文节点，返回本次新收集的原创推文数"""
+        logger.info(f"@{self.username}: 新出现 {len(items)} 个推文DOM节点")
+
+        new_tweets = 0
+        for item in items:
+            try:
+                tweet_id = item['id']
+
+                # 去重：跳过已经处理过的推文
+                if tweet_id in self.collected_tweet_ids:
+                    continue
+
+                # 标记为已处理
+                self.collected_tweet_ids.add(tweet_id)
+                is_first_item = self.items_seen == 0
+                self.items_seen += 1
+
+                # 高水位线：遇到已入库的原创推文说明后面都是旧内容
+                # （转发的链接指向原推文的ID，不能用来判断；置顶推文总在最前面，不触发停止）
+                is_known = not item.get('is_retweet') and tweet_id in self.known_ids
+                if is_known:
+                    self._refresh(item)
+                    if item.get('is_pinned') or is_first_item:
+                        logger.info(f"推文 {tweet_id} 已入库（置顶），跳过")
+                        continue
+                    if not self.reached_known:
+                        self.reached_known = True
+                        logger.info(f"推文 {tweet_id} 已入库，之后的内容都已抓取过，停止")
+                    continue
+
+                # 到达已入库内容之后的推文都是旧的，只更新已入库推文的互动数
+                if self.reached_known:
+                    continue
+
+                # 检查是否是转发（Retweet）
+                if item.get('is_retweet'):
+                    logger.info(f"推文 {tweet_id} 是转发，跳过")
+
+                # 检查是否是回复（Reply）
+                if item.get('is_reply'):
+                    logger.info(f"推文 {tweet_id} 是回复，跳过")
+
+                # 如果是转发或回复，增加计数器
+                if item.get('is_retweet') or item.get('is_reply'):
+                    self.consecutive_non_original += 1
+                    logger.info(f"连续非原创推文数: {self.consecutive_non_original}/{self.max_consecutive_non_original}")
+
+                    # 如果连续5条都是转发/回复，停止抓取
+                    if self.hit_non_original_limit:
+                        logger.info(f"连续 {self.max_consecutive_non_original} 条转发/回复，停止抓取")
+                        break
+                    continue
+
+                # 重置计数器（遇到原创推文）
+                self.consecutive_non_original = 0
+
+                # 如果已经收集够了，跳出文章循环
+                if self.is_full:
+                    logger.info(f"已收集 {len(self.tweets)} 条原创推文，停止处理")
+                    break
+
+                tweet = self._build_tweet(item)
+                if tweet is None:
+                    continue
+
+                self.tweets.append(tweet)
+                new_tweets += 1
+                logger.info(f"收集推文 {tweet_id}: {tweet['text'][:50]}...")
+
+            except Exception as e:
+                logger.warning(f"解析推文失败: {e}")
+                continue
+
+        return new_tweets
+
+    @property
+    def results(self):
+        """新收集的推文 + 已入库推文（is_known=True，用于更新互动数）"""
+        return self.tweets + self.refreshed
+
+    def _refresh(self, item):
+        """记录页面上出现的已入库推文的最新互动数"""
+        if item.get('is_reply') or item.get('like_count') is None:
+            return
+        tweet = self._build_tweet(item)
+        if tweet is not None:
+            tweet['is_known'] = True
+            self.refreshed.append(tweet)
+
+    def _build_tweet(self, item):
+        """由提取结果构建单条原创推文，无法确定发布时间时返回None"""
+        tweet_id = item['id']
+
+        # 推文文本
+        text = item.get('text') or ''
+        if not item.get('has_text'):
+            logger.warning(f"推文 {tweet_id} 没有找到文本元素")
+
+        # 时间
+        if not item.get('has_time'):
+            logger.warning(f"推文 {tweet_id} 没有找到 <time> 元素")
+            return None
+
+        if not item.get('datetime'):
+            # 尝试从文本中获取相对时间（如 "2h"、"47m"）
+            time_text = item.get('time_text') or ''
+            logger.warning(f"推文 {tweet_id} 没有 datetime 属性，只有文本: '{time_text}'")
+
+            # 尝试解析相对时间
+            from datetime import timedelta
+            from django.utils import timezone as django_timezone
+
+            published_at = None
+            if 'm' in time_text:  # 分钟前
+                try:
+                    minutes = int(''.join(filter(str.isdigit, time_text)))
+                    published_at = (django_timezone.now() - timedelta(minutes=minutes)).isoformat()
+                    logger.info(f"解析相对时间 '{time_text}' -> {minutes}分钟前")
+                except:
+                    pass
+            elif 'h' in time_text:  # 小时前
+                try:
+                    hours = int(''.join(filter(str.isdigit, time_text)))
+                    published_at = (django_timezone.now() - timedelta(hours=hours)).isoformat()
+                    logger.info(f"解析相对时间 '{time_text}' -> {hours}小时前")
+                except:
+                    pass
+
+            if not published_at:
+                logger.warning(f"无法解析相对时间 '{time_text}'，跳过推文 {tweet_id}")
+                return None
+        else:
+            published_at = item['datetime']
+
+        # 提取用户头像URL（仅在账户头像未找到且这是第一条原创推文时）
+        if not self.account_avatar_url and not self.first_original_tweet_processed:
+            if item.get('profile_image'):
+                self.account_avatar_url = item['profile_image'].replace('_normal', '_400x400')
+                logger.info(f"从第一条原创推文获取账户头像: {self.account_avatar_url[:80]}...")
+            self.first_original_tweet_processed = True
+
+        return {
+            'id': tweet_id,
+            'text': text,
+            'created_at': published_at,
+            'hashtags': item.get('hashtags') or [],
+            'mentions': item.get('mentions') or [],
+            # 互动数据（从按钮的aria-label提取，找不到按钮时为0）
+            'retweet_count': item.get('retweet_count') or 0,
+            'like_count': item.get('like_count') or 0,
+            'reply_count': item.get('reply_count') or 0,
+            'metrics_available': item.get('like_count') is not None,
+            # 推文媒体图片（不含头像）
+            'media_urls': item.get('media_urls') or [],
+            'avatar_url': self.account_avatar_url,
+            'published_at': published_at,
+            'is_pinned': bool(item.get('is_pinned'))
+        }
+
+
+def get_scraper_mode() -> str:
+    """时间线抓取模式: 'graphql'（拦截UserTweets响应）或 'dom'（解析渲染后的页面）"""
+    return getattr(settings, 'SCRAPER_MODE', 'graphql')
+
+
+def scrape_with_working_method(username: str, max_tweets: int = 20, known_ids=None):
     """
     使用views.py中证明有效的方法抓取推文
     这个方法能成功获取推文（528KB HTML with tweets）
+
+    known_ids: 账户最近已入库的推文ID，遇到后停止滚动
     """
     url = f"https://x.com/{username}"
-    
-    # 读取cookies
-    cookie_file = Path(settings.BASE_DIR) / 'data' / 'x_cookies.json'
+
+    # 检查cookies（cookies由浏览器池在创建上下文时加载）
+    cookie_file = get_cookies_file()
     if not cookie_file.exists():
         logger.error(f"Cookie文件不存在: {cookie_file}")
         return []
-    
-    with open(cookie_file, 'r', encoding='utf-8') as f:
-        cookies = json.load(f)
-    
+
     logger.info(f"使用working scraper抓取 @{username} 的推文...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        
-        # 使用与debug_scrape_url完全相同的配置
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-            locale='ja-JP',
-            timezone_id='Asia/Tokyo',
-            device_scale_factor=1,
-            has_touch=False,
-            java_script_enabled=True,
-            bypass_csp=True,
-        )
-        
-        # 添加cookies
-        context.add_cookies(cookies)
-        
-        # 反检测脚本
-        context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        """)
-        
-        page = context.new_page()
-        
-        try:
+
+    # 从常驻浏览器池借出页面（与debug_scrape_url完全相同的上下文配置）
+    with get_browser_pool().page('workaround') as page:
+        watch_network(page)
+        if get_scraper_mode() == 'graphql':
+            # 拦截时间线的UserTweets响应，捕获到即返回
+            tweets = capture_user_tweets(page, username, max_tweets, known_ids=known_ids)
+            if tweets is not None:
+                return tweets
+            # 页面已完成导航，直接回退到DOM解析
+            logger.warning(f"@{username}: GraphQL模式失败，回退到DOM解析")
+        else:
             # 访问URL
             logger.info(f"访问: {url}")
             try:
@@ -71,245 +329,61 @@ def scrape_with_working_method(username: str, max_tweets: int = 20):
                     logger.info("页面 load 完成")
                 except Exception as e2:
                     logger.warning(f"load 也超时: {e2}")
-            
-            # 关键：等待5秒让React渲染（debug_scrape_url的成功做法）
-            logger.info("等待页面渲染...")
-            time.sleep(5)
-            
-            # 尝试等待推文元素
-            try:
-                page.wait_for_selector('article, [data-testid="tweet"]', timeout=10000)
-                logger.info("检测到推文元素")
-            except:
-                logger.warning("未检测到推文元素，但继续解析")
-            
-            # 首先提取账户头像（从页面头部，不是从推文卡片）
-            html_content = page.content()
-            soup = BeautifulSoup(html_content, 'lxml')
-            
-            account_avatar_url = None
-            # 尝试从页面头部的用户信息中提取头像
-            profile_images = soup.find_all('img', {'alt': lambda x: x and username.lower() in str(x).lower()})
-            if profile_images:
-                for img in profile_images:
-                    src = img.get('src', '')
-                    if src and 'profile_images' in src:
-                        account_avatar_url = src.replace('_normal', '_400x400')
-                        logger.info(f"从页面头部找到账户头像: {account_avatar_url[:80]}...")
-                        break
-            
-            # 如果从页面头部找不到，尝试从第一条原创推文获取
-            if not account_avatar_url:
-                logger.info("页面头部未找到账户头像，将从第一条推文获取")
-            
-            # 使用滚动加载收集推文（因为Twitter使用虚拟滚动，DOM会复用节点）
-            tweets = []
-            collected_tweet_ids = set()  # 用于去重
-            consecutive_non_original = 0  # 连续遇到的转发/回复数
-            max_consecutive_non_original = 5
-            first_original_tweet_processed = False
-            scroll_attempts = 0
-            max_scroll_attempts = 5
-            no_new_tweets_count = 0
-            
-            logger.info("开始滚动收集推文...")
-            while scroll_attempts < max_scroll_attempts and len(tweets) < max_tweets and no_new_tweets_count < 2:
-                # 获取当前页面的HTML并解析
-                html_content = page.content()
-                soup = BeautifulSoup(html_content, 'lxml')
-                articles = soup.find_all('article', {'data-testid': 'tweet'})
-                
-                logger.info(f"滚动 #{scroll_attempts + 1}: 找到 {len(articles)} 个推文DOM节点")
-                
-                new_tweets_in_this_scroll = 0
-                
-                # 处理当前可见的推文
-                for article in articles:
-                    try:
-                        # 推文ID
-                        tweet_link = article.find('a', href=lambda x: x and '/status/' in x)
-                        if not tweet_link:
-                            continue
-                        
-                        tweet_id = tweet_link['href'].split('/status/')[-1].split('?')[0]
-                        
-                        # 去重：跳过已经处理过的推文
-                        if tweet_id in collected_tweet_ids:
-                            continue
-                        
-                        # 标记为已处理
-                        collected_tweet_ids.add(tweet_id)
-                        
-                        # 检查是否是转发（Retweet）
-                        is_retweet = False
-                        retweet_indicator = article.find('span', string=lambda x: x and ('Retweeted' in x or '转推了' in x or 'リツイート' in x))
-                        if retweet_indicator:
-                            is_retweet = True
-                            logger.info(f"推文 {tweet_id} 是转发，跳过")
-                        
-                        # 检查是否是回复（Reply）
-                        is_reply = False
-                        reply_indicator = article.find('div', {'data-testid': 'reply'}) or \
-                                         article.find('span', string=lambda x: x and ('Replying to' in x or '返信先:' in x or '回复' in x))
-                        if reply_indicator:
-                            is_reply = True
-                            logger.info(f"推文 {tweet_id} 是回复，跳过")
-                        
-                        # 如果是转发或回复，增加计数器
-                        if is_retweet or is_reply:
-                            consecutive_non_original += 1
-                            logger.info(f"连续非原创推文数: {consecutive_non_original}/{max_consecutive_non_original}")
-                            
-                            # 如果连续5条都是转发/回复，停止抓取
-                            if consecutive_non_original >= max_consecutive_non_original:
-                                logger.info(f"连续 {max_consecutive_non_original} 条转发/回复，停止抓取")
-                                break
-                            continue
-                        
-                        # 重置计数器（遇到原创推文）
-                        consecutive_non_original = 0
-                        
-                        # 如果已经收集够了，跳出文章循环
-                        if len(tweets) >= max_tweets:
-                            logger.info(f"已收集 {len(tweets)} 条原创推文，停止处理")
-                            break
-                        
-                        # 推文文本
-                        text_elem = article.find('[data-testid="tweetText"]')
-                        if text_elem:
-                            text = text_elem.get_text(separator='\n', strip=True)
-                        else:
-                            # 尝试其他选择器
-                            text_elem = article.find('div', {'lang': True})  # 尝试查找带lang属性的div
-                            if text_elem:
-                                text = text_elem.get_text(separator='\n', strip=True)
-                                logger.info(f"推文 {tweet_id} 使用备用选择器找到文本")
-                            else:
-                                text = ''
-                                logger.warning(f"推文 {tweet_id} 没有找到文本元素")
-                        
-                        # 时间
-                        time_elem = article.find('time')
-                        if not time_elem:
-                            logger.warning(f"推文 {tweet_id} 没有找到 <time> 元素")
-                            continue
-                        
-                        if not time_elem.get('datetime'):
-                            # 尝试从文本中获取相对时间（如 "2h"、"47m"）
-                            time_text = time_elem.get_text(strip=True)
-                            logger.warning(f"推文 {tweet_id} 没有 datetime 属性，只有文本: '{time_text}'")
-                            
-                            # 尝试解析相对时间
-                            from datetime import timedelta
-                            from django.utils import timezone as django_timezone
-                            
-                            published_at = None
-                            if 'm' in time_text:  # 分钟前
-                                try:
-                                    minutes = int(''.join(filter(str.isdigit, time_text)))
-                                    published_at = (django_timezone.now() - timedelta(minutes=minutes)).isoformat()
-                                    logger.info(f"解析相对时间 '{time_text}' -> {minutes}分钟前")
-                                except:
-                                    pass
-                            elif 'h' in time_text:  # 小时前
-                                try:
-                                    hours = int(''.join(filter(str.isdigit, time_text)))
-                                    published_at = (django_timezone.now() - timedelta(hours=hours)).isoformat()
-                                    logger.info(f"解析相对时间 '{time_text}' -> {hours}小时前")
-                                except:
-                                    pass
-                            
-                            if not published_at:
-                                logger.warning(f"无法解析相对时间 '{time_text}'，跳过推文 {tweet_id}")
-                                continue
-                        else:
-                            published_at = time_elem['datetime']
-                        
-                        # 提取hashtags和mentions
-                        hashtags = []
-                        mentions = []
-                        if text_elem:
-                            for hashtag in text_elem.find_all('a', href=lambda x: x and '/hashtag/' in x):
-                                hashtags.append(hashtag.get_text().strip())
-                            for mention in text_elem.find_all('a', href=lambda x: x and x.startswith('/')):
-                                mention_text = mention.get_text().strip()
-                                if mention_text.startswith('@'):
-                                    mentions.append(mention_text)
-                        
-                        # 互动数据（默认为0，因为不容易从HTML提取）
-                        retweet_count = 0
-                        like_count = 0
-                        reply_count = 0
-                        
-                        # 媒体URL（如果有）
-                        media_urls = []
-                        # 查找所有图片，排除头像（头像URL包含 profile_images）
-                        all_imgs = article.find_all('img')
-                        for img in all_imgs:
-                            src = img.get('src', '')
-                            if src and 'pbs.twimg.com/media/' in src:
-                                # 只取推文媒体图片（不是头像）
-                                media_urls.append(src)
-                        
-                        # 提取用户头像URL（仅在账户头像未找到且这是第一条原创推文时）
-                        if not account_avatar_url and not first_original_tweet_processed:
-                            for img in all_imgs:
-                                src = img.get('src', '')
-                                if src and 'profile_images' in src:
-                                    account_avatar_url = src.replace('_normal', '_400x400')
-                                    logger.info(f"从第一条原创推文获取账户头像: {account_avatar_url[:80]}...")
-                                    break
-                            first_original_tweet_processed = True
-                        
-                        tweets.append({
-                            'id': tweet_id,
-                            'text': text,
-                            'created_at': published_at,
-                            'hashtags': hashtags,
-                            'mentions': mentions,
-                            'retweet_count': retweet_count,
-                            'like_count': like_count,
-                            'reply_count': reply_count,
-                            'media_urls': media_urls,
-                            'avatar_url': account_avatar_url,
-                            'html': str(article),
-                            'published_at': published_at
-                        })
-                        
-                        new_tweets_in_this_scroll += 1
-                        logger.info(f"收集推文 {tweet_id}: {text[:50]}...")
-                        
-                    except Exception as e:
-                        logger.warning(f"解析推文失败: {e}")
-                        continue
-                
-                # 检查本次滚动是否收集到新推文
-                if new_tweets_in_this_scroll > 0:
-                    logger.info(f"本次滚动收集到 {new_tweets_in_this_scroll} 条新原创推文")
-                    no_new_tweets_count = 0
-                else:
-                    no_new_tweets_count += 1
-                    logger.info(f"本次滚动没有收集到新推文 (连续 {no_new_tweets_count} 次)")
-                
-                # 检查是否已经收集够了
-                if len(tweets) >= max_tweets:
-                    logger.info(f"已收集 {len(tweets)} 条原创推文，停止滚动")
-                    break
-                
-                # 检查是否触发连续非原创停止条件
-                if consecutive_non_original >= max_consecutive_non_original:
-                    logger.info(f"连续 {max_consecutive_non_original} 条非原创推文，停止滚动")
-                    break
-                
-                # 滚动到页面底部，加载更多推文
-                scroll_attempts += 1
-                if scroll_attempts < max_scroll_attempts:
-                    logger.info(f"向下滚动加载更多推文...")
-                    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    time.sleep(3)  # 等待新内容加载（增加到3秒确保加载完成）
-            
-            logger.info(f"成功解析 {len(tweets)} 条原创推文（已过滤转发和回复）")
-            return tweets
-            
-        finally:
-            browser.close()
+
+        # 等待React渲染出推文（出现推文或网络安静即结束，不再固定等待）
+        logger.info("等待页面渲染...")
+        if wait_for_render(page, label='initial', quiet_ms=INITIAL_NETWORK_QUIET_MS) == 'articles':
+            logger.info("检测到推文元素")
+        else:
+            logger.warning("未检测到推文元素，但继续解析")
+
+        collector = TimelineCollector(username, max_tweets, known_ids=known_ids)
+
+        # 首先提取账户头像（从页面头部，不是从推文卡片）
+        collector.set_account_avatar(page.evaluate(EXTRACT_ACCOUNT_AVATAR_SCRIPT, username))
+
+        # 使用滚动加载收集推文（因为Twitter使用虚拟滚动，DOM会复用节点）
+        scroll_attempts = 0
+        max_scroll_attempts = 5
+        no_new_tweets_count = 0
+
+        logger.info("开始滚动收集推文...")
+        while (scroll_attempts < max_scroll_attempts and not collector.is_full
+               and not collector.reached_known and no_new_tweets_count < 2):
+            # 只取回本次新出现的推文节点（在页面内提取）
+            logger.info(f"滚动 #{scroll_attempts + 1}")
+            new_tweets_in_this_scroll = collector.feed(page.evaluate(EXTRACT_NEW_TWEETS_SCRIPT))
+
+            # 检查本次滚动是否收集到新推文
+            if new_tweets_in_this_scroll > 0:
+                logger.info(f"本次滚动收集到 {new_tweets_in_this_scroll} 条新原创推文")
+                no_new_tweets_count = 0
+            else:
+                no_new_tweets_count += 1
+                logger.info(f"本次滚动没有收集到新推文 (连续 {no_new_tweets_count} 次)")
+
+            # 检查是否已经收集够了
+            if collector.is_full:
+                logger.info(f"已收集 {len(collector.tweets)} 条原创推文，停止滚动")
+                break
+
+            # 检查是否已到达之前抓取过的内容
+            if collector.reached_known:
+                logger.info("已到达已入库的推文，停止滚动")
+                break
+
+            # 检查是否触发连续非原创停止条件
+            if collector.hit_non_original_limit:
+                logger.info(f"连续 {collector.max_consecutive_non_original} 条非原创推文，停止滚动")
+                break
+
+            # 滚动到页面底部，加载更多推文
+            scroll_attempts += 1
+            if scroll_attempts < max_scroll_attempts:
+                logger.info(f"向下滚动加载更多推文...")
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                # 等待新内容加载（出现未处理的推文或网络安静）
+                wait_for_render(page, label='scroll', deadline_ms=get_scroll_deadline_ms())
+
+        logger.info(f"成功解析 {len(collector.tweets)} 条原创推文（已过滤转发和回复）")
+        return collector.results